@@ -41,6 +41,11 @@ import threading
 import urllib2
 from daemon.weaprous import WeApRous
 
+# Seconds the tracker holds a GET /watch/ request
+WATCH_TIMEOUT = 25
+# Seconds before watching again after the tracker could not be reached
+WATCH_RETRY = 5
+
 
 class PeerApp:
     """
@@ -59,20 +64,26 @@ class PeerApp:
         self.peer_id = "{}:{}".format(self.my_ip, self.my_port)
         
         # WeApRous app for P2P server
-        self.app = WeApRous()
+        self.app = WeApRous(stateful=True)
         
         # Connected peers
         self.connected_peers = {}  # {peer_id: {"ip": ..., "port": ..., "name": ...}}
         
+        # Tracker peer list and its version, updated with deltas
+        self.known_peers = {}  # {peer_id: {"ip": ..., "port": ..., "peer_id": ...}}
+        self.peers_version = None
+        self.peers_lock = threading.Lock()
+        
         # Message history
         self.messages = []
         
         # Setup P2P routes
         self.setup_routes()
         
-        # Heartbeat thread
+        # Heartbeat and tracker watch threads
         self.running = True
         self.heartbeat_thread = None
+        self.watch_thread = None
     
     def setup_routes(self):
         """Setup P2P API routes using WeApRous"""
@@ -247,13 +258,13 @@ class PeerApp:
             return False
     
     def get_peer_list(self):
-        """Get list of active peers from tracker"""
+        """Get list of active peers from tracker, only the changes since the
+        last call once the list is known"""
         try:
-            req = urllib2.Request(self.tracker_url + '/get-list/')
-            response = urllib2.urlopen(req)
-            result = json.loads(response.read())
-            
-            peers = result.get('peers', [])
+            url = self.tracker_url + '/get-list/'
+            if self.peers_version is not None:
+                url += '?since={}'.format(self.peers_version)
+            peers = self.update_peer_list(url)
             print("[Tracker] Found {} peers".format(len(peers)))
             
             return peers
@@ -262,8 +273,32 @@ class PeerApp:
             print("[Tracker] Failed to get peer list: {}".format(e))
             return []
     
+    def update_peer_list(self, url, timeout=None):
+        """Apply the full list or the delta returned by the tracker at url,
+        returns the known peers"""
+        req = urllib2.Request(url)
+        if timeout is None:
+            response = urllib2.urlopen(req)
+        else:
+            response = urllib2.urlopen(req, timeout=timeout)
+        result = json.loads(response.read())
+        
+        with self.peers_lock:
+            if result.get('mode') == 'delta':
+                for peer_id in result.get('removed', []):
+                    self.known_peers.pop(peer_id, None)
+                for peer in result.get('added', []):
+                    self.known_peers[peer['peer_id']] = peer
+            else:
+                self.known_peers = dict((peer['peer_id'], peer)
+                                        for peer in result.get('peers', []))
+            self.peers_version = result.get('version')
+            
+            return list(self.known_peers.values())
+    
     def send_heartbeat(self):
-        """Send heartbeat to tracker to stay alive"""
+        """Send heartbeat to tracker to stay alive, register again if the
+        tracker forgot us and refresh the peer list if its version moved"""
         try:
             data = json.dumps({'peer_id': self.peer_id})
             req = urllib2.Request(
@@ -271,9 +306,16 @@ class PeerApp:
                 data,
                 {'Content-Type': 'application/json'}
             )
-            urllib2.urlopen(req)
+            result = json.loads(urllib2.urlopen(req).read())
         except:
-            pass  # Silent fail for heartbeat
+            return  # Silent fail for heartbeat
+        
+        if self.peer_id in result.get('unknown', []):
+            print("[Tracker] Lease expired, registering again")
+            self.register_with_tracker()
+        elif result.get('version') == self.peers_version:
+            return  # Peer list up to date
+        self.discover_and_connect_peers()
     
     def unregister_from_tracker(self):
         """Unregister from tracker when shutting down"""
@@ -328,8 +370,10 @@ class PeerApp:
     
     def discover_and_connect_peers(self):
         """Discover peers from tracker and connect to them"""
-        peers = self.get_peer_list()
-        
+        self.connect_to_peers(self.get_peer_list())
+    
+    def connect_to_peers(self, peers):
+        """Connect to the peers of the list not connected yet"""
         for peer in peers:
             peer_id = peer.get('peer_id', '')
             
@@ -419,6 +463,24 @@ class PeerApp:
             if self.running:
                 self.send_heartbeat()
     
+    def watch_loop(self):
+        """Background thread waiting on the tracker for peer list changes,
+        connects to the peers as they join"""
+        while self.running:
+            if self.peers_version is None:
+                url = self.tracker_url + '/get-list/'
+            else:
+                url = self.tracker_url + '/watch/?since={}&timeout={}'.format(
+                    self.peers_version, WATCH_TIMEOUT)
+            try:
+                peers = self.update_peer_list(url, WATCH_TIMEOUT + 10)
+            except Exception as e:
+                print("[Tracker] Failed to watch peer list: {}".format(e))
+                time.sleep(WATCH_RETRY)
+                continue
+            if self.running:
+                self.connect_to_peers(peers)
+    
     # ========================================
     # Console UI
     # ========================================
@@ -522,6 +584,11 @@ class PeerApp:
         print("\nDiscovering peers...")
         self.discover_and_connect_peers()
         
+        # Connect to new peers as the tracker reports them
+        self.watch_thread = threading.Thread(target=self.watch_loop)
+        self.watch_thread.setDaemon(True)
+        self.watch_thread.start()
+        
         # Start P2P server in background thread
         def run_server():
             self.app.prepare_address('0.0.0.0', self.my_port)
@@ -21,28 +21,314 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
 import time
+import heapq
 import argparse
+import threading
+from collections import deque
 from daemon.weaprous import WeApRous
+from daemon.utils import etag_matches
+from daemon.compression import choose_encoding, compress_response
+from daemon.workerpool import DEFAULT_WORKERS
 
 # ============================================
 # TASK 2: TRACKER SERVER DEMO
 # ============================================
 
-app = WeApRous()
+# The peer registry lives in this process
+app = WeApRous(stateful=True)
 
-# In-memory peer storage (for demo)
-peers = {}
 PEER_TTL = 300
+# Seconds between two runs of the background reaper
+REAP_INTERVAL = 5
+# Membership changes kept for GET /get-list/?since=<version>
+CHANGE_LOG_SIZE = 1024
+# Seconds GET /watch/ holds a request by default, and at most
+WATCH_TIMEOUT = 25
+MAX_WATCH_TIMEOUT = 55
+# Share of the backend workers GET /watch/ may hold at once (1 in 4), the
+# others keep serving registrations and lists
+WATCHER_SHARE = 4
+
+
+class PeerRegistry(object):
+    """
+    In-memory peer storage shared by the tracker routes.
+
+    Peers expire PEER_TTL seconds after they last registered. Expiry times
+    are kept in a min-heap next to the peer dict: expiring is a pop of the
+    heap top instead of a scan of every peer. A peer that registers again
+    pushes a new expiry; the old heap entry no longer matches the peer and
+    is skipped when it reaches the top (lazy deletion).
+
+    Every join, leave or expiry bumps version. The GET /get-list/ response
+    of the current version is encoded once and reused until the next
+    change, its gzip or deflate variant as well; its ETag carries the
+    version so clients can revalidate.
+
+    The last CHANGE_LOG_SIZE changes are logged with their version, so a
+    client knowing the list at some version only fetches what changed
+    since. Versions start at the tracker's start time in milliseconds: a
+    version of a previous run is older than the log and gets the full list.
+
+    Changes are signalled on a condition bound to the registry lock:
+    wait_change() blocks the watchers until the version moves.
+    """
+
+    def __init__(self, ttl=PEER_TTL, max_watchers=DEFAULT_WORKERS // WATCHER_SHARE):
+        self.ttl = ttl
+        # Requests wait_change() holds at once
+        self.max_watchers = max_watchers
+        self._peers = {}
+        # (expires_at, peer_id), the soonest first
+        self._expiry = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._watchers = 0
+        self._reaper = None
+        self.version = int(time.time() * 1000)
+        # (version, etag, {content coding: encoded response}) of the last
+        # get-list, None is the identity coding
+        self._snapshot = None
+        # (version, peer info or None when removed, peer_id), oldest first
+        self._changes = deque()
+        # The log holds every change made after this version
+        self._log_floor = self.version
+
+    def register(self, ip, port):
+        """Add or refresh a peer, returns its peer_id"""
+        peer_id = "{}:{}".format(ip, port)
+        now = time.time()
+        with self._lock:
+            joined = peer_id not in self._peers
+            self._peers[peer_id] = {
+                'ip': ip,
+                'port': int(port),
+                'peer_id': peer_id,
+                'last_seen': now
+            }
+            if joined:
+                self._bump([peer_id])
+            self._push(peer_id, now + self.ttl)
+        return peer_id
+
+    def renew(self, peer_ids):
+        """
+        Extend the lease of registered peers by ttl seconds. The membership
+        does not change, so neither does the version nor the get-list
+        snapshot.
+
+        Returns (version, renewed count, ids of the unknown peers).
+        """
+        now = time.time()
+        renewed = 0
+        unknown = []
+        with self._lock:
+            for peer_id in peer_ids:
+                info = self._peers.get(peer_id)
+                if info is None:
+                    unknown.append(peer_id)
+                    continue
+                info['last_seen'] = now
+                self._push(peer_id, now + self.ttl)
+                renewed += 1
+            return self.version, renewed, unknown
+
+    def remove(self, peer_id):
+        """Unregister a peer, returns False if it was not registered"""
+        with self._lock:
+            # Its heap entry is dropped lazily
+            if self._peers.pop(peer_id, None) is None:
+                return False
+            self._bump([peer_id])
+            return True
 
+    def snapshot(self, encoding=None):
+        """
+        The get-list response of the current membership, built once per
+        version and content coding.
 
-def cleanup_expired_peers():
-    """Remove expired peers"""
-    current_time = time.time()
-    expired = [pid for pid, info in peers.items() 
-               if current_time - info['last_seen'] > PEER_TTL]
-    for pid in expired:
-        del peers[pid]
-        print "[Tracker] Removed expired peer: {}".format(pid)
+        Returns (version, etag, response) where response is the complete
+        HTTP response string, compressed with encoding (gzip, deflate or
+        None) when it is worth it, and etag its ETag, weak when compressed.
+        """
+        self.expire()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == self.version:
+                version, etag, variants = snapshot
+                if encoding in variants:
+                    return (version,) + variants[encoding]
+            else:
+                snapshot = None
+                version = self.version
+                peer_list = [_public(info) for info in self._peers.values()]
+        if snapshot is not None:
+            # Same version, compress the identity response
+            variant = _variant(variants[None][1], etag, encoding)
+            with self._lock:
+                variants[encoding] = variant
+            return (version,) + variant
+
+        etag = '"{}"'.format(version)
+        response_body = json.dumps({
+            'status': 'ok',
+            'mode': 'full',
+            'version': version,
+            'count': len(peer_list),
+            'peers': peer_list
+        })
+        response = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/json\r\n"
+            "Cache-Control: no-cache\r\n"
+            "ETag: {}\r\n"
+            "Content-Length: {}\r\n"
+            "\r\n"
+            "{}".format(etag, len(response_body), response_body)
+        )
+        variants = {None: _variant(response, etag, None)}
+        if encoding is not None:
+            variants[encoding] = _variant(response, etag, encoding)
+        with self._lock:
+            # Keep it unless the membership changed in the meantime
+            if self.version == version:
+                self._snapshot = (version, etag, variants)
+        return (version,) + variants[encoding]
+
+    def changes_since(self, since):
+        """
+        Peers added and removed after version since.
+
+        Returns the delta as a dict ready to be encoded, or None when the
+        change log no longer reaches back to since.
+        """
+        self.expire()
+        with self._lock:
+            if since < self._log_floor or since > self.version:
+                return None
+            # The last change of each peer wins
+            latest = {}
+            for version, info, peer_id in reversed(self._changes):
+                if version <= since:
+                    break
+                latest.setdefault(peer_id, info)
+            return {
+                'status': 'ok',
+                'mode': 'delta',
+                'since': since,
+                'version': self.version,
+                'added': [info for info in latest.values() if info is not None],
+                'removed': [pid for pid, info in latest.items() if info is None]
+            }
+
+    def wait_change(self, since, timeout):
+        """
+        Block until the version differs from since or timeout seconds
+        elapse, returns the current version.
+
+        Returns None at once when max_watchers requests are already waiting.
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            if self._watchers >= self.max_watchers:
+                return None
+            self._watchers += 1
+            try:
+                while self.version == since:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+            finally:
+                self._watchers -= 1
+            return self.version
+
+    def expire(self, now=None):
+        """Remove the peers whose TTL ran out, returns their ids"""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, peer_id = heapq.heappop(self._expiry)
+                info = self._peers.get(peer_id)
+                # Stale entry: removed, or registered again since
+                if info is None or info['last_seen'] + self.ttl != expires_at:
+                    continue
+                del self._peers[peer_id]
+                expired.append(peer_id)
+            if expired:
+                self._bump(expired)
+        for peer_id in expired:
+            print "[Tracker] Removed expired peer: {}".format(peer_id)
+        return expired
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        """Expire peers from a background thread every interval seconds"""
+        if self._reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.expire()
+
+        self._reaper = threading.Thread(target=run, name="peer-reaper")
+        self._reaper.setDaemon(True)  # Python 2 compatible
+        self._reaper.start()
+
+    def _bump(self, peer_ids):
+        """New version for the changes of peer_ids, lock held"""
+        self.version += 1
+        for peer_id in peer_ids:
+            self._log(peer_id)
+        self._changed.notify_all()
+
+    def _log(self, peer_id):
+        """Record the change of peer_id at the current version, lock held"""
+        info = self._peers.get(peer_id)
+        self._changes.append((self.version, _public(info) if info else None, peer_id))
+        if len(self._changes) > CHANGE_LOG_SIZE:
+            dropped = self._changes.popleft()[0]
+            # Changes of that version may now be incomplete
+            self._log_floor = max(self._log_floor, dropped)
+
+    def _push(self, peer_id, expires_at):
+        """Record an expiry, lock held"""
+        heapq.heappush(self._expiry, (expires_at, peer_id))
+        # Peers registering again leave stale entries, rebuild when they
+        # outnumber the live ones
+        if len(self._expiry) > 2 * len(self._peers) + 64:
+            self._expiry = [(info['last_seen'] + self.ttl, pid)
+                            for pid, info in self._peers.items()]
+            heapq.heapify(self._expiry)
+
+    def __len__(self):
+        return len(self._peers)
+
+
+def _public(info):
+    """The fields of a peer sent to clients"""
+    return {
+        'ip': info['ip'],
+        'port': info['port'],
+        'peer_id': info['peer_id']
+    }
+
+
+def _variant(response, etag, encoding):
+    """
+    The response compressed with encoding when it is worth it, and its
+    ETag: compress_response makes the ETag weak with the body
+    """
+    response = compress_response(response, encoding)
+    head = response[:response.find("\r\n\r\n")]
+    if "\r\nContent-Encoding:" in head:
+        etag = 'W/' + etag
+    return etag, response
+
+
+# In-memory peer storage (for demo)
+registry = PeerRegistry()
 
 
 @app.route('/submit-info/', methods=['POST'])
@@ -70,14 +356,8 @@ def submit_info(headers="", body=""):
                 "{}".format(len(response_body), response_body)
             )
         
-        peer_id = "{}:{}".format(peer_ip, peer_port)
-        peers[peer_id] = {
-            'ip': peer_ip,
-            'port': int(peer_port),
-            'peer_id': peer_id,
-            'last_seen': time.time()
-        }
-        print "[Tracker] Registered: {} - Total: {}".format(peer_id, len(peers))
+        peer_id = registry.register(peer_ip, peer_port)
+        print "[Tracker] Registered: {} - Total: {}".format(peer_id, len(registry))
         
         response_body = json.dumps({
             'status': 'ok',
@@ -103,32 +383,181 @@ def submit_info(headers="", body=""):
         )
 
 
+def _list_response(headers, since):
+    """
+    The get-list response for a client knowing the list at version since
+    (None if it knows nothing): the delta when the change log reaches back
+    to since, the full list otherwise, 304 Not Modified when the
+    If-None-Match ETag of the client is the current version
+    """
+    if since is not None:
+        delta = registry.changes_since(since)
+        if delta is not None:
+            print "[Tracker] Returning {} changes since version {}".format(
+                len(delta['added']) + len(delta['removed']), since)
+            response_body = json.dumps(delta)
+            return (
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: application/json\r\n"
+                "Cache-Control: no-cache\r\n"
+                "Content-Length: {}\r\n"
+                "\r\n"
+                "{}".format(len(response_body), response_body)
+            )
+        print "[Tracker] Version {} is older than the change log".format(since)
+
+    accept_encoding = headers.get('accept-encoding') if hasattr(headers, 'get') else None
+    version, etag, response = registry.snapshot(choose_encoding(accept_encoding))
+
+    if_none_match = headers.get('if-none-match') if hasattr(headers, 'get') else None
+    if etag_matches(if_none_match, etag):
+        print "[Tracker] Peer list unchanged (version {})".format(version)
+        return (
+            "HTTP/1.1 304 Not Modified\r\n"
+            "Cache-Control: no-cache\r\n"
+            "ETag: {}\r\n"
+            "Vary: Accept-Encoding\r\n"
+            "\r\n".format(etag)
+        )
+
+    print "[Tracker] Returning peer list version {}".format(version)
+    return response
+
+
+def _bad_request(message):
+    """400 Bad Request response with a JSON error"""
+    response_body = json.dumps({'error': message})
+    return (
+        "HTTP/1.1 400 Bad Request\r\n"
+        "Content-Type: application/json\r\n"
+        "Content-Length: {}\r\n"
+        "\r\n"
+        "{}".format(len(response_body), response_body)
+    )
+
+
 @app.route('/get-list/', methods=['GET'])
-def get_list(headers="", body=""):
+def get_list(headers="", body="", query=None):
     """
     Task 2: GET /get-list/ - Get peer list
-    Returns HTTP response string with JSON body
+    Returns HTTP response string with JSON body, or 304 Not Modified when
+    the If-None-Match ETag of the client is the current version
+
+    With ?since=<version> only the peers added and removed since that
+    version are returned ("mode": "delta"), or the full list ("mode":
+    "full") when the change log does not reach back that far
     """
     print "[Tracker] GET /get-list/"
     
     try:
-        cleanup_expired_peers()
+        since = (query or {}).get('since')
+        if since is not None:
+            if not since.isdigit():
+                return _bad_request('since must be a version number')
+            since = int(since)
+        return _list_response(headers, since)
         
-        peer_list = [
-            {
-                'ip': info['ip'],
-                'port': info['port'],
-                'peer_id': info['peer_id']
-            }
-            for info in peers.values()
-        ]
+    except Exception as e:
+        print "[Tracker] ERROR: {}".format(e)
+        response_body = json.dumps({'error': str(e)})
+        return (
+            "HTTP/1.1 500 Internal Server Error\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "\r\n"
+            "{}".format(len(response_body), response_body)
+        )
+
+
+@app.route('/watch/', methods=['GET'], blocking=True)
+def watch(headers="", body="", query=None):
+    """
+    Task 2: GET /watch/?since=<version>[&timeout=<seconds>] - Wait for
+    membership changes
+    Holds the request until the peer list moves past version since, then
+    answers as GET /get-list/?since=<version>. After timeout seconds
+    (WATCH_TIMEOUT by default, MAX_WATCH_TIMEOUT at most) the answer is an
+    empty delta at the same version, 503 when the registry's max_watchers
+    requests are already held
+
+    The request parks a backend worker thread, the route is refused by the
+    single-threaded event engine
+    """
+    print "[Tracker] GET /watch/"
+    
+    try:
+        query = query or {}
+        since = query.get('since', '')
+        timeout = query.get('timeout', str(WATCH_TIMEOUT))
+        if not since.isdigit():
+            return _bad_request('since must be a version number')
+        if not timeout.isdigit():
+            return _bad_request('timeout must be a number of seconds')
+        since = int(since)
+        
+        version = registry.wait_change(since, min(int(timeout), MAX_WATCH_TIMEOUT))
+        if version is None:
+            print "[Tracker] Too many watchers, try again later"
+            response_body = json.dumps({'error': 'Too many watchers'})
+            return (
+                "HTTP/1.1 503 Service Unavailable\r\n"
+                "Content-Type: application/json\r\n"
+                "Retry-After: 5\r\n"
+                "Content-Length: {}\r\n"
+                "\r\n"
+                "{}".format(len(response_body), response_body)
+            )
+        if version == since:
+            print "[Tracker] No change since version {}".format(since)
+        return _list_response(headers, since)
+        
+    except Exception as e:
+        print "[Tracker] ERROR: {}".format(e)
+        response_body = json.dumps({'error': str(e)})
+        return (
+            "HTTP/1.1 500 Internal Server Error\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "\r\n"
+            "{}".format(len(response_body), response_body)
+        )
+
+
+@app.route('/heartbeat/', methods=['POST'])
+def heartbeat(headers="", body=""):
+    """
+    Task 2: POST /heartbeat/ - Renew peer leases
+    Accepts {"peer_id": ...} or {"peer_ids": [...]} and returns the current
+    membership version, so peers know whether their list is still up to
+    date, with the ids the tracker does not know (expired, they must
+    register again)
+    """
+    try:
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            print "[Tracker] ERROR: Heartbeat body is not a JSON object"
+            return _bad_request('Body must be a JSON object')
+        peer_ids = data.get('peer_ids')
+        if peer_ids is None:
+            peer_ids = [data['peer_id']] if data.get('peer_id') else []
         
-        print "[Tracker] Returning {} peers".format(len(peer_list))
+        if (not peer_ids or not isinstance(peer_ids, list)
+                or not all(isinstance(pid, basestring) for pid in peer_ids)):
+            print "[Tracker] ERROR: Missing peer_id"
+            return _bad_request('Missing peer_id or peer_ids')
+        
+        version, renewed, unknown = registry.renew(peer_ids)
+        if unknown:
+            print "[Tracker] Heartbeat from unknown peers: {}".format(", ".join(unknown))
         
         response_body = json.dumps({
             'status': 'ok',
-            'count': len(peer_list),
-            'peers': peer_list
+            'version': version,
+            'renewed': renewed,
+            'unknown': unknown
         })
         return (
             "HTTP/1.1 200 OK\r\n"
@@ -174,9 +603,8 @@ def remove_peer(headers="", body=""):
                 "{}".format(len(response_body), response_body)
             )
         
-        if peer_id in peers:
-            del peers[peer_id]
-            print "[Tracker] Unregistered: {} - Total: {}".format(peer_id, len(peers))
+        if registry.remove(peer_id):
+            print "[Tracker] Unregistered: {} - Total: {}".format(peer_id, len(registry))
             response_body = json.dumps({'status': 'ok', 'message': 'Peer unregistered'})
             status = "HTTP/1.1 200 OK\r\n"
         else:
@@ -210,6 +638,7 @@ if __name__ == '__main__':
     )
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
     
     args = parser.parse_args()
     
@@ -226,8 +655,12 @@ if __name__ == '__main__':
     print("Routes registered:")
     print("  - POST /submit-info/  : Print registration info")
     print("  - GET  /get-list/     : Print peer list")
+    print("  - GET  /watch/        : Wait for peer list changes")
+    print("  - POST /heartbeat/    : Renew peer leases")
     print("  - POST /remove/       : Unregister peer")
     print("=" * 60)
     
+    registry.max_watchers = max(1, args.workers // WATCHER_SHARE)
+    registry.start_reaper()
     app.prepare_address(args.server_ip, args.server_port)
-    app.run()
+    app.run(workers=args.workers)
@@ -18,4 +18,6 @@ from .response import Response
 from .request import Request
 from .backend import create_backend
 from .httpadapter import HttpAdapter
-from .dictionary import CaseInsensitiveDict
\ No newline at end of file
+from .dictionary import CaseInsensitiveDict
+from .workerpool import WorkerPool
+from .routing import RouteTable
\ No newline at end of file
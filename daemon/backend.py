@@ -17,13 +17,14 @@ daemon.backend
 
 This module provides a backend object to manage and persist backend daemon. 
 It implements a basic backend server using Python's socket and threading libraries.
-It supports handling multiple client connections concurrently and routing requests using a
-custom HTTP adapter.
+It supports handling multiple client connections concurrently on a bounded pool of
+worker threads and routing requests using a custom HTTP adapter.
 
 Requirements:
 --------------
 - socket: provide socket networking interface.
 - threading: Enables concurrent client handling via threads.
+- workerpool: fixed-size pool of worker threads with a bounded accept queue.
 - response: response utilities.
 - httpadapter: the class for handling HTTP requests.
 - CaseInsensitiveDict: provides dictionary for managing headers or routes.
@@ -31,9 +32,17 @@ Requirements:
 
 Notes:
 ------
-- The server create daemon threads for client handling.
+- Accepted connections are queued to a fixed set of daemon worker threads. When the
+  queue is full the client is answered with 503 Service Unavailable and closed.
 - The current implementation error handling is minimal, socket errors are printed to the console.
 - The actual request processing is delegated to the HttpAdapter class.
+- ``engine='event'`` swaps the worker pool for the single-threaded non-blocking
+  loop of :mod:`daemon.eventloop`.
+  Routes registered with ``blocking=True`` (long polls) are refused there,
+  their hooks would stall the loop.
+- Routes of a ``WeApRous(stateful=True)`` app are refused with ``processes > 1``.
+- ``processes > 1`` runs the chosen engine in pre-forked worker processes managed
+  by :mod:`daemon.prefork`, so Python work spreads over several cores.
 
 Usage Example:
 --------------
@@ -46,10 +55,20 @@ import threading
 import argparse
 
 from .response import *
-from .httpadapter import HttpAdapter
+from .httpadapter import HttpAdapter, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
 from .dictionary import CaseInsensitiveDict
+from .workerpool import WorkerPool, DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+from .eventloop import run_event_backend
+from .utils import create_listener
 
-def handle_client(ip, port, conn, addr, routes):
+#: Available serving engines, the first one is the default.
+ENGINES = ('threaded', 'event')
+
+#: Seconds allowed to deliver the 503 answer to a rejected client.
+REJECT_TIMEOUT = 1.0
+
+def handle_client(ip, port, conn, addr, routes,
+                  keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX, busy=None):
     """
     Initializes an HttpAdapter instance and delegates the client handling logic to it.
 
@@ -58,58 +77,151 @@ def handle_client(ip, port, conn, addr, routes):
     :param conn (socket.socket): Client connection socket.
     :param addr (tuple): client address (IP, port).
     :param routes (dict): Dictionary of route handlers.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param keepalive_max (int): maximum number of requests served per connection.
+    :param busy (callable): tells whether other connections wait for a worker.
     """
-    daemon = HttpAdapter(ip, port, conn, addr, routes)
+    daemon = HttpAdapter(ip, port, conn, addr, routes, keepalive_timeout, keepalive_max, busy)
 
     # Handle client
     daemon.handle_client(conn, addr, routes)
 
-def run_backend(ip, port, routes):
+def reject_client(conn, addr):
     """
-    Starts the backend server, binds to the specified IP and port, and listens for incoming
-    connections. Each connection is handled in a separate thread. The backend accepts incoming
-    connections and spawns a thread for each client.
+    Answers an overloaded-server error to a client that could not be queued
+    and closes its connection.
 
+    :param conn (socket.socket): Client connection socket.
+    :param addr (tuple): client address (IP, port).
+    """
+    print("[Backend] Worker queue full, rejecting {}:{}".format(addr[0], addr[1]))
+    try:
+        # Never let a slow client stall the accept loop.
+        conn.settimeout(REJECT_TIMEOUT)
+        conn.sendall(Response().build_response_error(503, "Server overloaded, retry later"))
+    except socket.error:
+        pass
+    finally:
+        conn.close()
+
+def serve_backend(server, ip, port, routes, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                  keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX):
+    """
+    Runs the accept loop on an already listening socket. Each connection is queued to a
+    fixed-size pool of worker threads; when ``queue_size`` connections are already waiting,
+    new clients get a 503 response. Persistent connections are not kept open while
+    connections wait in the queue, so idle clients never hold every worker.
 
-    :param ip (str): IP address to bind the server.
-    :param port (int): Port number to listen on.
+    The loop ends when the listening socket fails or is closed (e.g. on shutdown); the
+    clients already accepted are served before the function returns.
+
+    :param server (socket.socket): bound and listening server socket.
+    :param ip (str): IP address the server is bound to.
+    :param port (int): Port number the server is listening on.
     :param routes (dict): Dictionary of route handlers.
+    :param workers (int): Number of worker threads handling clients.
+    :param queue_size (int): Number of accepted connections allowed to wait for a worker.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param keepalive_max (int): maximum number of requests served per connection.
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-    # server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    pool = WorkerPool(workers, queue_size, name="backend")
+    pool.start()
+    busy = lambda: pool.pending() > 0
+    print("[Backend] {} workers, accept queue of {}".format(workers, queue_size))
 
     try:
-        server.bind((ip, port))
-        server.listen(50)
-        print("[Backend] Listening on port {}".format(port))
-        if routes != {}:
-            print("[Backend] route settings {}".format(routes))
-
         while True:
             conn, addr = server.accept()
             #
             #        implement the step of the client incomping connection
-            #        using multi-thread programming with the
+            #        using the bounded worker pool with the
             #        provided handle_client routine
             #
-            # Tạo thread mới cho mỗi client
-            client_thread = threading.Thread(
-                target=handle_client, 
-                args=(ip, port, conn, addr, routes)
-            )
-            client_thread.setDaemon(True)  # Python 2 compatible
-            client_thread.start()
+            if not pool.submit(handle_client, ip, port, conn, addr, routes,
+                               keepalive_timeout, keepalive_max, busy):
+                reject_client(conn, addr)
     except socket.error as e:
         print("Socket error: {}".format(e))
 
-def create_backend(ip, port, routes={}):
+    # Let the workers finish the clients already accepted.
+    pool.shutdown(wait=True)
+
+def run_backend(ip, port, routes, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX):
+    """
+    Starts the backend server, binds to the specified IP and port, and listens for incoming
+    connections, which are served by :func:`serve_backend`.
+
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param workers (int): Number of worker threads handling clients.
+    :param queue_size (int): Number of accepted connections allowed to wait for a worker.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param keepalive_max (int): maximum number of requests served per connection.
+    """
+    try:
+        server = create_listener(ip, port)
+    except socket.error as e:
+        print("Socket error: {}".format(e))
+        return
+
+    print("[Backend] Listening on port {}".format(port))
+    if routes != {}:
+        print("[Backend] route settings {}".format(routes))
+
+    serve_backend(server, ip, port, routes, workers, queue_size, keepalive_timeout, keepalive_max)
+
+def create_backend(ip, port, routes={}, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                   keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX,
+                   engine=ENGINES[0], processes=1, reuse_port=False):
     """
     Entry point for creating and running the backend server.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict, optional): Dictionary of route handlers. Defaults to empty dict.
+    :param workers (int, optional): Number of worker threads handling clients.
+    :param queue_size (int, optional): Number of accepted connections allowed to wait
+                                       for a worker before new ones get a 503.
+    :param keepalive_timeout (float, optional): idle seconds before a persistent
+                                                connection is closed.
+    :param keepalive_max (int, optional): maximum number of requests served per connection.
+    :param engine (str, optional): ``threaded`` (worker pool) or ``event`` (single-threaded
+                                   non-blocking loop). The event engine ignores ``workers``
+                                   and ``queue_size``.
+    :param processes (int, optional): number of pre-forked worker processes. Above 1 a
+                                      supervisor runs the chosen engine in each of them;
+                                      refused for the routes of stateful apps.
+    :param reuse_port (bool, optional): with several processes, let each one bind the port
+                                        through SO_REUSEPORT instead of sharing the socket
+                                        inherited from the supervisor.
     """
 
-    run_backend(ip, port, routes)
\ No newline at end of file
+    if engine not in ENGINES:
+        raise ValueError("Unknown backend engine {}, expected one of {}".format(engine, ENGINES))
+    if processes > 1:
+        # Every worker process would hold its own copy of the state.
+        stateful = sorted(set(hook._route_path for hook in routes.values()
+                              if getattr(hook, '_route_stateful', False)))
+        if stateful:
+            raise ValueError("Routes {} keep state in the process, they cannot be served "
+                             "by several processes".format(", ".join(stateful)))
+    if engine == 'event':
+        # Hooks run on the loop thread, a waiting one would stall every client.
+        blocking = sorted(set(hook._route_path for hook in routes.values()
+                              if getattr(hook, '_route_blocking', False)))
+        if blocking:
+            raise ValueError("Routes {} block, the event engine cannot serve them".format(
+                ", ".join(blocking)))
+
+    if processes > 1:
+        # Imported here, the supervisor is built on top of this module.
+        from .prefork import run_prefork
+        run_prefork(ip, port, routes, processes, reuse_port, engine,
+                    workers, queue_size, keepalive_timeout, keepalive_max)
+    elif engine == 'event':
+        run_event_backend(ip, port, routes, keepalive_timeout, keepalive_max)
+    elif engine == 'threaded':
+        run_backend(ip, port, routes, workers, queue_size, keepalive_timeout, keepalive_max)
\ No newline at end of file
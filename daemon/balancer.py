@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.balancer
+~~~~~~~~~~~~~~~~~
+
+This module provides the load-balancing policies of the proxy, selected per
+virtual host by ``dist_policy`` in config/proxy.conf:
+
+- ``round-robin``: upstreams in turn, weighted when weights are configured.
+- ``weighted-round-robin``: smooth weighted round-robin, as in NGINX: an
+  upstream of weight 3 gets 3 requests out of 4 next to one of weight 1,
+  interleaved rather than in bursts.
+- ``least-conn``: the upstream with the fewest requests in progress relative
+  to its weight.
+- ``ip-hash``: the client IP is mapped on a consistent-hash ring, so a client
+  sticks to one upstream and only the clients of a removed upstream move.
+
+Weights come from ``proxy_pass http://host:port weight=N;``, 1 by default.
+
+Requirements:
+--------------
+- threading: balancers and counters are shared by every proxy thread.
+- hashlib / bisect: the consistent-hash ring of ``ip-hash``.
+
+Usage Example:
+--------------
+>>> balancer = get_balancer("app2.local", ["10.0.0.1:9002", "10.0.0.2:9002"], "least-conn")
+>>> upstream = balancer.choose("192.168.1.7", usable=health.is_available)
+>>> ACTIVE_REQUESTS.begin(upstream)
+>>> ACTIVE_REQUESTS.end(upstream)
+"""
+
+import bisect
+import hashlib
+import threading
+
+#: Policy used when a host has none or an unknown one.
+DEFAULT_POLICY = 'round-robin'
+#: Points each unit of weight puts on the ``ip-hash`` ring.
+RING_REPLICAS = 100
+
+
+class ActiveCounter(object):
+    """The :class:`ActiveCounter <ActiveCounter>` object, which counts the
+    requests in progress per upstream for ``least-conn``.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def begin(self, upstream):
+        """Record a request sent to ``upstream``."""
+        with self._lock:
+            self._counts[upstream] = self._counts.get(upstream, 0) + 1
+
+    def end(self, upstream):
+        """Record the end of a request sent to ``upstream``."""
+        with self._lock:
+            count = self._counts.get(upstream, 0) - 1
+            if count > 0:
+                self._counts[upstream] = count
+            else:
+                self._counts.pop(upstream, None)
+
+    def get(self, upstream):
+        """Requests currently in progress on ``upstream``."""
+        return self._counts.get(upstream, 0)
+
+#: Requests in progress per upstream, across every virtual host.
+ACTIVE_REQUESTS = ActiveCounter()
+
+
+class Balancer(object):
+    """Base class of the policies: picks one of ``upstreams`` per request.
+
+    :attrs upstreams (list): ``host:port`` strings.
+    :attrs weights (list): positive weight of each upstream.
+    """
+
+    def __init__(self, upstreams, weights=None):
+        self.upstreams = list(upstreams)
+        self.weights = list(weights) if weights else [1] * len(self.upstreams)
+        self._lock = threading.Lock()
+
+    def choose(self, client_ip=None, usable=None):
+        """
+        Pick the upstream of the next request.
+
+        :params client_ip (str): address of the client, used by ``ip-hash``.
+        :params usable (callable): predicate rejecting the upstreams that must
+                                   not be picked (ejected, already tried).
+
+        :rtype str: one of :attr:`upstreams`, None if none is usable.
+        """
+        raise NotImplementedError
+
+
+class RoundRobinBalancer(Balancer):
+    """Upstreams in turn, ignoring weights."""
+
+    def __init__(self, upstreams, weights=None):
+        super(RoundRobinBalancer, self).__init__(upstreams, weights)
+        self._next = 0
+
+    def choose(self, client_ip=None, usable=None):
+        count = len(self.upstreams)
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % count
+        for offset in range(count):
+            upstream = self.upstreams[(start + offset) % count]
+            if usable is None or usable(upstream):
+                return upstream
+        return None
+
+
+class WeightedRoundRobinBalancer(Balancer):
+    """Smooth weighted round-robin: every pick raises each upstream's current
+    weight by its weight, takes the highest and lowers it by the total.
+    """
+
+    def __init__(self, upstreams, weights=None):
+        super(WeightedRoundRobinBalancer, self).__init__(upstreams, weights)
+        self._current = [0] * len(self.upstreams)
+
+    def choose(self, client_ip=None, usable=None):
+        with self._lock:
+            best, total = None, 0
+            for i, weight in enumerate(self.weights):
+                if usable is not None and not usable(self.upstreams[i]):
+                    continue
+                self._current[i] += weight
+                total += weight
+                if best is None or self._current[i] > self._current[best]:
+                    best = i
+            if best is None:
+                return None
+            self._current[best] -= total
+        return self.upstreams[best]
+
+
+class LeastConnBalancer(Balancer):
+    """The upstream with the fewest requests in progress per unit of weight,
+    ties going round-robin so idle upstreams share the load.
+    """
+
+    def __init__(self, upstreams, weights=None, active=ACTIVE_REQUESTS):
+        super(LeastConnBalancer, self).__init__(upstreams, weights)
+        self.active = active
+        self._next = 0
+
+    def choose(self, client_ip=None, usable=None):
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % len(self.upstreams)
+        count = len(self.upstreams)
+        best, best_load = None, None
+        for offset in range(count):
+            i = (start + offset) % count
+            if usable is not None and not usable(self.upstreams[i]):
+                continue
+            load = float(self.active.get(self.upstreams[i])) / self.weights[i]
+            if best is None or load < best_load:
+                best, best_load = i, load
+        return self.upstreams[best] if best is not None else None
+
+
+class IpHashBalancer(Balancer):
+    """Consistent hashing of the client IP over a ring holding
+    ``RING_REPLICAS * weight`` points per upstream.
+    """
+
+    def __init__(self, upstreams, weights=None):
+        super(IpHashBalancer, self).__init__(upstreams, weights)
+        ring = []
+        for upstream, weight in zip(self.upstreams, self.weights):
+            for replica in range(RING_REPLICAS * weight):
+                ring.append((_hash("{}#{}".format(upstream, replica)), upstream))
+        ring.sort()
+        self._points = [point for point, _ in ring]
+        self._owners = [upstream for _, upstream in ring]
+
+    def choose(self, client_ip=None, usable=None):
+        index = bisect.bisect(self._points, _hash(client_ip or ''))
+        # Walk the ring clockwise past the unusable upstreams.
+        rejected = set()
+        for offset in range(len(self._owners)):
+            upstream = self._owners[(index + offset) % len(self._owners)]
+            if upstream in rejected:
+                continue
+            if usable is None or usable(upstream):
+                return upstream
+            rejected.add(upstream)
+            if len(rejected) == len(self.upstreams):
+                break
+        return None
+
+
+def _hash(key):
+    """Stable 32-bit hash, identical across processes and restarts."""
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:8], 16)
+
+
+#: Policy name to balancer class.
+POLICIES = {
+    'round-robin': RoundRobinBalancer,
+    'weighted-round-robin': WeightedRoundRobinBalancer,
+    'least-conn': LeastConnBalancer,
+    'ip-hash': IpHashBalancer,
+}
+
+_balancers = {}
+_balancers_lock = threading.Lock()
+
+
+def get_balancer(hostname, upstreams, policy, weights=None):
+    """
+    Return the balancer of a virtual host, created on first use and shared by
+    later requests so its counters persist.
+
+    :params hostname (str): virtual host the balancer serves.
+    :params upstreams (list): ``host:port`` strings of the host.
+    :params policy (str): name of a policy in :data:`POLICIES`.
+    :params weights (list): weight of each upstream, None for all 1.
+
+    :rtype Balancer: the balancer.
+    """
+    weights = tuple(weights) if weights else (1,) * len(upstreams)
+    key = (hostname, tuple(upstreams), weights, policy)
+    balancer = _balancers.get(key)
+    if balancer is not None:
+        return balancer
+
+    cls = POLICIES.get(policy)
+    if cls is None:
+        print("[Balancer] unknown dist_policy {} for {}, using {}".format(
+            policy, hostname, DEFAULT_POLICY))
+        cls = POLICIES[DEFAULT_POLICY]
+    if cls is RoundRobinBalancer and len(set(weights)) > 1:
+        cls = WeightedRoundRobinBalancer
+
+    with _balancers_lock:
+        balancer = _balancers.get(key)
+        if balancer is None:
+            # Drop the balancer of a previous configuration of this host.
+            for old in [k for k in _balancers if k[0] == hostname]:
+                del _balancers[old]
+            balancer = _balancers[key] = cls(upstreams, weights)
+    return balancer
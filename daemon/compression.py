@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.compression
+~~~~~~~~~~~~~~~~~
+
+This module provides the HTTP content-coding helpers: negotiating gzip or
+deflate from the request's Accept-Encoding, compressing bodies with zlib and
+rewriting complete responses produced by WeApRous hooks.
+
+Static files are compressed once per file version by
+:class:`FileCache <FileCache>`; hook responses are dynamic and compressed on
+every request, which is why they must reach :data:`MIN_COMPRESS_SIZE` first.
+
+Requirements:
+--------------
+- zlib: gzip (wbits 31) and zlib-wrapped deflate (wbits 15) streams.
+
+Notes:
+------
+- Brotli is not in the standard library and is not offered.
+- Responses that already have a Content-Encoding, no Content-Length, or a
+  status other than 200 are left untouched.
+- A compressed response keeps its validator, weakened as for static files:
+  the bytes differ from the identity variant's.
+
+Usage Example:
+--------------
+>>> encoding = choose_encoding("gzip, deflate;q=0.5")
+>>> response = compress_response(response, encoding)
+"""
+
+import zlib
+
+#: Bodies shorter than this are sent uncompressed, in bytes.
+MIN_COMPRESS_SIZE = 1024
+#: zlib compression level, 6 is the usual speed/ratio trade-off.
+COMPRESS_LEVEL = 6
+#: Content codings offered, in order of preference.
+ENCODINGS = ('gzip', 'deflate')
+
+#: MIME types worth compressing besides every ``text/*`` type.
+COMPRESSIBLE_TYPES = frozenset([
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+])
+
+_WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def is_compressible(content_type):
+    """Tell whether a body of ``content_type`` is worth compressing."""
+    mime_type = (content_type or '').split(';', 1)[0].strip().lower()
+    return mime_type.startswith('text/') or mime_type in COMPRESSIBLE_TYPES
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the content coding to use for a request.
+
+    :param accept_encoding (str): value of the Accept-Encoding header.
+
+    :rtype str: ``gzip`` or ``deflate``, None for the identity coding.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    for encoding in ENCODINGS:
+        if weights.get(encoding, weights.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    """
+    Compress ``data`` with the content coding ``encoding``.
+
+    :param data (bytes): body to compress.
+    :param encoding (str): ``gzip`` or ``deflate``.
+
+    :rtype bytes: the encoded body.
+    """
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_response(response, encoding):
+    """
+    Compress the body of a complete HTTP response when it is worth it, and
+    add the Content-Encoding and Vary headers. A strong ETag is made weak.
+
+    :param response (bytes): status line, headers and body.
+    :param encoding (str): coding chosen by :func:`choose_encoding`, or None.
+
+    :rtype bytes: the response to send, unchanged if not compressed.
+    """
+    header_end = response.find(b"\r\n\r\n")
+    if header_end < 0:
+        return response
+    status_line, _, fields = response[:header_end].partition(b"\r\n")
+    body = response[header_end + 4:]
+
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or parts[1] != b"200":
+        return response
+    names = {}
+    for line in fields.split(b"\r\n"):
+        if b':' in line:
+            key, val = line.split(b':', 1)
+            names[key.strip().lower()] = val.strip()
+    if b'content-encoding' in names or not is_compressible(names.get(b'content-type')):
+        return response
+    if names.get(b'content-length') != str(len(body)).encode('ascii'):
+        # Unknown or inconsistent framing, do not touch it.
+        return response
+
+    vary = b"Vary: Accept-Encoding\r\n"
+    if b'accept-encoding' in names.get(b'vary', b'').lower():
+        # Pre-encoded responses already vary on it, keep them as they are.
+        vary = b""
+    identity = response
+    if vary:
+        identity = status_line + b"\r\n" + vary + response[len(status_line) + 2:]
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return identity
+    encoded = compress(body, encoding)
+    if len(encoded) >= len(body):
+        return identity
+
+    replaced = (b'content-length', b'etag')
+    kept = [line for line in fields.split(b"\r\n")
+            if line and line.split(b':', 1)[0].strip().lower() not in replaced]
+    etag = names.get(b'etag')
+    if etag and not etag.startswith(b'W/'):
+        # Same validator, weak: the bytes differ from the identity body.
+        etag = b'W/' + etag
+    head = (status_line + b"\r\n" + vary
+            + "Content-Encoding: {}\r\nContent-Length: {}\r\n".format(encoding, len(encoded)).encode('ascii')
+            + (b"ETag: " + etag + b"\r\n" if etag else b"")
+            + b"".join(line + b"\r\n" for line in kept))
+    return head + b"\r\n" + encoded
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.eventloop
+~~~~~~~~~~~~~~~~~
+
+This module provides a single-threaded, non-blocking backend engine as an
+alternative to the thread-per-connection model of :mod:`daemon.backend`.
+One loop multiplexes every client socket with epoll (Linux), poll or select
+and drives each connection through a small state machine::
+
+    READING --(request complete)--> WRITING --(response sent)--> READING
+                                            \\--(close)--------> CLOSED
+
+Request preparation, WeApRous hook dispatch and response building reuse the
+:class:`HttpAdapter <HttpAdapter>` logic, so both engines serve the same
+content while this one holds idle keep-alive connections without a thread
+each.
+
+Requirements:
+--------------
+- select: epoll/poll/select readiness notification.
+- httpadapter: dispatching and connection header handling.
+- request: :class:`Request <Request>` preparation.
+- httpparser: incremental request parsing of the connection buffers.
+- zerocopy: non-blocking ``sendfile`` of large static files.
+
+Notes:
+------
+- Python 2 has no ``selectors`` module, :class:`Poller <Poller>` wraps the
+  best API the platform offers instead.
+- Route hooks run inline on the loop thread; a hook that blocks stalls every
+  connection, so slow hooks belong on the threaded engine.
+
+Usage Example:
+--------------
+>>> run_event_backend("127.0.0.1", 9000, routes={})
+"""
+
+import errno
+import select
+import socket
+import time
+
+from .request import Request
+from .response import Response
+from .httpparser import HttpParser, HttpParserError, REQUEST
+from .httpadapter import HttpAdapter, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
+from .zerocopy import send_once
+from .utils import create_listener
+
+#: Readiness flags, numerically identical for epoll and poll.
+READ = 0x001
+WRITE = 0x004
+ERROR = 0x008 | 0x010
+
+#: Seconds between two sweeps for idle connections.
+SWEEP_INTERVAL = 1.0
+
+_RETRY = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+
+class Poller(object):
+    """The :class:`Poller <Poller>` object, which waits for readiness of many
+    file descriptors at once using epoll, poll or select, in that order of
+    preference.
+
+    :attrs kind (str): the underlying API, ``epoll``, ``poll`` or ``select``.
+    """
+
+    def __init__(self):
+        if hasattr(select, 'epoll'):
+            self.kind = 'epoll'
+            self._poll = select.epoll()
+        elif hasattr(select, 'poll'):
+            self.kind = 'poll'
+            self._poll = select.poll()
+        else:
+            self.kind = 'select'
+            self._poll = None
+        self._fds = {}
+
+    def register(self, fd, events):
+        """Start watching ``fd`` for ``events`` (READ and/or WRITE)."""
+        self._fds[fd] = events
+        if self._poll is not None:
+            self._poll.register(fd, events)
+
+    def modify(self, fd, events):
+        """Change the events watched on an already registered ``fd``."""
+        if self._fds.get(fd) == events:
+            return
+        self._fds[fd] = events
+        if self._poll is not None:
+            self._poll.modify(fd, events)
+
+    def unregister(self, fd):
+        """Stop watching ``fd``. Must be called before the socket is closed."""
+        if self._fds.pop(fd, None) is None:
+            return
+        if self._poll is not None:
+            self._poll.unregister(fd)
+
+    def poll(self, timeout):
+        """
+        Wait until at least one registered descriptor is ready.
+
+        :params timeout (float): seconds to wait at most.
+
+        :rtype list: (fd, events) pairs, hang-ups and errors reported as ERROR.
+        """
+        try:
+            if self.kind == 'epoll':
+                return self._poll.poll(timeout)
+            if self.kind == 'poll':
+                return self._poll.poll(int(timeout * 1000))
+            return self._select(timeout)
+        except (IOError, OSError, select.error) as e:
+            if e.args and e.args[0] == errno.EINTR:
+                return []
+            raise
+
+    def _select(self, timeout):
+        readers = [fd for fd, events in self._fds.items() if events & READ]
+        writers = [fd for fd, events in self._fds.items() if events & WRITE]
+        readable, writable, failed = select.select(readers, writers, readers + writers, timeout)
+        ready = {}
+        for fd in readable:
+            ready[fd] = ready.get(fd, 0) | READ
+        for fd in writable:
+            ready[fd] = ready.get(fd, 0) | WRITE
+        for fd in failed:
+            ready[fd] = ready.get(fd, 0) | ERROR
+        return list(ready.items())
+
+
+class _Connection(object):
+    """Per-client state driven by the event loop."""
+
+    def __init__(self, sock, addr, adapter):
+        self.sock = sock
+        self.addr = addr
+        self.fd = sock.fileno()
+        self.adapter = adapter
+        #: Incremental parser holding the received, not yet consumed bytes.
+        self.parser = HttpParser(REQUEST)
+        #: Request being received and its body pieces.
+        self.request = Request()
+        self.body = []
+        #: Remaining response bytes, None while reading.
+        self.out = None
+        #: Body parts still to send after ``out`` (see ``Response._stream``).
+        self.segments = []
+        #: File being streamed with its next offset and bytes left to send.
+        self.file = None
+        self.offset = 0
+        self.remaining = 0
+        self.keep_alive = True
+        self.served = 0
+        self.last_active = time.time()
+
+
+class EventBackend(object):
+    """The :class:`EventBackend <EventBackend>` object, which serves every
+    client of a listening socket from one non-blocking loop.
+
+    :attrs ip (str): IP address the server is bound to.
+    :attrs port (int): port the server is listening on.
+    :attrs routes (dict): mapping of (method, path) to WeApRous hooks.
+    :attrs keepalive_timeout (float): idle seconds before a connection is closed.
+    :attrs keepalive_max (int): maximum number of requests served per connection.
+    """
+
+    def __init__(self, ip, port, routes,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.keepalive_timeout = keepalive_timeout
+        self.keepalive_max = keepalive_max
+        self.poller = Poller()
+        self.connections = {}
+        self.running = False
+
+    def stop(self):
+        """
+        Ask the loop to shut down gracefully: no new connections are accepted,
+        responses in progress are completed, and :meth:`serve` returns once no
+        connection is left. Safe to call from a signal handler.
+        """
+        self.running = False
+
+    def serve(self, server):
+        """
+        Run the loop on an already listening socket until :meth:`stop` is called.
+
+        :params server (socket.socket): bound and listening server socket.
+        """
+        server.setblocking(0)
+        server_fd = server.fileno()
+        self.poller.register(server_fd, READ)
+        print("[EventLoop] Serving with {} on port {}".format(self.poller.kind, self.port))
+
+        self.running = True
+        next_sweep = time.time() + SWEEP_INTERVAL
+        while self.running or self.connections:
+            if not self.running and server_fd is not None:
+                self.poller.unregister(server_fd)
+                server_fd = None
+                self._close_idle()
+
+            for fd, events in self.poller.poll(SWEEP_INTERVAL):
+                if fd == server_fd:
+                    self._accept(server)
+                    continue
+                conn = self.connections.get(fd)
+                if conn is None:
+                    continue
+                if events & (READ | ERROR):
+                    self._on_readable(conn)
+                if events & WRITE and fd in self.connections:
+                    self._on_writable(conn)
+
+            now = time.time()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _accept(self, server):
+        """Accept every pending connection of the listening socket."""
+        while True:
+            try:
+                sock, addr = server.accept()
+            except socket.error as e:
+                if e.args[0] in _RETRY:
+                    return
+                print("[EventLoop] accept failed: {}".format(e))
+                return
+            sock.setblocking(0)
+            adapter = HttpAdapter(self.ip, self.port, sock, addr, self.routes,
+                                  self.keepalive_timeout, self.keepalive_max)
+            conn = _Connection(sock, addr, adapter)
+            self.connections[conn.fd] = conn
+            self.poller.register(conn.fd, READ)
+
+    def _on_readable(self, conn):
+        try:
+            events = conn.parser.recv(conn.sock)
+        except socket.error as e:
+            if e.args[0] in _RETRY:
+                return
+            self._close(conn)
+            return
+        except HttpParserError as e:
+            self._reject(conn, e)
+            return
+        if conn.parser.closed and not events:
+            self._close(conn)
+            return
+        conn.last_active = time.time()
+        if conn.out is None:
+            self._process(conn, events)
+
+    def _on_writable(self, conn):
+        try:
+            if not self._send(conn):
+                return
+        except (socket.error, IOError) as e:
+            if e.args and e.args[0] in _RETRY:
+                return
+            self._close(conn)
+            return
+
+        conn.out = None
+        if not conn.keep_alive or not self.running:
+            self._close(conn)
+            return
+        self.poller.modify(conn.fd, READ)
+        conn.parser.reset()
+        conn.request = Request()
+        conn.body = []
+        # A pipelined request may already be buffered.
+        try:
+            events = conn.parser.feed()
+        except HttpParserError as e:
+            self._reject(conn, e)
+            return
+        self._process(conn, events)
+
+    def _send(self, conn):
+        """
+        Write as much of the pending response as the socket accepts: the
+        in-memory bytes first, then the streamed segments one after another.
+
+        :rtype bool: True once the whole response has been sent.
+        """
+        if len(conn.out):
+            sent = conn.sock.send(conn.out)
+            conn.out = conn.out[sent:]
+            conn.last_active = time.time()
+            if len(conn.out):
+                return False
+
+        if conn.file is not None:
+            sent = send_once(conn.sock, conn.file, conn.offset, conn.remaining)
+            conn.offset += sent
+            conn.remaining -= sent
+            conn.last_active = time.time()
+            if conn.remaining:
+                return False
+            conn.file.close()
+            conn.file = None
+
+        if not conn.segments:
+            return True
+        segment = conn.segments.pop(0)
+        if isinstance(segment, bytes):
+            conn.out = memoryview(segment)
+        else:
+            filepath, conn.offset, conn.remaining = segment
+            conn.file = open(filepath, 'rb')
+        # Level-triggered polling reports the socket writable again.
+        return False
+
+    def _process(self, conn, events):
+        """Apply parser events to ``conn`` and answer its request once complete."""
+        adapter = conn.adapter
+        try:
+            req = conn.request
+            if not adapter.prepare_request(req, self.routes, conn.parser, events, conn.body):
+                return
+            conn.served += 1
+            adapter.request = req
+            adapter.response = Response()
+            response = adapter.dispatch(req, self.routes)
+            keep_alive = adapter.wants_keep_alive(req) and conn.served < self.keepalive_max
+            response, conn.keep_alive = adapter.add_connection_headers(
+                response, keep_alive, self.keepalive_max - conn.served)
+        except Exception as e:
+            print("[EventLoop] {} request failed: {}".format(conn.addr, e))
+            self._close(conn)
+            return
+
+        conn.out = memoryview(response)
+        conn.segments = list(adapter.response._stream or ())
+        self.poller.modify(conn.fd, WRITE)
+
+    def _reject(self, conn, error):
+        """Answer a malformed request with an error status, then close."""
+        if conn.parser.closed:
+            # Closed in the middle of a request, nobody is left to answer.
+            self._close(conn)
+            return
+        print("[EventLoop] {} sent a bad request: {}".format(conn.addr, error))
+        response, conn.keep_alive = conn.adapter.add_connection_headers(
+            Response().build_response_error(error.status_code, str(error)), False, 0)
+        conn.out = memoryview(response)
+        self.poller.modify(conn.fd, WRITE)
+
+    def _sweep(self, now):
+        """Close connections that made no progress within the idle timeout."""
+        idle = [conn for conn in self.connections.values()
+                if now - conn.last_active > self.keepalive_timeout]
+        for conn in idle:
+            self._close(conn)
+
+    def _close_idle(self):
+        """Close connections that neither wait for nor hold a partial request."""
+        idle = [conn for conn in self.connections.values()
+                if conn.out is None and not conn.parser.started]
+        for conn in idle:
+            self._close(conn)
+
+    def _close(self, conn):
+        if self.connections.pop(conn.fd, None) is None:
+            return
+        self.poller.unregister(conn.fd)
+        if conn.file is not None:
+            conn.file.close()
+            conn.file = None
+        try:
+            conn.sock.close()
+        except socket.error:
+            pass
+
+
+def run_event_backend(ip, port, routes,
+                      keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX):
+    """
+    Starts the event-loop backend server, binds to the specified IP and port, and
+    serves every connection from a single non-blocking loop.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param keepalive_timeout (float): idle seconds before a connection is closed.
+    :param keepalive_max (int): maximum number of requests served per connection.
+    """
+    try:
+        server = create_listener(ip, port, backlog=socket.SOMAXCONN)
+    except socket.error as e:
+        print("Socket error: {}".format(e))
+        return
+
+    print("[Backend] Listening on port {}".format(port))
+    if routes != {}:
+        print("[Backend] route settings {}".format(routes))
+
+    EventBackend(ip, port, routes, keepalive_timeout, keepalive_max).serve(server)
@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.eventproxy
+~~~~~~~~~~~~~~~~~
+
+This module provides a single-threaded, non-blocking engine for the reverse
+proxy, as an alternative to the thread-per-client model of
+:mod:`daemon.proxy`. One loop multiplexes every client and backend socket
+with the :class:`Poller <Poller>` of the event backend, so the number of
+connections in progress is bounded by file descriptors, not by threads.
+
+Each client connection is paired with a backend connection and driven
+through a small state machine::
+
+    HEAD --(head parsed, route resolved)--> CONNECTING --(connected)--> RELAYING
+      \\--(bad request, no upstream)--> error response, close
+
+The request head is rewritten as by the threaded engine (hop-by-hop headers
+dropped) and asks the backend to close the connection after its response;
+the response head is held until complete and rewritten once the same way,
+then bytes are relayed both ways unchanged until the backend closes.
+Each direction buffers at most :data:`MAX_BUFFER` bytes: a slow reader stops
+the reads from the other side instead of growing the buffer.
+
+Routing, load balancing and health checks are those of the threaded engine:
+the route table of the :class:`RouteHolder <RouteHolder>` current at accept
+time, the balancer of the host and :data:`daemon.proxy.HEALTH`.
+
+Requirements:
+--------------
+- eventloop: :class:`Poller <Poller>` readiness notification.
+- httpparser: validation of the request head.
+- proxy: request head rewriting, upstream selection and health records.
+
+Notes:
+------
+- Python 2 has no ``asyncio``; the engine uses the same epoll/poll/select
+  loop as the event backend instead of coroutines.
+- A request failing to reach its backend before any response byte arrived
+  is sent to another backend of the host when it is idempotent and fits in
+  :data:`REPLAY_LIMIT` bytes, the client gets a 502 otherwise.
+- The response cache, request coalescing and pooled backend connections of
+  the threaded engine block their thread and are not used by this engine.
+
+Usage Example:
+--------------
+>>> run_event_proxy("0.0.0.0", 8080, RouteHolder(RouteTable.from_dict(routes)))
+"""
+
+import errno
+import os
+import socket
+import time
+
+from .eventloop import Poller, READ, WRITE, ERROR
+from .httpparser import HttpParser, HttpParserError, REQUEST, MAX_HEADER_SIZE
+from .response import Response
+from .balancer import ACTIVE_REQUESTS
+from .upstream import CONNECT_TIMEOUT, IO_TIMEOUT
+from .utils import create_listener
+from .proxy import (HEALTH, IDEMPOTENT_METHODS, RELAY_BUFFER_SIZE, BODY_BUFFER_SIZE,
+                    upstream_head, client_head, resolve_routing_policy)
+
+#: Bytes buffered per direction before reading from the other side pauses.
+MAX_BUFFER = 256 * 1024
+#: Requests up to this size are kept to be sent again to another backend.
+REPLAY_LIMIT = BODY_BUFFER_SIZE
+#: Seconds a client may take to send its request head.
+HEADER_TIMEOUT = 10.0
+#: Seconds between two sweeps for stalled connections.
+SWEEP_INTERVAL = 1.0
+
+#: States of a :class:`_Pipe`.
+HEAD = 'head'
+CONNECTING = 'connecting'
+RELAYING = 'relaying'
+
+_RETRY = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+
+
+class _Pipe(object):
+    """A client connection and its backend connection."""
+
+    def __init__(self, client, addr, routes):
+        self.client = client
+        self.addr = addr
+        self.routes = routes
+        self.upstream = None
+        #: ``host:port`` of the backend, counted in ACTIVE_REQUESTS while set.
+        self.upstream_name = None
+        self.state = HEAD
+        self.hostname = ''
+        self.method = None
+        #: Bytes waiting to be written to each side.
+        self.to_upstream = bytearray()
+        self.to_client = bytearray()
+        #: Response bytes held until the whole head arrived and is rewritten.
+        self.response_head = bytearray()
+        #: Everything sent upstream so far, None once too large to send again.
+        self.replay = None
+        self.tried = set()
+        self.responded = False
+        self.client_eof = False
+        #: Close once ``to_client`` is flushed.
+        self.closing = False
+        self.last_active = time.time()
+
+
+class EventProxy(object):
+    """The :class:`EventProxy <EventProxy>` object, which relays every client
+    of a listening socket to its backend from one non-blocking loop.
+
+    :attrs ip (str): IP address the proxy is bound to.
+    :attrs port (int): port the proxy is listening on.
+    :attrs routes (RouteHolder): holder of the current route table.
+    """
+
+    def __init__(self, ip, port, routes):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.poller = Poller()
+        #: fd -> (pipe, True for the client side).
+        self.sockets = {}
+        self.pipes = set()
+        self.running = False
+
+    def stop(self):
+        """Ask the loop to return, connections in progress are dropped."""
+        self.running = False
+
+    def serve(self, server):
+        """
+        Run the loop on an already listening socket until :meth:`stop` is called.
+
+        :params server (socket.socket): bound and listening server socket.
+        """
+        server.setblocking(0)
+        server_fd = server.fileno()
+        self.poller.register(server_fd, READ)
+        print("[EventProxy] Serving with {} on port {}".format(self.poller.kind, self.port))
+
+        self.running = True
+        next_sweep = time.time() + SWEEP_INTERVAL
+        while self.running:
+            for fd, events in self.poller.poll(SWEEP_INTERVAL):
+                if fd == server_fd:
+                    self._accept(server)
+                    continue
+                entry = self.sockets.get(fd)
+                if entry is None:
+                    continue
+                pipe, is_client = entry
+                if is_client:
+                    if events & (READ | ERROR):
+                        self._on_client_readable(pipe)
+                    if events & WRITE and pipe in self.pipes:
+                        self._on_client_writable(pipe)
+                elif pipe.state == CONNECTING:
+                    if events & (WRITE | ERROR):
+                        self._on_connected(pipe)
+                else:
+                    if events & (READ | ERROR):
+                        self._on_upstream_readable(pipe)
+                    if events & WRITE and pipe.upstream is not None:
+                        self._on_upstream_writable(pipe)
+
+            now = time.time()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _accept(self, server):
+        """Accept every pending connection of the listening socket."""
+        while True:
+            try:
+                sock, addr = server.accept()
+            except socket.error as e:
+                if e.args[0] in _RETRY:
+                    return
+                # Out of file descriptors: leave the rest in the backlog.
+                print("[EventProxy] accept failed: {}".format(e))
+                return
+            sock.setblocking(0)
+            # Connections keep the table current when they were accepted.
+            pipe = _Pipe(sock, addr, self.routes.table)
+            self.pipes.add(pipe)
+            self.sockets[sock.fileno()] = (pipe, True)
+            self.poller.register(sock.fileno(), READ)
+
+    # Client side
+
+    def _on_client_readable(self, pipe):
+        try:
+            data = pipe.client.recv(RELAY_BUFFER_SIZE)
+        except socket.error as e:
+            if e.args[0] in _RETRY:
+                return
+            self._close(pipe)
+            return
+        pipe.last_active = time.time()
+        if not data:
+            pipe.client_eof = True
+            if pipe.state == HEAD:
+                self._close(pipe)
+                return
+        else:
+            self._queue_upstream(pipe, data)
+            if pipe.state == HEAD:
+                self._read_head(pipe)
+        if pipe in self.pipes:
+            self._update(pipe)
+
+    def _on_client_writable(self, pipe):
+        try:
+            sent = pipe.client.send(pipe.to_client)
+        except socket.error as e:
+            if e.args[0] in _RETRY:
+                return
+            self._close(pipe)
+            return
+        del pipe.to_client[:sent]
+        pipe.last_active = time.time()
+        if not pipe.to_client and pipe.closing:
+            self._close(pipe)
+            return
+        self._update(pipe)
+
+    def _read_head(self, pipe):
+        """Start the exchange with a backend once the request head arrived."""
+        buffered = pipe.to_upstream
+        end = buffered.find(b"\r\n\r\n")
+        if end < 0:
+            if len(buffered) > MAX_HEADER_SIZE:
+                self._reject(pipe, HttpParserError(
+                    "header block exceeds {} bytes".format(MAX_HEADER_SIZE), 431))
+            return
+        parser = HttpParser(REQUEST)
+        try:
+            parser.feed(bytes(buffered[:end + 4]))
+        except HttpParserError as e:
+            self._reject(pipe, e)
+            return
+        if not parser.raw_head:
+            # Only blank lines so far.
+            del buffered[:end + 4]
+            return
+
+        pipe.method = parser.method
+        pipe.hostname = parser.headers.get('host', '')
+        pipe.to_upstream = bytearray(upstream_head(parser.raw_head, keep_alive=False)) \
+            + buffered[end + 4:]
+        if parser.method in IDEMPOTENT_METHODS and len(pipe.to_upstream) <= REPLAY_LIMIT:
+            pipe.replay = bytes(pipe.to_upstream)
+        self._connect(pipe)
+
+    def _reject(self, pipe, error):
+        """Answer a bad request, then close."""
+        print("[EventProxy] {} sent a bad request: {}".format(pipe.addr, error))
+        self._respond(pipe, error.status_code, str(error))
+
+    def _respond(self, pipe, status, reason):
+        """Answer the client with an error status and close once sent."""
+        pipe.to_client = bytearray(Response().build_response_error(status, reason))
+        pipe.to_upstream = bytearray()
+        pipe.closing = True
+        self._drop_upstream(pipe)
+        self._update(pipe)
+
+    # Upstream side
+
+    def _connect(self, pipe):
+        """Open a non-blocking connection to the next backend of the host."""
+        host, port = resolve_routing_policy(pipe.hostname, pipe.routes, pipe.addr[0], pipe.tried)
+        if host is None:
+            if pipe.tried:
+                self._respond(pipe, 502, "Bad Gateway")
+            else:
+                self._respond(pipe, 503, "No healthy upstream")
+            return
+
+        pipe.upstream_name = "{}:{}".format(host, port)
+        ACTIVE_REQUESTS.begin(pipe.upstream_name)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        pipe.upstream = sock
+        pipe.state = CONNECTING
+        pipe.last_active = time.time()
+        self.sockets[sock.fileno()] = (pipe, False)
+        self.poller.register(sock.fileno(), WRITE)
+        err = sock.connect_ex((host, port))
+        if err and err not in _IN_PROGRESS:
+            self._upstream_failed(pipe, socket.error(err, os.strerror(err)))
+            return
+        self._update(pipe)
+
+    def _on_connected(self, pipe):
+        err = pipe.upstream.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self._upstream_failed(pipe, socket.error(err, os.strerror(err)))
+            return
+        pipe.state = RELAYING
+        pipe.last_active = time.time()
+        self._on_upstream_writable(pipe)
+
+    def _on_upstream_readable(self, pipe):
+        try:
+            data = pipe.upstream.recv(RELAY_BUFFER_SIZE)
+        except socket.error as e:
+            if e.args[0] in _RETRY:
+                return
+            self._upstream_failed(pipe, e)
+            return
+        pipe.last_active = time.time()
+        if not data:
+            if not pipe.responded:
+                self._upstream_failed(pipe, socket.error(
+                    "connection closed by {}".format(pipe.upstream_name)))
+                return
+            # The backend closes after its response, the exchange is over.
+            self._drop_upstream(pipe)
+            pipe.closing = True
+            if not pipe.to_client:
+                self._close(pipe)
+                return
+        elif pipe.responded:
+            pipe.to_client += data
+        else:
+            pipe.response_head += data
+            end = pipe.response_head.find(b"\r\n\r\n")
+            if end < 0:
+                if len(pipe.response_head) > MAX_HEADER_SIZE:
+                    self._upstream_failed(pipe, HttpParserError(
+                        "response head of {} too large".format(pipe.upstream_name)))
+                    return
+            else:
+                end += 4
+                pipe.responded = True
+                pipe.replay = None
+                HEALTH.record_success(pipe.upstream_name)
+                pipe.to_client += client_head(bytes(pipe.response_head[:end]))
+                pipe.to_client += pipe.response_head[end:]
+                pipe.response_head = None
+        self._update(pipe)
+
+    def _on_upstream_writable(self, pipe):
+        if pipe.to_upstream:
+            try:
+                sent = pipe.upstream.send(pipe.to_upstream)
+            except socket.error as e:
+                if e.args[0] in _RETRY:
+                    return
+                self._upstream_failed(pipe, e)
+                return
+            del pipe.to_upstream[:sent]
+            pipe.last_active = time.time()
+        self._update(pipe)
+
+    def _upstream_failed(self, pipe, error):
+        """
+        Handle a backend failure: try another backend if the client got
+        nothing yet and the request can be sent again, else answer 502 or,
+        with part of the response relayed, close.
+        """
+        name = pipe.upstream_name
+        print("[EventProxy] {} failed: {}".format(name, error))
+        if not pipe.responded:
+            HEALTH.record_failure(name)
+            pipe.tried.add(name)
+        self._drop_upstream(pipe)
+        if pipe.responded:
+            pipe.closing = True
+            if not pipe.to_client:
+                self._close(pipe)
+            else:
+                self._update(pipe)
+            return
+        if pipe.replay is not None:
+            pipe.response_head = bytearray()
+            pipe.to_upstream = bytearray(pipe.replay)
+            self._connect(pipe)
+            return
+        self._respond(pipe, 502, "Bad Gateway")
+
+    def _queue_upstream(self, pipe, data):
+        """Add client bytes for the backend, kept for a replay while small."""
+        pipe.to_upstream += data
+        if pipe.replay is not None:
+            if len(pipe.replay) + len(data) > REPLAY_LIMIT:
+                pipe.replay = None
+            else:
+                pipe.replay += data
+
+    # Bookkeeping
+
+    def _update(self, pipe):
+        """Watch each socket of ``pipe`` for what it can do next."""
+        events = 0
+        if not pipe.client_eof and not pipe.closing and len(pipe.to_upstream) < MAX_BUFFER:
+            events |= READ
+        if pipe.to_client:
+            events |= WRITE
+        self.poller.modify(pipe.client.fileno(), events)
+
+        if pipe.upstream is None:
+            return
+        if pipe.state == CONNECTING:
+            events = WRITE
+        else:
+            events = READ if len(pipe.to_client) < MAX_BUFFER else 0
+            if pipe.to_upstream:
+                events |= WRITE
+        self.poller.modify(pipe.upstream.fileno(), events)
+
+    def _sweep(self, now):
+        """Time out clients slow to send their head, backends slow to answer."""
+        for pipe in list(self.pipes):
+            idle = now - pipe.last_active
+            if pipe.state == HEAD and idle > HEADER_TIMEOUT:
+                self._close(pipe)
+            elif pipe.state == CONNECTING and idle > CONNECT_TIMEOUT:
+                self._upstream_failed(pipe, socket.timeout("connect timed out"))
+            elif idle > IO_TIMEOUT:
+                if pipe.upstream is not None and not pipe.responded:
+                    self._upstream_failed(pipe, socket.timeout("timed out"))
+                else:
+                    self._close(pipe)
+
+    def _drop_upstream(self, pipe):
+        """Close the backend side of ``pipe``."""
+        if pipe.upstream_name is not None:
+            ACTIVE_REQUESTS.end(pipe.upstream_name)
+            pipe.upstream_name = None
+        if pipe.upstream is None:
+            return
+        fd = pipe.upstream.fileno()
+        self.sockets.pop(fd, None)
+        self.poller.unregister(fd)
+        try:
+            pipe.upstream.close()
+        except socket.error:
+            pass
+        pipe.upstream = None
+        if pipe.state != HEAD:
+            pipe.state = RELAYING
+
+    def _close(self, pipe):
+        if pipe not in self.pipes:
+            return
+        self.pipes.discard(pipe)
+        self._drop_upstream(pipe)
+        fd = pipe.client.fileno()
+        self.sockets.pop(fd, None)
+        self.poller.unregister(fd)
+        try:
+            pipe.client.close()
+        except socket.error:
+            pass
+
+
+def raise_fd_limit():
+    """
+    Raise the soft limit of open files to the hard limit, each proxied
+    connection holds two descriptors.
+
+    :rtype int: the limit in effect, None if unknown.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+def run_event_proxy(ip, port, routes):
+    """
+    Starts the event-driven proxy server, binds to the specified IP and port,
+    and relays every connection from a single non-blocking loop.
+
+    :params ip (str): IP address to bind the proxy server.
+    :params port (int): port number to listen on.
+    :params routes (RouteHolder): holder of the current route table.
+    """
+    limit = raise_fd_limit()
+    try:
+        server = create_listener(ip, port, backlog=socket.SOMAXCONN)
+    except socket.error as e:
+        print("Socket error: {}".format(e))
+        return
+
+    # Probe the backends of the balanced hosts in the background
+    HEALTH.watch(routes.table.balanced_upstreams())
+    HEALTH.start()
+
+    print("[Proxy] Listening on IP {} port {} (open files limit {})".format(ip, port, limit))
+    EventProxy(ip, port, routes).serve(server)
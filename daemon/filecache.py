@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.filecache
+~~~~~~~~~~~~~~~~~
+
+This module provides an in-memory LRU cache of static files. Entries are
+keyed by the resolved file path and hold the file bytes together with the
+headers computed once when the file is loaded (Content-Type, Content-Length,
+ETag, Last-Modified). Every lookup does a single ``os.stat`` and reloads the file when its
+modification time or size changed, so edits under www/ or static/ are
+picked up without a restart.
+
+Compressed variants of a file are built on first demand, from a prebuilt
+``.gz`` sibling when one is at least as recent as the file, and kept in the
+file's entry: a new version of the file gets a new entry, so each version is
+compressed once.
+
+The cache stays within a memory budget, variants included, by evicting the
+least recently used entries. Files larger than ``max_entry_bytes`` are never read into memory:
+their entry only carries the headers and ``content`` is None, telling the
+caller to stream the file from disk.
+
+Usage Example:
+--------------
+>>> cache = FileCache(max_bytes=32 * 1024 * 1024)
+>>> entry = cache.get("www/index.html", "text/html")
+>>> entry.headers["ETag"]
+'"5d41402abc4b2a76b971"'
+>>> gzipped = cache.variant(entry, "gzip")
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .compression import compress
+from .utils import http_date
+
+#: Default memory budget of the static file cache, in bytes.
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+#: Files larger than this are served but not kept in memory, in bytes.
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+
+
+class CacheEntry(object):
+    """The :class:`CacheEntry <CacheEntry>` object, which holds one loaded file.
+
+    :attrs path (str): resolved path of the file.
+    :attrs content (bytes): the file bytes, None for files streamed from disk.
+    :attrs size (int): size of the file when it was read.
+    :attrs mtime (float): modification time of the file when it was read.
+    :attrs etag (str): strong entity tag derived from the content, or from the
+                       size and mtime for streamed files.
+    :attrs last_modified (str): HTTP date of ``mtime``.
+    :attrs variants (dict): content coding to compressed bytes, None when
+                            compressing does not make the file smaller.
+    :attrs nbytes (int): memory held by the content and its variants.
+    :attrs headers (dict): precomputed Content-Type, Content-Length, ETag,
+                           Last-Modified and Accept-Ranges.
+    """
+
+    __slots__ = ("path", "content", "size", "mtime", "etag", "last_modified", "headers",
+                 "variants", "nbytes")
+
+    def __init__(self, path, content, mtime, content_type, size=None):
+        self.path = path
+        self.content = content
+        self.size = len(content) if content is not None else size
+        self.mtime = mtime
+        if content is not None:
+            self.etag = '"{}"'.format(hashlib.sha1(content).hexdigest()[:20])
+        else:
+            self.etag = '"{:x}-{:x}"'.format(self.size, int(mtime * 1000000))
+        self.last_modified = http_date(mtime)
+        self.headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(self.size),
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+            "Accept-Ranges": "bytes",
+        }
+        self.variants = {}
+        self.nbytes = len(content) if content is not None else 0
+
+
+class FileCache(object):
+    """The :class:`FileCache <FileCache>` object, a thread-safe LRU cache of
+    static files validated against the file's mtime and size.
+
+    :attrs max_bytes (int): memory budget for the cached contents.
+    :attrs max_entry_bytes (int): largest file kept in the cache.
+    :attrs total_bytes (int): bytes currently held.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, content_type='application/octet-stream'):
+        """
+        Return the entry for ``path``, loading or reloading it from disk when
+        it is not cached or changed since it was cached.
+
+        :params path (str): resolved path of the file.
+        :params content_type (str): Content-Type stored in the entry headers.
+
+        :rtype CacheEntry: the entry, or None if the file cannot be read.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        if st.st_size > self.max_entry_bytes:
+            # Too big to hold in memory, the caller streams it from disk.
+            return CacheEntry(path, None, st.st_mtime, content_type, st.st_size)
+
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                if entry.mtime == st.st_mtime and entry.size == st.st_size:
+                    # Re-insert as most recently used.
+                    self._entries[path] = entry
+                    return entry
+                self.total_bytes -= entry.nbytes
+
+        try:
+            with open(path, 'rb') as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                content = f.read()
+        except IOError as e:
+            print("[FileCache] Error reading file {}: {}".format(path, e))
+            return None
+
+        entry = CacheEntry(path, content, mtime, content_type)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[path] = entry
+            self.total_bytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def variant(self, entry, encoding):
+        """
+        Return the content of an in-memory ``entry`` in the content coding
+        ``encoding``, compressing it on first use.
+
+        :params entry (CacheEntry): entry returned by :meth:`get`.
+        :params encoding (str): ``gzip`` or ``deflate``.
+
+        :rtype bytes: the encoded content, or None if it is not smaller.
+        """
+        with self._lock:
+            if encoding in entry.variants:
+                return entry.variants[encoding]
+
+        data = self._load_sibling(entry) if encoding == 'gzip' else None
+        if data is None:
+            data = compress(entry.content, encoding)
+        if len(data) >= entry.size:
+            data = None
+
+        with self._lock:
+            if encoding in entry.variants:
+                return entry.variants[encoding]
+            entry.variants[encoding] = data
+            if data is not None:
+                entry.nbytes += len(data)
+                if self._entries.get(entry.path) is entry:
+                    self.total_bytes += len(data)
+                    self._evict()
+        return data
+
+    def _load_sibling(self, entry):
+        """Read the prebuilt ``<file>.gz`` of ``entry`` if it is up to date."""
+        sibling = entry.path + '.gz'
+        try:
+            if os.stat(sibling).st_mtime < entry.mtime:
+                return None
+            with open(sibling, 'rb') as f:
+                return f.read()
+        except (OSError, IOError):
+            return None
+
+    def invalidate(self, path):
+        """Drop ``path`` from the cache if present."""
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self.total_bytes -= entry.nbytes
+
+    def resize(self, max_bytes):
+        """Change the memory budget, evicting entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _evict(self):
+        """Drop least recently used entries until within budget. Lock held."""
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.nbytes
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.health
+~~~~~~~~~~~~~~~~~
+
+This module tracks the health of the proxy's upstreams so the balancers stop
+sending requests to a backend that is down.
+
+Two sources feed it:
+
+- passive: the proxy reports every request that failed on an upstream
+  (connect refused, reset, timeout, malformed response) and every one that
+  succeeded;
+- active: a background thread connects to each watched upstream every
+  ``probe_interval`` seconds and reports the outcome the same way.
+
+After ``max_fails`` consecutive failures an upstream is ejected for
+``base_ejection`` seconds. When the ejection expires it is tried again on
+probation: one success admits it fully, one failure ejects it again for
+twice as long, up to ``max_ejection``.
+
+Requirements:
+--------------
+- socket: TCP connect probes.
+- threading: the probe thread and the shared state.
+
+Usage Example:
+--------------
+>>> health = HealthChecker()
+>>> health.watch(["10.0.0.1:9002", "10.0.0.2:9002"])
+>>> health.start()
+>>> health.record_failure("10.0.0.1:9002")
+>>> health.is_available("10.0.0.2:9002")
+True
+"""
+
+import socket
+import threading
+import time
+
+#: Consecutive failures ejecting an upstream.
+DEFAULT_MAX_FAILS = 3
+#: Seconds of the first ejection, doubled by every ejection in a row.
+DEFAULT_BASE_EJECTION = 5.0
+#: Longest ejection, in seconds.
+DEFAULT_MAX_EJECTION = 120.0
+#: Seconds between two probes of the same upstream.
+DEFAULT_PROBE_INTERVAL = 5.0
+#: Seconds a probe waits for the TCP connection.
+PROBE_TIMEOUT = 2.0
+
+
+class _State(object):
+    """Health record of one upstream."""
+
+    __slots__ = ("fails", "ejections", "ejected_until")
+
+    def __init__(self):
+        self.fails = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+
+class HealthChecker(object):
+    """The :class:`HealthChecker <HealthChecker>` object, which decides
+    which upstreams may receive requests.
+
+    :attrs max_fails (int): consecutive failures ejecting an upstream.
+    :attrs base_ejection (float): seconds of the first ejection.
+    :attrs max_ejection (float): longest ejection in seconds.
+    :attrs probe_interval (float): seconds between two active probes.
+    """
+
+    def __init__(self, max_fails=DEFAULT_MAX_FAILS, base_ejection=DEFAULT_BASE_EJECTION,
+                 max_ejection=DEFAULT_MAX_EJECTION, probe_interval=DEFAULT_PROBE_INTERVAL):
+        self.max_fails = max_fails
+        self.base_ejection = base_ejection
+        self.max_ejection = max_ejection
+        self.probe_interval = probe_interval
+        self._states = {}
+        self._watched = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, upstreams):
+        """Add ``host:port`` upstreams to the active probes."""
+        with self._lock:
+            self._watched.update(upstreams)
+
+    def unwatch(self, upstreams):
+        """Stop probing ``upstreams`` and forget their health."""
+        with self._lock:
+            for upstream in upstreams:
+                self._watched.discard(upstream)
+                self._states.pop(upstream, None)
+
+    def is_available(self, upstream):
+        """True unless ``upstream`` is ejected right now."""
+        state = self._states.get(upstream)
+        return state is None or state.ejected_until <= time.time()
+
+    def record_success(self, upstream):
+        """Report a request or probe that succeeded on ``upstream``."""
+        with self._lock:
+            state = self._states.get(upstream)
+            if state is None:
+                return
+            if state.ejections:
+                print("[Health] {} is back".format(upstream))
+            self._states.pop(upstream)
+
+    def record_failure(self, upstream):
+        """Report a request or probe that failed on ``upstream``."""
+        with self._lock:
+            state = self._states.setdefault(upstream, _State())
+            now = time.time()
+            if state.ejected_until > now:
+                return
+            state.fails += 1
+            # On probation after an ejection a single failure is enough.
+            if state.fails < self.max_fails and not state.ejections:
+                return
+            state.ejections += 1
+            state.fails = 0
+            duration = min(self.base_ejection * 2 ** (state.ejections - 1), self.max_ejection)
+            state.ejected_until = now + duration
+        print("[Health] {} ejected for {:.0f}s".format(upstream, duration))
+
+    def start(self):
+        """Start the probe thread, once."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="health-probe")
+        self._thread.setDaemon(True)  # Python 2 compatible
+        self._thread.start()
+
+    def stop(self):
+        """Stop the probe thread."""
+        self._stop.set()
+
+    def probe(self, upstream):
+        """
+        Check that ``upstream`` accepts TCP connections and record the result.
+
+        :rtype bool: True if the connection succeeded.
+        """
+        host, _, port = upstream.rpartition(':')
+        try:
+            sock = socket.create_connection((host, int(port)), PROBE_TIMEOUT)
+        except (socket.error, ValueError):
+            self.record_failure(upstream)
+            return False
+        sock.close()
+        self.record_success(upstream)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.probe_interval):
+            with self._lock:
+                # Ejected upstreams are probed again once their ejection ends.
+                due = [u for u in self._watched if self.is_available(u)]
+            for upstream in due:
+                self.probe(upstream)
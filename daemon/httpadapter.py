@@ -21,10 +21,20 @@ raw URL paths and RESTful route definitions, and integrates with
 Request and Response objects to handle client-server communication.
 """
 
+import select
 import socket
 from .request import Request
 from .response import Response
 from .dictionary import CaseInsensitiveDict
+from .httpparser import HttpParser, HttpParserError, REQUEST, HEADERS, BODY, END
+from .compression import choose_encoding, compress_response
+
+#: Seconds a persistent connection may stay idle before it is closed.
+KEEPALIVE_TIMEOUT = 5
+#: Maximum number of requests served on one persistent connection.
+KEEPALIVE_MAX = 100
+#: Seconds between two checks of the worker pool while a connection is idle.
+IDLE_CHECK_INTERVAL = 0.5
 
 class HttpAdapter:
     """
@@ -44,6 +54,10 @@ class HttpAdapter:
         routes (dict): Mapping of route paths to handler functions.
         request (Request): Request object for parsing incoming data.
         response (Response): Response object for building and sending replies.
+        keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        keepalive_max (int): maximum number of requests served per connection.
+        busy (callable): tells whether other connections wait for a worker,
+                         None if the adapter does not run on a worker pool.
     """
 
     __attrs__ = [
@@ -54,9 +68,13 @@ class HttpAdapter:
         "routes",
         "request",
         "response",
+        "keepalive_timeout",
+        "keepalive_max",
+        "busy",
     ]
 
-    def __init__(self, ip, port, conn, connaddr, routes):
+    def __init__(self, ip, port, conn, connaddr, routes,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX, busy=None):
         """
         Initialize a new HttpAdapter instance.
 
@@ -65,6 +83,9 @@ class HttpAdapter:
         :param conn (socket): Active socket connection.
         :param connaddr (tuple): Address of the connected client.
         :param routes (dict): Mapping of route paths to handler functions.
+        :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        :param keepalive_max (int): maximum number of requests served per connection.
+        :param busy (callable): tells whether other connections wait for a worker.
         """
 
         #: IP address.
@@ -81,14 +102,28 @@ class HttpAdapter:
         self.request = Request()
         #: Response
         self.response = Response()
+        #: Idle timeout of persistent connections
+        self.keepalive_timeout = keepalive_timeout
+        #: Requests allowed per connection
+        self.keepalive_max = keepalive_max
+        #: Load of the worker pool serving this connection
+        self.busy = busy
 
     def handle_client(self, conn, addr, routes):
         """
         Handle an incoming client connection.
 
-        This method reads the request from the socket, prepares the request object,
-        invokes the appropriate route handler if available, builds the response,
-        and sends it back to the client.
+        This method serves requests from the socket in a persistent (keep-alive)
+        loop: each request is read, prepared, dispatched to the route handler or
+        static content, and its response sent back. The connection is closed when
+        the client asks for it, when the response cannot be delimited, when
+        ``keepalive_max`` requests have been served, or when the client stays
+        idle longer than ``keepalive_timeout`` seconds.
+
+        An idle connection holds its worker thread. While other connections
+        wait for a worker (see ``busy``) none is kept alive: the connection is
+        closed after its response, or as soon as the wait is noticed while
+        idle, so idle clients cannot starve the pool.
 
         :param conn (socket): The client socket connection.
         :param addr (tuple): The client's address.
@@ -99,75 +134,232 @@ class HttpAdapter:
         self.conn = conn        
         # Connection address.
         self.connaddr = addr
-        # Request handler
-        req = self.request
-        # Response handler
-        resp = self.response
 
-        # Handle the request - đọc cho đến khi có \r\n\r\n (kết thúc headers)
-        # msg = conn.recv(1024).decode()
-        # req.prepare(msg, routes)
-        msg = ""
-        raw_data = ""
-        while "\r\n\r\n" not in raw_data:
-            chunk = conn.recv(1024)
-            if not chunk:
-                break
-            raw_data += chunk
-        
-        # Tách headers và body
-        if "\r\n\r\n" in raw_data:
-            header_end = raw_data.find("\r\n\r\n")
-            headers_part = raw_data[:header_end + 4]  # Bao gồm \r\n\r\n
-            body_part = raw_data[header_end + 4:]
-            
-            # Prepare request với headers
-            req.prepare(headers_part, routes)
-            
-            # Đọc thêm body dựa vào Content-Length nếu cần
-            content_length = 0
-            if req.headers.get('content-length'):
+        # Idle connections must not hold a worker forever.
+        conn.settimeout(self.keepalive_timeout)
+
+        parser = HttpParser(REQUEST)
+        served = 0
+        try:
+            while served < self.keepalive_max:
+                # Fresh request/response state for every exchange.
+                self.request = Request()
+                self.response = Response()
+                req = self.request
+
                 try:
-                    content_length = int(req.headers.get('content-length'))
-                except:
-                    pass
-            
-            # Nếu body chưa đủ, đọc tiếp
-            while len(body_part) < content_length:
-                remaining = content_length - len(body_part)
-                chunk = conn.recv(min(1024, remaining))
-                if not chunk:
+                    if served and not self.wait_next_request(conn, parser):
+                        break
+                    if not self.read_request(conn, req, routes, parser):
+                        # Peer closed the connection before a new request.
+                        break
+                except socket.timeout:
+                    print("[HttpAdapter] {} idle for {}s, closing".format(addr, self.keepalive_timeout))
                     break
-                body_part += chunk
-            
-            # Gán body vào request
-            req.body = body_part
+                except HttpParserError as e:
+                    print("[HttpAdapter] {} sent a bad request: {}".format(addr, e))
+                    response, _ = self.add_connection_headers(
+                        self.response.build_response_error(e.status_code, str(e)), False, 0)
+                    conn.sendall(response)
+                    break
+
+                served += 1
+                response = self.dispatch(req, routes)
+                keep_alive = (self.wants_keep_alive(req) and served < self.keepalive_max
+                              and not (self.busy is not None and self.busy()))
+                response, keep_alive = self.add_connection_headers(
+                    response, keep_alive, self.keepalive_max - served)
+
+                conn.sendall(response)
+                # Large static files follow the header straight from disk.
+                self.response.send_stream(conn)
+                if not keep_alive:
+                    break
+        except (socket.error, IOError):
+            pass
+        finally:
+            try:
+                # Shutdown write side to signal we're done sending
+                conn.shutdown(socket.SHUT_WR)
+            except socket.error:
+                pass
+            conn.close()
+
+    def wait_next_request(self, conn, parser):
+        """
+        Wait on an idle persistent connection for the next request.
+
+        :param conn (socket): The client socket connection.
+        :param parser (HttpParser): The parser of this connection.
+
+        :rtype bool: True once request bytes are available, False when the
+                     connection stayed idle ``keepalive_timeout`` seconds or
+                     other connections started waiting for a worker.
+        """
+        if parser.buffer or self.busy is None:
+            # Pipelined bytes are already there, or nobody competes for
+            # this thread: the socket timeout bounds the wait.
+            return True
+        waited = 0.0
+        while waited < self.keepalive_timeout:
+            interval = min(IDLE_CHECK_INTERVAL, self.keepalive_timeout - waited)
+            readable, _, _ = select.select([conn], [], [], interval)
+            if readable:
+                return True
+            waited += interval
+            if self.busy():
+                print("[HttpAdapter] {} idle while clients wait for a worker, closing".format(
+                    self.connaddr))
+                return False
+        print("[HttpAdapter] {} idle for {}s, closing".format(self.connaddr, self.keepalive_timeout))
+        return False
+
+    def read_request(self, conn, req, routes, parser):
+        """
+        Read one complete request from the socket with the connection's
+        incremental parser and prepare ``req`` with it.
+
+        Bytes received past the end of the request stay buffered in ``parser``
+        for the next pipelined request.
+
+        :param conn (socket): The client socket connection.
+        :param req (Request): The request object to prepare.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param parser (HttpParser): The parser of this connection.
+
+        :rtype bool: True once ``req`` is prepared, False if the peer closed
+                     the connection before sending a request.
+        :raises HttpParserError: if the request is malformed or too large.
+        """
+        parser.reset()
+        body = []
+        events = parser.feed()
+        while not self.prepare_request(req, routes, parser, events, body):
+            if parser.closed:
+                return False
+            events = parser.recv(conn)
+        return True
+
+    def prepare_request(self, req, routes, parser, events, body):
+        """
+        Apply parser events to a request being received.
+
+        :param req (Request): The request object to prepare.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param parser (HttpParser): The parser producing ``events``.
+        :param events (list): (event, value) pairs from the parser.
+        :param body (list): body pieces received so far, extended in place.
+
+        :rtype bool: True when the request is complete and ``req.body`` is set.
+        """
+        for event, value in events:
+            if event == HEADERS:
+                # The headers that framed the body are the ones handled.
+                req.prepare(parser.raw_head, routes, parser.headers)
+            elif event == BODY:
+                body.append(value)
+            elif event == END:
+                req.body = b"".join(body)
+                return True
+        return False
+
+    def wants_keep_alive(self, req):
+        """
+        Decide whether the client asked to keep the connection open.
+
+        HTTP/1.1 connections are persistent unless ``Connection: close`` is sent;
+        HTTP/1.0 clients must opt in with ``Connection: keep-alive``.
+
+        :param req (Request): The prepared request.
+        :rtype bool: True if the connection may serve another request.
+        """
+        if not req.headers:
+            return False
+        tokens = [t.strip().lower() for t in req.headers.get('connection', '').split(',')]
+        if 'close' in tokens:
+            return False
+        if req.version == 'HTTP/1.1':
+            return True
+        return 'keep-alive' in tokens
+
+    def add_connection_headers(self, response, keep_alive, remaining):
+        """
+        Stamp the ``Connection``/``Keep-Alive`` headers on a built response.
+
+        A response that already says ``Connection: close``, or whose body length is
+        only known by closing the socket (no Content-Length, not chunked, and a
+        status that allows a body), forces the connection to close.
+
+        :param response (bytes): The complete HTTP response.
+        :param keep_alive (bool): whether the request allows a persistent connection.
+        :param remaining (int): requests still allowed on this connection.
+
+        :rtype tuple: (bytes, bool) the response to send and whether to keep the
+                      connection open afterwards.
+        """
+        header_end = response.find("\r\n\r\n")
+        if header_end < 0:
+            return response, False
+
+        status_line, _, fields = response[:header_end].partition("\r\n")
+        names = {}
+        for line in fields.split("\r\n"):
+            if ':' in line:
+                key, val = line.split(':', 1)
+                names[key.strip().lower()] = val.strip().lower()
+
+        if 'close' in names.get('connection', ''):
+            return response, False
+        parts = status_line.split(None, 2)
+        status = parts[1] if len(parts) > 1 else ''
+        # 1xx, 204 and 304 responses never carry a body.
+        framed = (status.startswith('1') or status in ('204', '304')
+                  or 'content-length' in names or 'chunked' in names.get('transfer-encoding', ''))
+        keep_alive = keep_alive and framed
+
+        if keep_alive:
+            extra = "Connection: keep-alive\r\nKeep-Alive: timeout={}, max={}\r\n".format(
+                int(self.keepalive_timeout), remaining)
         else:
-            req.prepare(raw_data, routes)
-            req.body = ""
-        
-        msg = raw_data  # Để compatibility
+            extra = "Connection: close\r\n"
+        # Drop any connection header the builder set and put ours after the status line.
+        kept = [line for line in fields.split("\r\n")
+                if line and line.split(':', 1)[0].strip().lower() not in ('connection', 'keep-alive')]
+        head = status_line + "\r\n" + extra + "".join(line + "\r\n" for line in kept)
+        return head + response[header_end + 2:], keep_alive
+
+    def dispatch(self, req, routes):
+        """
+        Produce the response for a prepared request.
+
+        WeApRous hooks are tried first; a hook returning an HTTP response string
+        answers the request directly. Otherwise the Task 1 login and
+        cookie-protected static content logic builds the response.
+
+        :param req (Request): The prepared request.
+        :param routes (dict): The route mapping for dispatching requests.
+
+        :rtype bytes: the complete HTTP response.
+        """
+        # Response handler
+        resp = self.response
 
         # ========== TASK 2: WeApRous Hook Processing ==========
         # Handle request hook FIRST before Task 1 logic
         if req.hook:
             print("[HttpAdapter] hook in route-path METHOD {} PATH {}".format(req.hook._route_path,req.hook._route_methods))
-            # Pass real body data to hook, not hardcoded "get in touch"
-            hook_result = req.hook(headers = "bksysnet", body = body_part if body_part else "")
+            # Pass the real request headers and body to the hook
+            hook_args = {'headers': req.headers, 'body': req.body if req.body else ""}
+            if getattr(req.hook, '_route_query', False):
+                hook_args['query'] = req.query
+            hook_result = req.hook(**hook_args)
             
             # TODO: handle for App hook here
             # TASK 2: If hook returns HTTP response string, use it directly
             if hook_result:
                 print("[HttpAdapter] Hook returned response, sending to client")
-                response = hook_result
-                try:
-                    conn.sendall(response)
-                    conn.shutdown(socket.SHUT_WR)
-                except socket.error:
-                    pass
-                finally:
-                    conn.close()
-                return
+                return self.strip_head_body(req, compress_response(
+                    hook_result, choose_encoding(req.headers.get('accept-encoding'))))
 
         # ========== TASK 1: HTTP Server with Cookie Session ==========
         # response = resp.build_response(req)
@@ -280,15 +472,37 @@ class HttpAdapter:
             print "[HttpAdapter] Unsupported method: {}".format(req.method)
             response = resp.build_response(req)
 
-        #print(response)
-        try:
-            conn.sendall(response)
-            # Shutdown write side to signal we're done sending
-            conn.shutdown(socket.SHUT_WR)
-        except socket.error:
-            pass
-        finally:
-            conn.close()
+        return self.strip_head_body(req, response)
+
+    def strip_head_body(self, req, response):
+        """
+        Drop the body of the response to a HEAD request, streamed segments
+        included, keeping the headers of the matching GET response.
+
+        A response without Content-Length gets the length of the dropped body,
+        so the connection can stay open.
+
+        :param req (Request): The prepared request.
+        :param response (bytes): The complete HTTP response.
+
+        :rtype bytes: the response to send, unchanged for other methods.
+        """
+        if req.method != 'HEAD':
+            return response
+        self.response._stream = None
+        header_end = response.find("\r\n\r\n")
+        if header_end < 0:
+            return response
+        head, body = response[:header_end], response[header_end + 4:]
+        status_line, _, fields = head.partition("\r\n")
+        parts = status_line.split(None, 2)
+        status = parts[1] if len(parts) > 1 else ''
+        names = [line.split(':', 1)[0].strip().lower() for line in fields.split("\r\n")]
+        # 1xx, 204 and 304 responses never carry a body.
+        if not (status.startswith('1') or status in ('204', '304')
+                or 'content-length' in names or 'transfer-encoding' in names):
+            head += "\r\nContent-Length: {}".format(len(body))
+        return head + "\r\n\r\n"
 
     @property
     def extract_cookies(self, req, resp):
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.httpcache
+~~~~~~~~~~~~~~~~~
+
+This module provides the proxy's shared HTTP cache (RFC 7234). Responses to
+GET requests are kept in memory, keyed by Host, request target and the
+negotiated content coding, and served without contacting the backend while
+they are fresh.
+
+Freshness comes from the backend: ``Cache-Control: s-maxage`` or
+``max-age``, else ``Expires`` minus ``Date``. A stale entry carrying an ETag
+or a Last-Modified date is revalidated with a conditional request; a 304
+from the backend refreshes it and the stored body is served again.
+
+Concurrent misses are coalesced by the proxy with
+:class:`SingleFlight <SingleFlight>`: the response copied by a
+:class:`CacheFill <CacheFill>` is handed to every identical request waiting
+for it, stored or not.
+
+Requirements:
+--------------
+- threading: the cache is shared by every proxy thread.
+- compression: the content coding a request negotiates is part of the key.
+- utils: HTTP dates and entity tag comparisons.
+
+Notes:
+------
+- Not stored: ``no-store`` and ``private`` responses, responses setting a
+  cookie, responses varying on anything but Accept-Encoding, statuses other
+  than :data:`CACHEABLE_STATUS` and bodies larger than ``max_entry_bytes``.
+- Requests with a Cookie or Authorization header only use and fill entries
+  of responses marked ``public``.
+- Requests with a Range header or ``Cache-Control: no-store`` bypass the
+  cache; ``no-cache`` forces a revalidation.
+- A successful request with another method invalidates the target.
+
+Usage Example:
+--------------
+>>> cache = HttpCache(max_bytes=64 * 1024 * 1024)
+>>> key = cache_key("GET", "app1.local", "/index.html", headers)
+>>> entry = cache.get(key, with_credentials(headers))
+>>> if entry is not None and entry.is_fresh():
+...     send_entry(conn, entry, "GET", headers)
+"""
+
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from .compression import choose_encoding
+from .utils import parse_http_date, etag_matches
+
+#: Default memory budget of the proxy cache, in bytes.
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+#: Responses larger than this are relayed but not stored, in bytes.
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+
+#: Statuses stored when the response allows it, RFC 7231 section 6.1.
+CACHEABLE_STATUS = frozenset([200, 203, 300, 301, 404, 410])
+#: Headers not stored with a response, the proxy writes its own.
+_UNSTORED = frozenset([b'connection', b'keep-alive', b'proxy-connection', b'te', b'trailer',
+                       b'upgrade', b'x-cache'])
+#: Headers of a 304 that replace the stored ones.
+_REFRESHED = frozenset([b'cache-control', b'expires', b'date', b'etag', b'last-modified', b'vary'])
+#: Headers of a 304 sent to a client whose cached copy is current.
+_NOT_MODIFIED = frozenset([b'cache-control', b'content-location', b'date', b'etag',
+                           b'expires', b'last-modified', b'vary'])
+
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header.
+
+    :rtype dict: lower-cased directive to its value, None for bare directives.
+    """
+    directives = {}
+    for item in (value or '').split(','):
+        name, sep, arg = item.partition('=')
+        name = name.strip().lower()
+        if name:
+            directives[name] = arg.strip().strip('"') if sep else None
+    return directives
+
+
+def _seconds(value):
+    """Delta-seconds of a directive, None if missing or invalid."""
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def with_credentials(headers):
+    """Tell whether request ``headers`` identify a user (Cookie, Authorization)."""
+    return 'cookie' in headers or 'authorization' in headers
+
+
+def cache_key(method, host, target, headers):
+    """
+    Key of the cache entry answering a request.
+
+    :params method (str): request method.
+    :params host (str): Host header of the request.
+    :params target (str): request target, query included.
+    :params headers (dict): lower-cased request headers.
+
+    :rtype tuple: the key, None if the request must bypass the cache.
+    """
+    if method not in ('GET', 'HEAD') or 'range' in headers:
+        return None
+    if 'no-store' in parse_cache_control(headers.get('cache-control')):
+        return None
+    encoding = choose_encoding(headers.get('accept-encoding'))
+    return (host.strip().lower(), target, encoding)
+
+
+def flight_key(method, host, target, headers):
+    """
+    Key identifying requests that may share one backend response: same
+    target and same credentials, coding and validators.
+
+    :rtype tuple: the key, None if the request must not be shared.
+    """
+    if method != 'GET':
+        return None
+    return (host.strip().lower(), target) + tuple(
+        headers.get(name) for name in ('cookie', 'authorization', 'accept-encoding', 'range',
+                                       'if-none-match', 'if-modified-since'))
+
+
+def wants_revalidation(headers):
+    """Tell whether request ``headers`` refuse an unvalidated stored response."""
+    return ('no-cache' in parse_cache_control(headers.get('cache-control'))
+            or 'no-cache' in headers.get('pragma', '').lower())
+
+
+class CachedResponse(object):
+    """The :class:`CachedResponse <CachedResponse>` object, one stored response.
+
+    :attrs status (int): response status code.
+    :attrs status_line (bytes): status line of the response.
+    :attrs lines (list): stored header lines, hop-by-hop headers excluded.
+    :attrs headers (dict): lower-cased header names to values.
+    :attrs body (bytes): the body as framed by the backend.
+    :attrs etag (str): ETag of the response, None if absent.
+    :attrs last_modified (str): Last-Modified of the response, None if absent.
+    :attrs public (bool): may be served to requests with credentials.
+    :attrs stored_at (float): time the response was generated, minus its Age.
+    :attrs lifetime (float): seconds the response stays fresh.
+    :attrs nbytes (int): memory held by the entry.
+    """
+
+    __slots__ = ("status", "status_line", "lines", "headers", "body", "etag", "last_modified",
+                 "public", "stored_at", "lifetime", "nbytes")
+
+    def __init__(self, status_line, lines, body, now=None):
+        now = time.time() if now is None else now
+        self.status_line = status_line
+        self.status = int(status_line.split(None, 2)[1])
+        self.lines = []
+        self.headers = {}
+        for line in lines:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            self.headers[name] = value.strip()
+            if name != b'age':
+                # The Age sent to clients is computed when serving.
+                self.lines.append(line)
+        self.body = body
+        self.etag = self.headers.get(b'etag')
+        self.last_modified = self.headers.get(b'last-modified')
+        directives = parse_cache_control(self.headers.get(b'cache-control'))
+        self.public = 'public' in directives
+        age = _seconds(self.headers.get(b'age')) or 0
+        self.stored_at = now - age
+        self.lifetime = self._lifetime(directives, now)
+        self.nbytes = len(body) + len(status_line) + sum(len(line) + 2 for line in self.lines)
+
+    def _lifetime(self, directives, now):
+        """Freshness lifetime, RFC 7234 section 4.2.1."""
+        if 'no-cache' in directives:
+            return 0
+        for name in ('s-maxage', 'max-age'):
+            seconds = _seconds(directives.get(name))
+            if seconds is not None:
+                return seconds
+        expires = self.headers.get(b'expires')
+        if expires is not None:
+            expires_at = parse_http_date(expires)
+            if expires_at is None:
+                # An invalid Expires means already expired.
+                return 0
+            date = parse_http_date(self.headers.get(b'date', '')) or now
+            return max(expires_at - date, 0)
+        return 0
+
+    def age(self, now=None):
+        """Current age of the response, in seconds."""
+        return max((time.time() if now is None else now) - self.stored_at, 0)
+
+    def is_fresh(self, now=None):
+        """True while the response may be served without revalidation."""
+        return self.age(now) < self.lifetime
+
+    def can_revalidate(self):
+        """True if the response carries a validator for a conditional request."""
+        return self.etag is not None or self.last_modified is not None
+
+    def refreshed(self, headers):
+        """
+        Build the entry refreshed by a 304 response, RFC 7234 section 4.3.4.
+
+        :params headers (dict): lower-cased headers of the 304.
+
+        :rtype CachedResponse: a new entry with the updated headers.
+        """
+        lines = [line for line in self.lines
+                 if line.partition(b':')[0].strip().lower() not in
+                 _REFRESHED.intersection(headers)]
+        for name in _REFRESHED.intersection(headers):
+            lines.append((b'ETag' if name == b'etag' else name.title()) + b": " + headers[name])
+        return CachedResponse(self.status_line, lines, self.body)
+
+    def reusable(self):
+        """Tell whether the response may answer identical requests of the
+        same user a moment later, whatever its freshness."""
+        if self.status not in CACHEABLE_STATUS or b'set-cookie' in self.headers:
+            return False
+        return 'no-store' not in parse_cache_control(self.headers.get(b'cache-control'))
+
+    def storable(self):
+        """Tell whether the response may be stored by a shared cache."""
+        if self.status not in CACHEABLE_STATUS or b'set-cookie' in self.headers:
+            return False
+        directives = parse_cache_control(self.headers.get(b'cache-control'))
+        if 'no-store' in directives or 'private' in directives:
+            return False
+        vary = [v.strip().lower() for v in self.headers.get(b'vary', b'').split(b',') if v.strip()]
+        if any(v != b'accept-encoding' for v in vary):
+            return False
+        return self.lifetime > 0 or self.can_revalidate()
+
+
+class HttpCache(object):
+    """The :class:`HttpCache <HttpCache>` object, a thread-safe LRU cache of
+    HTTP responses within a memory budget.
+
+    :attrs max_bytes (int): memory budget of the stored responses.
+    :attrs max_entry_bytes (int): largest response stored.
+    :attrs total_bytes (int): bytes currently held.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key, credentials=False):
+        """
+        Return the entry of ``key``, fresh or stale.
+
+        :params key (tuple): key from :func:`cache_key`.
+        :params credentials (bool): the request carries a Cookie or
+                                    Authorization header.
+
+        :rtype CachedResponse: the entry, None if absent or not shareable.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            # Re-insert as most recently used.
+            self._entries[key] = entry
+        if credentials and not entry.public:
+            return None
+        return entry
+
+    def put(self, key, entry):
+        """Store ``entry`` under ``key``, evicting older entries if needed."""
+        if entry.nbytes > self.max_entry_bytes or entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[key] = entry
+            self.total_bytes += entry.nbytes
+            self._evict()
+
+    def invalidate(self, host, target):
+        """Drop the entries of ``target`` on ``host``, in every content coding."""
+        host = host.strip().lower()
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == host and k[1] == target]:
+                self.total_bytes -= self._entries.pop(key).nbytes
+
+    def resize(self, max_bytes):
+        """Change the memory budget, evicting entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _evict(self):
+        """Drop least recently used entries until within budget. Lock held."""
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.nbytes
+
+
+class CacheFill(object):
+    """The :class:`CacheFill <CacheFill>` object, which copies a response
+    while it is relayed to the client and stores it once complete, if the
+    response allows it.
+
+    :attrs cache (HttpCache): cache the response goes to.
+    :attrs key (tuple): cache key of the request, None to only copy it.
+    :attrs credentials (bool): the request carries a Cookie or Authorization.
+    :attrs stale (CachedResponse): entry being revalidated, None on a miss.
+    :attrs entry (CachedResponse): the complete response, stored or not, or
+                                   the refreshed entry; None until the
+                                   response was complete and small enough.
+    :attrs revalidated (bool): the backend answered 304, the client must be
+                               answered from :attr:`entry`.
+    """
+
+    def __init__(self, cache, key, credentials=False, stale=None):
+        self.cache = cache
+        self.key = key
+        self.credentials = credentials
+        self.stale = stale
+        self.entry = None
+        self.revalidated = False
+        self.reset()
+
+    def reset(self):
+        """Forget what was captured, the request is sent again."""
+        self._chunks = []
+        self._size = 0
+        self._dropped = False
+
+    def conditional(self, request):
+        """
+        Add the validators of :attr:`stale` to a request head, replacing the
+        client's own conditional headers.
+
+        :params request (bytes): request head and body for the backend.
+
+        :rtype bytes: the conditional request.
+        """
+        head, _, body = request.partition(b"\r\n\r\n")
+        lines = [line for line in head.split(b"\r\n")
+                 if line.partition(b":")[0].strip().lower()
+                 not in (b"if-none-match", b"if-modified-since")]
+        if self.stale.etag is not None:
+            lines.append(b"If-None-Match: " + self.stale.etag)
+        if self.stale.last_modified is not None:
+            lines.append(b"If-Modified-Since: " + self.stale.last_modified)
+        return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+    def not_modified(self, status_code, headers):
+        """
+        Check the status of the backend response before it is relayed. A 304
+        answering a revalidation refreshes :attr:`stale` and must not reach
+        the client.
+
+        :rtype bool: True if the response was consumed by the cache.
+        """
+        if self.stale is None or status_code != 304:
+            return False
+        self.entry = self.stale.refreshed(headers)
+        self.revalidated = True
+        self.cache.put(self.key, self.entry)
+        return True
+
+    def feed(self, data):
+        """Copy relayed bytes, until the response is too large to store."""
+        if self._dropped:
+            return
+        self._size += len(data)
+        if self._size > self.cache.max_entry_bytes:
+            self._dropped = True
+            self._chunks = []
+            return
+        self._chunks.append(data if isinstance(data, bytes) else data.tobytes())
+
+    def finish(self):
+        """
+        Store the complete response copied by :meth:`feed` if it may be.
+
+        :rtype CachedResponse: the copied response, None if it was too large.
+        """
+        if self._dropped or not self._chunks:
+            return None
+        data = b"".join(self._chunks)
+        self._chunks = []
+        end = data.find(b"\r\n\r\n")
+        if end < 0:
+            return None
+        status_line, _, fields = data[:end].lstrip().partition(b"\r\n")
+        lines = [line for line in fields.split(b"\r\n")
+                 if line and line.partition(b":")[0].strip().lower() not in _UNSTORED]
+        entry = self.entry = CachedResponse(status_line, lines, data[end + 4:])
+        if self.key is None:
+            return entry
+        if not entry.storable() or (self.credentials and not entry.public):
+            self.cache.invalidate(self.key[0], self.key[1])
+        else:
+            self.cache.put(self.key, entry)
+        return entry
+
+
+def send_entry(conn, entry, method, headers):
+    """
+    Answer a request with a stored response: a 304 when the client's own
+    conditional headers show its copy is current, the stored response
+    otherwise, body omitted for HEAD.
+
+    :params conn (socket.socket): client connection.
+    :params entry (CachedResponse): the stored response.
+    :params method (str): request method.
+    :params headers (dict): lower-cased request headers.
+    """
+    lines = entry.lines
+    status_line = entry.status_line
+    body = entry.body
+    if entry.status == 200 and _client_current(entry, headers):
+        status_line = entry.status_line.split(None, 1)[0] + b" 304 Not Modified"
+        lines = [line for line in lines
+                 if line.partition(b":")[0].strip().lower() in _NOT_MODIFIED]
+        body = b""
+    elif method == 'HEAD':
+        body = b""
+    head = (status_line + b"\r\n" + b"".join(line + b"\r\n" for line in lines)
+            + "Age: {}\r\nX-Cache: HIT\r\nConnection: close\r\n\r\n".format(
+                int(entry.age())).encode('ascii'))
+    try:
+        conn.sendall(head + body)
+    except socket.error:
+        pass
+
+
+def _client_current(entry, headers):
+    """If-None-Match / If-Modified-Since of the client match ``entry``."""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match:
+        return etag_matches(if_none_match, entry.etag)
+    since = parse_http_date(headers.get('if-modified-since', ''))
+    modified = parse_http_date(entry.last_modified or '')
+    return since is not None and modified is not None and modified <= since
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.httpparser
+~~~~~~~~~~~~~~~~~
+
+This module provides an incremental HTTP/1.x message parser. The parser is
+fed bytes as they arrive from a socket and emits events for the start line,
+the header block, each piece of body and the end of the message. It keeps a
+single growing ``bytearray`` buffer, resumes the search for the end of the
+headers where the previous one stopped, and reads sockets with ``recv_into``
+a preallocated buffer, so large headers or bodies are never rescanned or
+rebuilt by string concatenation.
+
+Bodies framed by Content-Length, by ``Transfer-Encoding: chunked`` (decoded
+into plain body events) and, for responses, by closing the connection are
+supported. Bytes past the end of a message stay buffered for the next one,
+which makes pipelined requests and persistent connections work.
+
+Requests framed ambiguously are refused with 400: Transfer-Encoding together
+with Content-Length, or a Transfer-Encoding whose last coding is not
+``chunked``. Two parsers could otherwise disagree on where the body ends.
+
+Usage Example:
+--------------
+>>> parser = HttpParser()
+>>> for event, value in parser.recv(conn):
+...     if event == HEADERS:
+...         print(parser.method, parser.target)
+...     elif event == BODY:
+...         body.append(value)
+...     elif event == END:
+...         break
+"""
+
+#: Kind of message parsed.
+REQUEST = 'request'
+RESPONSE = 'response'
+
+#: Events emitted by :meth:`HttpParser.feed`.
+START_LINE = 'start_line'
+HEADERS = 'headers'
+BODY = 'body'
+END = 'end'
+
+#: Largest header block accepted, in bytes.
+MAX_HEADER_SIZE = 65536
+#: Largest chunk-size line accepted, in bytes.
+MAX_CHUNK_LINE = 1024
+#: Size of the preallocated buffer used by :meth:`HttpParser.recv`.
+RECV_BUFFER_SIZE = 65536
+
+#: Terminal chunk of a chunked body.
+LAST_CHUNK = b"0\r\n\r\n"
+
+# Parser states.
+_HEAD = 0
+_BODY_LENGTH = 1
+_CHUNK_SIZE = 2
+_CHUNK_DATA = 3
+_CHUNK_CRLF = 4
+_TRAILERS = 5
+_BODY_EOF = 6
+_DONE = 7
+
+
+class HttpParserError(ValueError):
+    """Raised when the peer sends a malformed or oversized message.
+
+    :attrs status_code (int): HTTP status to answer the peer with.
+    """
+
+    def __init__(self, message, status_code=400):
+        ValueError.__init__(self, message)
+        self.status_code = status_code
+
+
+def encode_chunk(data):
+    """
+    Frame ``data`` as one chunk of a ``Transfer-Encoding: chunked`` body.
+
+    :params data (bytes): non-empty chunk payload.
+
+    :rtype bytes: the framed chunk.
+    """
+    return b"%x\r\n" % len(data) + data + b"\r\n"
+
+
+class HttpParser(object):
+    """The :class:`HttpParser <HttpParser>` object, which incrementally parses
+    the HTTP requests or responses of one connection.
+
+    :attrs kind (str): ``request`` or ``response``.
+    :attrs method (str): request method, e.g. ``GET``.
+    :attrs target (str): request target, e.g. ``/index.html?x=1``.
+    :attrs version (str): HTTP version of the message.
+    :attrs status_code (int): response status code.
+    :attrs reason (str): response reason phrase.
+    :attrs headers (dict): header fields, lower-cased names; repeated fields are
+                           joined with ``, ``.
+    :attrs raw_head (bytes): the start line and header block, terminator included.
+    :attrs content_length (int): declared body length, None if not declared.
+    :attrs chunked (bool): the body uses chunked transfer coding.
+    :attrs closed (bool): the peer closed the connection.
+    """
+
+    def __init__(self, kind=REQUEST, max_header_size=MAX_HEADER_SIZE,
+                 buffer_size=RECV_BUFFER_SIZE):
+        """
+        Initialize a new HttpParser instance.
+
+        :params kind (str): ``request`` or ``response``.
+        :params max_header_size (int): largest header block accepted, in bytes.
+        :params buffer_size (int): size of the preallocated receive buffer.
+        """
+        self.kind = kind
+        self.max_header_size = max_header_size
+        #: Unparsed bytes received from the peer.
+        self.buffer = bytearray()
+        self._recv_buffer = bytearray(buffer_size)
+        self._recv_view = memoryview(self._recv_buffer)
+        self.closed = False
+        self.reset()
+
+    def reset(self, no_body=False):
+        """
+        Prepare for the next message of the connection. Bytes already buffered
+        are kept and parsed by the next :meth:`feed`.
+
+        :params no_body (bool): the next response has no body whatever its
+                                headers say (answer to a HEAD request).
+        """
+        self.state = _HEAD
+        self.method = None
+        self.target = None
+        self.version = None
+        self.status_code = None
+        self.reason = None
+        self.headers = {}
+        self.raw_head = b""
+        self.content_length = None
+        self.chunked = False
+        self.no_body = no_body
+        self._remaining = 0
+        self._scan = 0
+
+    @property
+    def complete(self):
+        """True once the current message has been fully parsed."""
+        return self.state == _DONE
+
+    @property
+    def started(self):
+        """True once bytes of the current message have been received."""
+        return self.state != _HEAD or len(self.buffer.strip()) > 0
+
+    def recv(self, sock):
+        """
+        Receive once from ``sock`` into the preallocated buffer and parse it.
+
+        Socket errors (including timeouts and EAGAIN on non-blocking sockets)
+        propagate to the caller. When the peer closes the connection
+        :attr:`closed` is set and, for a response delimited by the close, the
+        END event is emitted.
+
+        :params sock (socket.socket): connected socket.
+
+        :rtype list: (event, value) pairs, see :meth:`feed`.
+        """
+        nbytes = sock.recv_into(self._recv_view)
+        if not nbytes:
+            return self.feed_eof()
+        return self.feed(self._recv_view[:nbytes])
+
+    def feed(self, data=b""):
+        """
+        Append ``data`` to the buffer and parse as much of the current message
+        as possible. Parsing stops at the end of the message; call
+        :meth:`reset` before parsing the next one.
+
+        :params data (bytes): bytes received from the peer, may be empty to
+                              parse what is already buffered.
+
+        :rtype list: (event, value) pairs in order: ``(START_LINE, tuple)``,
+                     ``(HEADERS, dict)``, ``(BODY, bytes)`` zero or more times,
+                     then ``(END, None)``.
+        :raises HttpParserError: on a malformed or oversized message.
+        """
+        if data:
+            self.buffer += data
+        events = []
+        while self.state != _DONE and self._step(events):
+            pass
+        return events
+
+    def feed_eof(self):
+        """
+        Signal that the peer closed the connection.
+
+        :rtype list: ``[(END, None)]`` if the close delimits a response body,
+                     else an empty list.
+        :raises HttpParserError: if the close cuts a message short.
+        """
+        self.closed = True
+        if self.state == _BODY_EOF:
+            if self.buffer:
+                events = [(BODY, bytes(self.buffer))]
+                del self.buffer[:]
+            else:
+                events = []
+            self.state = _DONE
+            events.append((END, None))
+            return events
+        if self.state != _DONE and self.started:
+            raise HttpParserError("connection closed in the middle of a message")
+        return []
+
+    def keep_alive(self):
+        """
+        Tell whether the connection may carry another message after this one,
+        from the HTTP version and the ``Connection`` header.
+
+        :rtype bool: True if the connection is persistent.
+        """
+        tokens = [t.strip().lower() for t in self.headers.get('connection', '').split(',')]
+        if 'close' in tokens:
+            return False
+        if self.version == 'HTTP/1.1':
+            return True
+        return 'keep-alive' in tokens
+
+    def _step(self, events):
+        """Advance the state machine once. Returns False when more bytes are needed."""
+        if self.state == _HEAD:
+            return self._parse_head(events)
+        if self.state in (_BODY_LENGTH, _CHUNK_DATA):
+            return self._take_body(events)
+        if self.state == _CHUNK_SIZE:
+            return self._parse_chunk_size()
+        if self.state == _CHUNK_CRLF:
+            if len(self.buffer) < 2:
+                return False
+            if self.buffer[:2] != b"\r\n":
+                raise HttpParserError("missing CRLF after chunk data")
+            del self.buffer[:2]
+            self.state = _CHUNK_SIZE
+            return True
+        if self.state == _TRAILERS:
+            return self._parse_trailers(events)
+        if self.state == _BODY_EOF:
+            if not self.buffer:
+                return False
+            events.append((BODY, bytes(self.buffer)))
+            del self.buffer[:]
+            return False
+        return False
+
+    def _parse_head(self, events):
+        # Tolerate empty lines between pipelined messages.
+        while self.buffer[:2] == b"\r\n":
+            del self.buffer[:2]
+
+        # Resume the search where the last one stopped.
+        end = self.buffer.find(b"\r\n\r\n", max(0, self._scan - 3))
+        if end < 0:
+            self._scan = len(self.buffer)
+            if self._scan > self.max_header_size:
+                raise HttpParserError("header block exceeds {} bytes".format(self.max_header_size),
+                                      431 if self.kind == REQUEST else 502)
+            return False
+        if end > self.max_header_size:
+            raise HttpParserError("header block exceeds {} bytes".format(self.max_header_size),
+                                  431 if self.kind == REQUEST else 502)
+
+        end += 4
+        self.raw_head = bytes(self.buffer[:end])
+        del self.buffer[:end]
+
+        lines = self.raw_head[:-4].split(b"\r\n")
+        self._parse_start_line(lines[0])
+        if self.kind == REQUEST:
+            events.append((START_LINE, (self.method, self.target, self.version)))
+        else:
+            events.append((START_LINE, (self.version, self.status_code, self.reason)))
+
+        for line in lines[1:]:
+            if b":" not in line:
+                raise HttpParserError("malformed header line {!r}".format(line))
+            name, value = line.split(b":", 1)
+            name = name.strip().lower()
+            value = value.strip()
+            if name in self.headers:
+                self.headers[name] = self.headers[name] + ", " + value
+            else:
+                self.headers[name] = value
+        events.append((HEADERS, self.headers))
+
+        self._frame_body()
+        if self.state == _DONE:
+            events.append((END, None))
+        return True
+
+    def _parse_start_line(self, line):
+        parts = line.split(None, 2)
+        if self.kind == REQUEST:
+            if len(parts) != 3 or not parts[2].startswith(b"HTTP/"):
+                raise HttpParserError("malformed request line {!r}".format(line))
+            self.method, self.target, self.version = parts
+        else:
+            if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+                raise HttpParserError("malformed status line {!r}".format(line), 502)
+            self.version = parts[0]
+            self.status_code = int(parts[1])
+            self.reason = parts[2] if len(parts) > 2 else b""
+
+    def _frame_body(self):
+        """Choose how the body is delimited, RFC 7230 section 3.3.3."""
+        transfer_encoding = None
+        if 'transfer-encoding' in self.headers:
+            codings = [c.strip().lower() for c in self.headers['transfer-encoding'].split(',')]
+            transfer_encoding = codings[-1]
+            if self.kind == REQUEST:
+                # Framing both ways is how requests get smuggled past a proxy.
+                if 'content-length' in self.headers:
+                    raise HttpParserError("both Transfer-Encoding and Content-Length")
+                if transfer_encoding != 'chunked':
+                    raise HttpParserError("Transfer-Encoding {!r} does not end in chunked".format(
+                        self.headers['transfer-encoding']))
+
+        # A response whose last coding is not chunked ends with the connection.
+        if transfer_encoding == 'chunked':
+            self.chunked = True
+        elif transfer_encoding is None and 'content-length' in self.headers:
+            try:
+                self.content_length = int(self.headers['content-length'])
+            except ValueError:
+                raise HttpParserError("invalid Content-Length {!r}".format(
+                    self.headers['content-length']))
+            if self.content_length < 0:
+                raise HttpParserError("negative Content-Length")
+
+        if self.kind == RESPONSE and (self.no_body or self.status_code in (204, 304)
+                                      or 100 <= self.status_code < 200):
+            self.state = _DONE
+        elif self.chunked:
+            self.state = _CHUNK_SIZE
+        elif self.content_length:
+            self._remaining = self.content_length
+            self.state = _BODY_LENGTH
+        elif self.content_length is None and self.kind == RESPONSE:
+            self.state = _BODY_EOF
+        else:
+            self.state = _DONE
+
+    def _take_body(self, events):
+        if not self.buffer:
+            return False
+        size = min(self._remaining, len(self.buffer))
+        events.append((BODY, bytes(self.buffer[:size])))
+        del self.buffer[:size]
+        self._remaining -= size
+        if self._remaining == 0:
+            if self.state == _CHUNK_DATA:
+                self.state = _CHUNK_CRLF
+            else:
+                self.state = _DONE
+                events.append((END, None))
+        return True
+
+    def _parse_chunk_size(self):
+        end = self.buffer.find(b"\r\n")
+        if end < 0:
+            if len(self.buffer) > MAX_CHUNK_LINE:
+                raise HttpParserError("chunk size line too long")
+            return False
+        line = bytes(self.buffer[:end]).split(b";", 1)[0].strip()
+        del self.buffer[:end + 2]
+        try:
+            size = int(line, 16)
+        except ValueError:
+            raise HttpParserError("invalid chunk size {!r}".format(line))
+        if size == 0:
+            self.state = _TRAILERS
+        else:
+            self._remaining = size
+            self.state = _CHUNK_DATA
+        return True
+
+    def _parse_trailers(self, events):
+        if self.buffer[:2] == b"\r\n":
+            end = 2
+        else:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self.buffer) > self.max_header_size:
+                    raise HttpParserError("trailer block too large", 431)
+                return False
+            end += 4
+        del self.buffer[:end]
+        self.state = _DONE
+        events.append((END, None))
+        return True
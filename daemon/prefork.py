@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.prefork
+~~~~~~~~~~~~~~~~~
+
+This module provides a pre-fork supervisor for the backend. Because of the
+GIL one Python process never uses more than one core for request parsing and
+response building, so the supervisor forks N worker processes that each run
+a complete backend engine (threaded or event loop) on the same port.
+
+The port is shared either through a listening socket created by the
+supervisor and inherited by every child, or with SO_REUSEPORT where each
+child binds its own socket and the kernel balances connections.
+
+Requirements:
+--------------
+- os / signal: fork, wait and signal the worker processes.
+- backend: the threaded accept loop run inside each worker.
+- eventloop: the event-loop engine run inside each worker.
+
+Notes:
+------
+- A worker that exits while the supervisor is running is restarted; one that
+  dies right after starting is restarted after a short delay.
+- SIGTERM or SIGINT on the supervisor stops the workers gracefully: they stop
+  accepting, finish the clients in progress and exit. Workers still alive
+  after ``GRACEFUL_TIMEOUT`` seconds are killed.
+- POSIX only, ``os.fork`` is required.
+- Workers share nothing but the port: state kept in memory by route handlers
+  (registries, sessions) would be split between them. Apps created with
+  ``WeApRous(stateful=True)`` are refused by :func:`create_backend`.
+
+Usage Example:
+--------------
+>>> run_prefork("0.0.0.0", 9000, routes={}, processes=4)
+"""
+
+import errno
+import os
+import signal
+import socket
+import time
+
+from .backend import serve_backend
+from .eventloop import EventBackend
+from .httpadapter import KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
+from .workerpool import DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+from .utils import create_listener
+
+#: Seconds workers get to finish their clients after a shutdown request.
+GRACEFUL_TIMEOUT = 10.0
+#: A worker dying sooner than this after its start is restarted with a delay.
+MIN_UPTIME = 1.0
+#: Seconds between two checks of the workers' state.
+WAIT_INTERVAL = 0.2
+
+
+def serve_worker(server, ip, port, routes, engine,
+                 workers, queue_size, keepalive_timeout, keepalive_max):
+    """
+    Body of a worker process: serve ``server`` with the chosen engine until
+    SIGTERM asks for a graceful stop.
+
+    :param server (socket.socket): listening socket of this worker.
+    :param engine (str): ``threaded`` or ``event``.
+
+    The remaining parameters are those of :func:`daemon.backend.create_backend`.
+    """
+    # The supervisor owns Ctrl-C and forwards it as SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if engine == 'event':
+        backend = EventBackend(ip, port, routes, keepalive_timeout, keepalive_max)
+        signal.signal(signal.SIGTERM, lambda signum, frame: backend.stop())
+        backend.serve(server)
+    else:
+        # Closing the listener ends the accept loop, which then drains its workers.
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.close())
+        serve_backend(server, ip, port, routes, workers, queue_size,
+                      keepalive_timeout, keepalive_max)
+
+
+def run_prefork(ip, port, routes, processes, reuse_port=False, engine='threaded',
+                workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max=KEEPALIVE_MAX):
+    """
+    Starts the supervisor: forks ``processes`` workers serving ``ip:port``,
+    restarts the ones that crash and shuts them all down on SIGTERM/SIGINT.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param processes (int): number of worker processes.
+    :param reuse_port (bool): each worker binds its own SO_REUSEPORT socket
+                              instead of inheriting the supervisor's one.
+    :param engine (str): ``threaded`` or ``event``, run in every worker.
+
+    The remaining parameters are those of :func:`daemon.backend.create_backend`.
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError("Pre-fork mode needs os.fork, unavailable on this platform")
+
+    listener = None
+    try:
+        if reuse_port:
+            # Fail early in the supervisor rather than in a crash-looping worker.
+            create_listener(ip, port, reuse_port=True).close()
+        else:
+            listener = create_listener(ip, port, backlog=socket.SOMAXCONN)
+    except socket.error as e:
+        print("Socket error: {}".format(e))
+        return
+
+    print("[Prefork] Listening on port {} with {} {} workers{}".format(
+        port, processes, engine, " (SO_REUSEPORT)" if reuse_port else ""))
+    if routes != {}:
+        print("[Backend] route settings {}".format(routes))
+
+    def spawn():
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # Worker process: never return into the supervisor's code.
+        status = 0
+        try:
+            server = listener or create_listener(ip, port, backlog=socket.SOMAXCONN,
+                                                 reuse_port=True)
+            serve_worker(server, ip, port, routes, engine,
+                         workers, queue_size, keepalive_timeout, keepalive_max)
+        except Exception as e:
+            print("[Prefork] worker {} failed: {}".format(os.getpid(), e))
+            status = 1
+        finally:
+            os._exit(status)
+
+    state = {'stopping': False}
+
+    def request_stop(signum, frame):
+        state['stopping'] = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    children = {}
+    for _ in range(processes):
+        children[spawn()] = time.time()
+    print("[Prefork] workers {}".format(sorted(children)))
+
+    deadline = None
+    while children:
+        if state['stopping'] and deadline is None:
+            print("[Prefork] shutting down {} workers".format(len(children)))
+            deadline = time.time() + GRACEFUL_TIMEOUT
+            for pid in children:
+                _signal(pid, signal.SIGTERM)
+        if deadline is not None and time.time() > deadline:
+            for pid in children:
+                print("[Prefork] worker {} did not stop, killing it".format(pid))
+                _signal(pid, signal.SIGKILL)
+            deadline = float('inf')
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            if e.errno == errno.ECHILD:
+                break
+            raise
+        if pid == 0:
+            time.sleep(WAIT_INTERVAL)
+            continue
+
+        started = children.pop(pid, None)
+        if started is None or state['stopping']:
+            continue
+        print("[Prefork] worker {} exited with status {}, restarting".format(pid, status))
+        if time.time() - started < MIN_UPTIME:
+            time.sleep(MIN_UPTIME)
+        children[spawn()] = time.time()
+
+    if listener is not None:
+        listener.close()
+    print("[Prefork] all workers stopped")
+
+
+def _signal(pid, signum):
+    """Send ``signum`` to ``pid``, ignoring processes that already exited."""
+    try:
+        os.kill(pid, signum)
+    except OSError:
+        pass
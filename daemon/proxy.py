@@ -26,13 +26,31 @@ Requirement:
 - response: customized :class: `Response <Response>` utilities.
 - httpadapter: :class: `HttpAdapter <HttpAdapter >` adapter for HTTP request processing.
 - dictionary: :class: `CaseInsensitiveDict <CaseInsensitiveDict>` for managing headers and cookies.
+- httpparser: :class: `HttpParser <HttpParser>` incremental reading of requests and responses.
+- upstream: :class: `UpstreamPool <UpstreamPool>` keep-alive connections to the backends.
+- balancer: load-balancing policies of the hosts with several backends.
+- health: passive and active health checks ejecting failed backends.
+- routing: :class: `RouteTable <RouteTable>` compiled virtual hosts, reloaded on SIGHUP.
+- httpcache: :class: `HttpCache <HttpCache>` shared cache of the backend responses.
+- singleflight: :class: `SingleFlight <SingleFlight>` coalescing of identical requests.
 
 """
+import errno
+import signal
 import socket
 import threading
 from .response import *
 from .httpadapter import HttpAdapter
 from .dictionary import CaseInsensitiveDict
+from .httpparser import (HttpParser, HttpParserError, REQUEST, RESPONSE, BODY,
+                         LAST_CHUNK, encode_chunk)
+from .upstream import UpstreamPool, CONNECT_TIMEOUT, IO_TIMEOUT
+from .balancer import ACTIVE_REQUESTS
+from .health import HealthChecker
+from .routing import RouteTable, RouteHolder, parse_address
+from .httpcache import (HttpCache, CacheFill, cache_key, flight_key, with_credentials,
+                        wants_revalidation, send_entry)
+from .singleflight import SingleFlight
 
 #: A dictionary mapping hostnames to backend IP and port tuples.
 #: Used to determine routing targets for incoming requests.
@@ -42,84 +60,296 @@ PROXY_PASS = {
     "app2.local": ('192.168.56.103', 9002),
 }
 
+#: Available proxy engines, the first one is the default.
+ENGINES = ('threaded', 'event')
 
-def forward_request(host, port, request):
+#: Keep-alive connections to the backends, shared by every client thread.
+UPSTREAM_POOL = UpstreamPool()
+
+#: Health of the backends of the hosts with several proxy_pass entries.
+HEALTH = HealthChecker()
+
+#: Responses of the backends served again while fresh, 0 bytes disables it.
+CACHE = HttpCache()
+
+#: Identical GET requests in progress, sharing one backend response. Its
+#: ``ttl`` is the micro-cache window, 0 by default. Waiters stay as long as
+#: the leader's backend exchange may last, so a long poll held open by the
+#: backend is sent once instead of again by every waiter giving up.
+FLIGHTS = SingleFlight(timeout=CONNECT_TIMEOUT + IO_TIMEOUT)
+
+#: Methods sent again to another backend when the first one failed.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE'])
+
+#: Size of the per-thread buffer responses are relayed through, in bytes.
+RELAY_BUFFER_SIZE = 64 * 1024
+#: Request bodies up to this size are read before forwarding, so the request
+#: can be sent again on a stale pooled connection; the rest is streamed.
+BODY_BUFFER_SIZE = 64 * 1024
+
+_local = threading.local()
+
+#: Hop-by-hop headers, replaced by the proxy's own Connection header.
+HOP_BY_HOP = ('connection', 'keep-alive', 'proxy-connection', 'te', 'trailer', 'upgrade')
+
+
+def upstream_head(raw_head, keep_alive=True):
     """
-    Forwards an HTTP request to a backend server and retrieves the response.
+    Rewrite a client request head for a pooled backend connection: the
+    hop-by-hop headers of the client are dropped and the connection to the
+    backend is asked to stay open.
 
-    :params host (str): IP address of the backend server.
-    :params port (int): port number of the backend server.
-    :params request (str): incoming HTTP request.
+    :params raw_head (bytes): request line and headers, terminator included.
+    :params keep_alive (bool): False to ask the backend to close the
+                               connection after its response instead.
+
+    :rtype bytes: the head to send upstream.
+    """
+    return _replace_hop_by_hop(raw_head, b"keep-alive" if keep_alive else b"close")
+
+
+def client_head(raw_head):
+    """
+    Rewrite a backend response head for the client: the hop-by-hop headers
+    of the pooled backend connection are dropped and the client connection
+    is closed after the response, as for responses served from the cache.
 
-    :rtype bytes: Raw HTTP response from the backend server. If the connection
-                  fails, returns a 404 Not Found response.
+    :params raw_head (bytes): status line and headers, terminator included.
+
+    :rtype bytes: the head to relay.
+    """
+    return _replace_hop_by_hop(raw_head, b"close")
+
+
+def _replace_hop_by_hop(raw_head, connection):
+    """Drop the hop-by-hop headers of a message head, those named by its
+    Connection header included, and end it with ``Connection: connection``."""
+    lines = raw_head.split(b"\r\n")
+    start_line, fields = lines[0], [line for line in lines[1:] if line]
+    dropped = set(HOP_BY_HOP)
+    for line in fields:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"connection":
+            dropped.update(token.strip().lower() for token in value.split(b","))
+    kept = [line for line in fields
+            if line.partition(b":")[0].strip().lower() not in dropped]
+    return (start_line + b"\r\n" + b"".join(line + b"\r\n" for line in kept)
+            + b"Connection: " + connection + b"\r\n\r\n")
+
+
+class UpstreamError(Exception):
+    """Raised when a backend fails before any byte of its response was
+    relayed, so the request may still be answered another way.
+
+    :attrs replayable (bool): the request can be sent again, no part of a
+                              streamed body was consumed.
     """
 
-    backend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    def __init__(self, message, replayable=True):
+        super(UpstreamError, self).__init__(message)
+        self.replayable = replayable
+
+
+def _relay_view():
+    """Per-thread reusable relay buffer, as a memoryview."""
+    view = getattr(_local, 'view', None)
+    if view is None:
+        view = _local.view = memoryview(bytearray(RELAY_BUFFER_SIZE))
+    return view
 
+
+def _send_error(conn, response):
+    """Send an error response to a client that may already be gone."""
     try:
-        backend.connect((host, port))
-        backend.sendall(request.encode())
-        response = b""
-        while True:
-            chunk = backend.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-        return response
-    except socket.error as e:
-      print("Socket error: {}".format(e))
-      return (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
+        conn.sendall(response)
+    except socket.error:
+        pass
 
 
-def resolve_routing_policy(hostname, routes):
+def read_body(conn, parser):
+    """
+    Yield the rest of a request body from the client, framed for the backend
+    as it arrived: chunked bodies are chunk-encoded again, the last chunk
+    included.
+
+    :params conn (socket.socket): client connection.
+    :params parser (HttpParser): parser holding the request being read.
+
+    :raises HttpParserError: if the body is malformed.
+    :raises socket.error: if the client leaves before the end of the body.
+    """
+    while not parser.complete:
+        events = parser.recv(conn)
+        if parser.closed and not parser.complete:
+            raise socket.error("client closed the connection during the body")
+        for event, value in events:
+            if event == BODY and value:
+                yield encode_chunk(value) if parser.chunked else value
+    if parser.chunked:
+        yield LAST_CHUNK
+
+
+def forward_request(host, port, request, conn, body=None, fill=None):
+    """
+    Forwards an HTTP request to a backend server and relays the response to
+    the client as it arrives.
+
+    The response is read into a reusable buffer with ``recv_into`` and each
+    piece is written to the client before the next one is read, so memory
+    stays bounded whatever the response size, and a slow client slows the
+    backend read down instead of piling bytes up in the proxy. The parser
+    only follows the framing (Content-Length, chunked, close) to know where
+    the response ends; the bytes are relayed unchanged.
+
+    The request goes over a pooled keep-alive connection, which is checked
+    back in once the response was read to its end. When a reused connection
+    turns out to be closed by the backend before any response byte arrived,
+    the request is sent again once on a new connection, unless part of a
+    streamed body was already consumed. The response head is held until
+    complete to replace the hop-by-hop headers of the backend connection
+    with ``Connection: close``, see :func:`client_head`.
+
+    With a ``fill`` the relayed bytes are also copied to the proxy cache. A
+    revalidation holds the response back until its status line is known: a
+    304 refreshes the stored entry and is not relayed.
+
+    :params host (str): IP address of the backend server.
+    :params port (int): port number of the backend server.
+    :params request (bytes): incoming HTTP request, head and buffered body.
+    :params conn (socket.socket): client connection the response is relayed to.
+    :params body (iterator): rest of the request body, read from the client
+                             while it is sent, None if ``request`` is complete.
+    :params fill (CacheFill): copy of the response for the cache, if any.
+
+    :rtype bool: True if the whole response was relayed, False if it was cut
+                 short or the client was answered with an error.
+    :raises UpstreamError: if the backend failed before any byte of its
+                           response was relayed; the client got nothing yet.
+    """
+
+    no_body = request.startswith(b"HEAD ")
+    view = _relay_view()
+    for attempt in range(2):
+        reused = False
+        reusable = False
+        streamed = False
+        relayed = 0
+        backend = None
+        # The head is held until complete, then rewritten for the client
+        held = []
+        withheld = False
+        if fill is not None:
+            fill.reset()
+        try:
+            backend, reused = UPSTREAM_POOL.acquire(host, port)
+            # The response ends where its framing says, not when a keep-alive
+            # backend eventually closes the connection.
+            parser = HttpParser(RESPONSE)
+            parser.reset(no_body=no_body)
+            backend.sendall(request)
+            if body is not None:
+                streamed = True
+                pieces = iter(body)
+                while True:
+                    try:
+                        piece = next(pieces)
+                    except StopIteration:
+                        break
+                    except HttpParserError as e:
+                        print("[Proxy] bad request body: {}".format(e))
+                        _send_error(conn, Response().build_response_error(e.status_code, str(e)))
+                        return False
+                    except socket.error as e:
+                        print("[Proxy] client left during the request body: {}".format(e))
+                        return False
+                    backend.sendall(piece)
+            while not parser.complete:
+                nbytes = backend.recv_into(view)
+                if not nbytes:
+                    if not relayed:
+                        raise socket.error("connection closed by {}:{}".format(host, port))
+                    parser.feed_eof()
+                    break
+                parser.feed(view[:nbytes])
+                # Bytes past the end of the response are not the client's.
+                end = nbytes - len(parser.buffer) if parser.complete else nbytes
+                chunk = view[:end]
+                if held is not None:
+                    held.append(chunk.tobytes())
+                    if not parser.raw_head:
+                        continue
+                    received, held = b"".join(held), None
+                    chunk = client_head(parser.raw_head) + received[len(parser.raw_head):]
+                    if fill is not None and fill.stale is not None:
+                        withheld = fill.not_modified(parser.status_code, parser.headers)
+                if withheld:
+                    continue
+                relayed += len(chunk)
+                if fill is not None:
+                    fill.feed(chunk)
+                try:
+                    conn.sendall(chunk)
+                except socket.error as e:
+                    print("[Proxy] client left during the response: {}".format(e))
+                    return False
+            reusable = parser.complete and not parser.closed and parser.keep_alive() \
+                and not parser.buffer
+            if fill is not None and not withheld:
+                fill.finish()
+            return True
+        except HttpParserError as e:
+            print("[Proxy] bad response from {}:{}: {}".format(host, port, e))
+            if not relayed:
+                raise UpstreamError("bad response: {}".format(e), not streamed)
+            return False
+        except socket.error as e:
+            if (reused and not relayed and not streamed and attempt == 0
+                    and not isinstance(e, socket.timeout)):
+                print("[Proxy] pooled connection to {}:{} was stale, retrying".format(host, port))
+                continue
+            print("Socket error: {}".format(e))
+            if not relayed:
+                raise UpstreamError(str(e), not streamed)
+            return False
+        finally:
+            if backend is not None:
+                UPSTREAM_POOL.release(host, port, backend, reusable)
+
+
+def resolve_routing_policy(hostname, routes, client_ip=None, exclude=()):
     """
     Handles an routing policy to return the matching proxy_pass.
     It determines the target backend to forward the request to.
 
-    :params host (str): IP address of the request target server.
-    :params port (int): port number of the request target server.
-    :params routes (dict): dictionary mapping hostnames and location.
-    """
-
-    print(hostname)
-    proxy_map, policy = routes.get(hostname,('127.0.0.1:9000','round-robin'))
-    print proxy_map
-    print policy
-
-    proxy_host = ''
-    proxy_port = '9000'
-    if isinstance(proxy_map, list):
-        if len(proxy_map) == 0:
-            print("[Proxy] Emtpy resolved routing of hostname {}".format(hostname))
-            print "Empty proxy_map result"
-            # TODO: implement the error handling for non mapped host
-            #       the policy is design by team, but it can be 
-            #       basic default host in your self-defined system
-            # Use a dummy host to raise an invalid connection
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-        elif len(value) == 1:
-            proxy_host, proxy_port = proxy_map[0].split(":", 2)
-        #elif: # apply the policy handling 
-        #   proxy_map
-        #   policy
-        else:
-            # Out-of-handle mapped host
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-    else:
-        print("[Proxy] resolve route of hostname {} is a singulair to".format(hostname))
-        proxy_host, proxy_port = proxy_map.split(":", 2)
+    Hosts with several proxy_pass entries are balanced by the policy named
+    in their dist_policy, see :mod:`daemon.balancer`, skipping the backends
+    ejected by :data:`HEALTH`. A host with a single backend always uses it.
+
+    :params hostname (str): Host header of the request.
+    :params routes (RouteTable): compiled virtual hosts.
+    :params client_ip (str): address of the client, for the ``ip-hash`` policy.
+    :params exclude (set): ``host:port`` backends that already failed this request.
 
-    return proxy_host, proxy_port
+    :rtype tuple: (host, port) of the backend, (None, None) if no backend is usable.
+    """
+
+    route = routes.lookup(hostname)
+    if not route.upstreams:
+        print("[Proxy] Emtpy resolved routing of hostname {}".format(hostname))
+        # Use a dummy host to raise an invalid connection
+        return '127.0.0.1', 9000
+
+    if route.balancer is None:
+        upstream = route.upstreams[0]
+    else:
+        upstream = route.balancer.choose(
+            client_ip, lambda u: u not in exclude and HEALTH.is_available(u))
+        if upstream is None:
+            print("[Proxy] no healthy upstream left for {}".format(hostname))
+            return None, None
+    if upstream in exclude:
+        return None, None
+    return route.addresses[upstream]
 
 def handle_client(ip, port, conn, addr, routes):
     """
@@ -130,48 +360,170 @@ def handle_client(ip, port, conn, addr, routes):
     matches the hostname against known routes. In the matching
     condition,it forwards the request to the appropriate backend.
 
-    The handler sends the backend response back to the client or
-    returns 404 if the hostname is unreachable or is not recognized.
+    The handler sends the backend response back to the client, or
+    answers 502 if the backend fails and 503 if every backend of the
+    host is ejected. GET and HEAD requests are answered from
+    :data:`CACHE` while the stored response is fresh; identical GET
+    requests arriving while one is fetched share its response through
+    :data:`FLIGHTS`.
 
     :params ip (str): IP address of the proxy server.
     :params port (int): port number of the proxy server.
     :params conn (socket.socket): client connection socket.
     :params addr (tuple): client address (IP, port).
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (RouteTable): compiled virtual hosts.
     """
 
-    request = conn.recv(1024).decode()
+    # Read the headers and the beginning of the body, larger bodies are
+    # streamed to the backend by forward_request
+    parser = HttpParser(REQUEST)
+    body = []
+    buffered = 0
+    try:
+        while not parser.complete and (not parser.raw_head or buffered < BODY_BUFFER_SIZE):
+            for event, value in parser.recv(conn):
+                if event == BODY:
+                    body.append(value)
+                    buffered += len(value)
+            if parser.closed and not parser.complete:
+                conn.close()
+                return
+    except HttpParserError as e:
+        print("[Proxy] {} sent a bad request: {}".format(addr, e))
+        conn.sendall(Response().build_response_error(e.status_code, str(e)))
+        conn.close()
+        return
+    except socket.error as e:
+        print("Socket error: {}".format(e))
+        conn.close()
+        return
+
+    # The parser decodes chunked bodies, frame them again for the backend
+    if parser.chunked:
+        payload = b"".join(encode_chunk(piece) for piece in body if piece)
+        if parser.complete:
+            payload += LAST_CHUNK
+    else:
+        payload = b"".join(body)
+    request = upstream_head(parser.raw_head) + payload
+    rest = None if parser.complete else read_body(conn, parser)
 
     # Extract hostname
-    for line in request.splitlines():
-        if line.lower().startswith('host:'):
-            hostname = line.split(':', 1)[1].strip()
+    hostname = parser.headers.get('host', '')
 
     print("[Proxy] {} at Host: {}".format(addr, hostname))
 
-    # Resolve the matching destination in routes and need conver port
-    # to integer value
-    resolved_host, resolved_port = resolve_routing_policy(hostname, routes)
-    try:
-        resolved_port = int(resolved_port)
-    except ValueError:
-        print("Not a valid integer")
+    # Answer from the cache while the stored response is fresh
+    key = None
+    if CACHE.enabled and rest is None:
+        key = cache_key(parser.method, hostname, parser.target, parser.headers)
+    credentials = with_credentials(parser.headers)
+    entry = None
+    if key is not None:
+        entry = CACHE.get(key, credentials)
+        if entry is not None and entry.is_fresh() and not wants_revalidation(parser.headers):
+            _send_cached(conn, entry, parser)
+            return
+
+    shared_key = None
+    if rest is None:
+        shared_key = flight_key(parser.method, hostname, parser.target, parser.headers)
+    if shared_key is None:
+        _forward(conn, addr, hostname, parser, request, rest, routes)
+        conn.close()
+        return
+
+    def fetch():
+        # The response is copied while relayed, for the cache and for the
+        # identical requests waiting for it
+        stale = entry if entry is not None and entry.can_revalidate() else None
+        fill = CacheFill(CACHE, key, credentials, stale)
+        upstream_request = fill.conditional(request) if stale is not None else request
+        _forward(conn, addr, hostname, parser, upstream_request, rest, routes, fill)
+        return fill.entry
+
+    # Identical GETs in flight share one backend response
+    response, shared = FLIGHTS.do(shared_key, fetch, keep=lambda r: r.reusable())
+    if shared:
+        if response is not None:
+            _send_cached(conn, response, parser)
+            return
+        # The shared fetch failed or took too long, fetch on our own
+        _forward(conn, addr, hostname, parser, request, rest, routes)
+    conn.close()
 
-    if resolved_host:
-        print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname,resolved_host, resolved_port))
-        response = forward_request(resolved_host, resolved_port, request)        
-    else:
-        response = (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
-    conn.sendall(response)
+
+def _send_cached(conn, entry, parser):
+    """Answer a request with a stored or shared response and close the
+    client connection."""
+    print("[Proxy] served {} without the backend".format(parser.target))
+    send_entry(conn, entry, parser.method, parser.headers)
     conn.close()
 
+
+def _forward(conn, addr, hostname, parser, request, rest, routes, fill=None):
+    """
+    Send a request to a backend of its host, trying another backend when an
+    idempotent request fails before any response byte was relayed.
+
+    :params fill (CacheFill): copy of the response for the cache, if any.
+    """
+
+    # Idempotent requests that fail before any response byte are sent again
+    # to another backend of the host
+    retry = parser.method in IDEMPOTENT_METHODS
+    tried = set()
+    while True:
+        # Resolve the matching destination in the route table
+        resolved_host, resolved_port = resolve_routing_policy(hostname, routes, addr[0], tried)
+        if resolved_host is None:
+            if tried:
+                _send_error(conn, Response().build_response_error(502, "Bad Gateway"))
+            else:
+                _send_error(conn, Response().build_response_error(503, "No healthy upstream"))
+            break
+
+        print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname,resolved_host, resolved_port))
+        upstream = "{}:{}".format(resolved_host, resolved_port)
+        ACTIVE_REQUESTS.begin(upstream)
+        try:
+            forward_request(resolved_host, resolved_port, request, conn, rest, fill)
+            HEALTH.record_success(upstream)
+            if fill is not None and fill.revalidated:
+                print("[Proxy] cache revalidated {}".format(parser.target))
+                send_entry(conn, fill.entry, parser.method, parser.headers)
+            elif parser.method not in ('GET', 'HEAD'):
+                # The request may have changed the target, RFC 7234 section 4.4
+                CACHE.invalidate(hostname, parser.target)
+        except UpstreamError as e:
+            print("[Proxy] {} failed: {}".format(upstream, e))
+            HEALTH.record_failure(upstream)
+            tried.add(upstream)
+            if retry and e.replayable:
+                continue
+            _send_error(conn, Response().build_response_error(502, "Bad Gateway"))
+        finally:
+            ACTIVE_REQUESTS.end(upstream)
+        break
+
+def _routes_swapped(old, new):
+    """
+    Follow a configuration reload: backends no longer configured have their
+    pooled connections drained and stop being probed, new balanced backends
+    start being probed.
+
+    :params old (RouteTable): table replaced by the reload.
+    :params new (RouteTable): table now in use.
+    """
+    removed = old.upstreams() - new.upstreams()
+    for name in removed:
+        UPSTREAM_POOL.retire(*parse_address(name))
+    HEALTH.unwatch(old.balanced_upstreams() - new.balanced_upstreams())
+    HEALTH.watch(new.balanced_upstreams())
+    if removed:
+        print("[Proxy] upstreams removed: {}".format(", ".join(sorted(removed))))
+
+
 def run_proxy(ip, port, routes):
     """
     Starts the proxy server and listens for incoming connections. 
@@ -179,29 +531,41 @@ def run_proxy(ip, port, routes):
     The process dinds the proxy server to the specified IP and port.
     In each incomping connection, it accepts the connections and
     spawns a new thread for each client using `handle_client`.
- 
+
+    Each connection is routed with the table current when it was accepted,
+    so a reload never changes the routing of a request in progress.
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (RouteHolder): holder of the current route table.
 
     """
 
     proxy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
+    # Probe the backends of the balanced hosts in the background
+    HEALTH.watch(routes.table.balanced_upstreams())
+    HEALTH.start()
+
     try:
         proxy.bind((ip, port))
         proxy.listen(50)
         print("[Proxy] Listening on IP {} port {}".format(ip,port))
         while True:
-            conn, addr = proxy.accept()
+            try:
+                conn, addr = proxy.accept()
+            except socket.error as e:
+                # A signal (SIGHUP reload) interrupted the wait
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
             #
             # Implement threading for client connections (Task 1)
             # Spawn a new thread for each client using handle_client routine
             #
             client_thread = threading.Thread(
                 target=handle_client,
-                args=(ip, port, conn, addr, routes)
+                args=(ip, port, conn, addr, routes.table)
             )
             client_thread.setDaemon(True)  # Python 2 compatible
             client_thread.start()
@@ -210,13 +574,41 @@ def run_proxy(ip, port, routes):
     except socket.error as e:
       print("Socket error: {}".format(e))
 
-def create_proxy(ip, port, routes):
+def create_proxy(ip, port, routes, loader=None, watch_file=None, engine=ENGINES[0]):
     """
     Entry point for launching the proxy server.
 
+    With a ``loader`` the routes are rebuilt on SIGHUP, and whenever
+    ``watch_file`` changes if given, without interrupting the requests in
+    progress.
+
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (RouteTable): compiled virtual hosts, a dictionary mapping
+                                 hostnames and location is compiled first.
+    :params loader (callable): returns the routes read from the configuration.
+    :params watch_file (str): configuration file polled for changes.
+    :params engine (str): ``threaded`` (thread per client) or ``event``
+                          (single-threaded non-blocking loop, see
+                          :mod:`daemon.eventproxy`).
     """
 
-    run_proxy(ip, port, routes)
+    if engine not in ENGINES:
+        raise ValueError("Unknown proxy engine {}, expected one of {}".format(engine, ENGINES))
+    if not isinstance(routes, RouteTable):
+        routes = RouteTable.from_dict(routes)
+    holder = RouteHolder(routes, loader, _routes_swapped)
+    if loader is not None:
+        if hasattr(signal, 'SIGHUP'):
+            # The handler only wakes the reload thread, the swap takes locks
+            # the interrupted thread may hold.
+            holder.start_reloader()
+            signal.signal(signal.SIGHUP, lambda signum, frame: holder.request_reload())
+        if watch_file:
+            holder.watch(watch_file)
+    if engine == 'event':
+        # Imported here, the event engine is built on top of this module.
+        from .eventproxy import run_event_proxy
+        run_event_proxy(ip, port, holder)
+    else:
+        run_proxy(ip, port, holder)
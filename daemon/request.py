@@ -19,6 +19,7 @@ daemon.request
 This module provides a Request object to manage and persist 
 request settings (cookies, auth, proxies).
 """
+from urlparse import parse_qsl
 from .dictionary import CaseInsensitiveDict
 
 class Request():
@@ -48,6 +49,7 @@ class Request():
         "body",
         "routes",
         "hook",
+        "query",
     ]
 
     def __init__(self):
@@ -59,6 +61,8 @@ class Request():
         self.headers = None
         #: HTTP path
         self.path = None        
+        #: dictionary of the query string parameters.
+        self.query = {}
         # The cookies set used to create Cookie header
         self.cookies = None
         #: request body to send to the server.
@@ -74,6 +78,10 @@ class Request():
             first_line = lines[0]
             method, path, version = first_line.split()
 
+            # Routes and files are matched on the path without the query
+            path, _, query = path.partition('?')
+            self.query = dict(parse_qsl(query))
+
             if path == '/':
                 path = '/index.html'
         except Exception:
@@ -82,17 +90,25 @@ class Request():
         return method, path, version
              
     def prepare_headers(self, request):
-        """Prepares the given HTTP headers."""
+        """Prepares the given HTTP headers, the way
+        :class:`HttpParser <HttpParser>` reads them: lower-cased names,
+        stripped values, repeated headers joined with commas."""
         lines = request.split('\r\n')
         headers = {}
         for line in lines[1:]:
-            if ': ' in line:
-                key, val = line.split(': ', 1)
-                headers[key.lower()] = val
+            if ':' in line:
+                key, val = line.split(':', 1)
+                key, val = key.strip().lower(), val.strip()
+                headers[key] = headers[key] + ", " + val if key in headers else val
         return headers
 
-    def prepare(self, request, routes=None):
-        """Prepares the entire request with the given parameters."""
+    def prepare(self, request, routes=None, headers=None):
+        """Prepares the entire request with the given parameters.
+
+        :param headers (dict): headers already parsed by the connection's
+                               :class:`HttpParser <HttpParser>`, which framed
+                               the body; parsed from ``request`` if None.
+        """
 
         # Prepare the request line from the request header
         self.method, self.path, self.version = self.extract_request_line(request)
@@ -113,7 +129,10 @@ class Request():
             # ...
             #
 
-        self.headers = self.prepare_headers(request)
+        if headers is not None:
+            self.headers = dict(headers)
+        else:
+            self.headers = self.prepare_headers(request)
         cookies = self.headers.get('cookie', '')
             #
             #  TODO: implement the cookie function here
@@ -25,10 +25,98 @@ The current version supports MIME type detection, content loading and header for
 import datetime
 import os
 import mimetypes
+import uuid
 from .dictionary import CaseInsensitiveDict
+from .filecache import FileCache
+from .compression import MIN_COMPRESS_SIZE, is_compressible, choose_encoding
+from .zerocopy import send_file
+from .utils import http_date, parse_http_date, etag_matches
 
 BASE_DIR = ""
 
+#: Shared in-memory cache of the files served from www/, static/ and apps/.
+STATIC_CACHE = FileCache()
+
+#: Cache-Control of static files, looked up by full MIME type then by main
+#: type. Static content sits behind the session cookie, hence ``private``.
+#: HTML is revalidated on every visit, which costs a 304 once it is cached.
+CACHE_CONTROL = {
+    'text/html': 'private, no-cache',
+    'text/css': 'private, max-age=3600',
+    'image': 'private, max-age=86400',
+    'application': 'private, max-age=3600',
+}
+#: Cache-Control of the MIME types missing from :data:`CACHE_CONTROL`.
+DEFAULT_CACHE_CONTROL = 'no-cache'
+
+#: Range headers asking for more parts than this are ignored (full response).
+MAX_RANGES = 16
+
+#: ``application/*`` types served from apps/, the app archives. The sources
+#: and bytecode of the apps next to them are not static content.
+APP_ARCHIVE_TYPES = frozenset(['application/zip', 'application/x-tar'])
+
+
+def cache_control_for(mime_type):
+    """Return the Cache-Control value configured for ``mime_type``."""
+    mime_type = (mime_type or '').split(';', 1)[0].strip().lower()
+    value = CACHE_CONTROL.get(mime_type)
+    if value is None:
+        value = CACHE_CONTROL.get(mime_type.split('/', 1)[0], DEFAULT_CACHE_CONTROL)
+    return value
+
+
+def set_cache_max_age(mime_type, seconds):
+    """
+    Configure how long clients may reuse a static file without revalidating.
+
+    :params mime_type (str): full MIME type (``text/css``) or main type (``image``).
+    :params seconds (int): max-age, 0 to make clients revalidate on every use.
+    """
+    if seconds > 0:
+        CACHE_CONTROL[mime_type.lower()] = 'private, max-age={}'.format(int(seconds))
+    else:
+        CACHE_CONTROL[mime_type.lower()] = 'private, no-cache'
+
+
+def parse_range(header, size):
+    """
+    Parse a ``Range: bytes=...`` header against a representation of ``size``
+    bytes, e.g. ``bytes=0-499``, ``bytes=500-`` or ``bytes=-500``.
+
+    :params header (str): value of the Range header.
+    :params size (int): length of the full representation.
+
+    :rtype list: (first, last) inclusive positions of the satisfiable ranges,
+                 empty if none is, or None if the header is malformed.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+
+    ranges = []
+    for item in spec.split(','):
+        first, sep, last = item.strip().partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            # Suffix range: the last N bytes.
+            if not last:
+                return None
+            length = int(last)
+            if length and size:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        first = int(first)
+        if last and int(last) < first:
+            return None
+        if first < size:
+            last = min(int(last), size - 1) if last else size - 1
+            ranges.append((first, last))
+    return ranges
+
+
 class Response():   
     """The :class:`Response <Response>` object, which contains a
     server's response to an HTTP request.
@@ -86,6 +174,10 @@ class Response():
         """
 
         self._content = False
+        self._entry = None
+        #: Body parts sent after the header: bytes, or (path, offset, length)
+        #: file ranges streamed from disk. None when the body is in memory.
+        self._stream = None
         self._content_consumed = False
         self._next = None
 
@@ -186,41 +278,71 @@ class Response():
         return base_dir
 
 
+    def resolve_path(self, path, base_dir):
+        """
+        Maps a request path onto a file below ``base_dir``.
+
+        :params path (str): relative path to the file.
+        :params base_dir (str): base directory where the file is located.
+
+        :rtype str: the resolved file path, or None if ``path`` escapes ``base_dir``.
+        """
+        root = os.path.realpath(base_dir)
+        filepath = os.path.realpath(os.path.join(root, path.lstrip('/')))
+        if not filepath.startswith(root + os.sep):
+            return None
+        return filepath
+
+
     def build_content(self, path, base_dir):
         """
         Loads the objects file from storage space.
 
+        Files are served through the shared :data:`STATIC_CACHE`, which only
+        touches the disk when the file is new or its mtime/size changed.
+
         :params path (str): relative path to the file.
         :params base_dir (str): base directory where the file is located.
 
         :rtype tuple: (int, bytes) representing content length and content data.
         """
 
-        filepath = os.path.join(base_dir, path.lstrip('/'))
+        filepath = self.resolve_path(path, base_dir)
 
         print("[Response] serving the object at location {}".format(filepath))
             #
             #  TODO: implement the step of fetch the object file
             #        store in the return value of content
             #
-        # Đọc nội dung file
-        try:
-            with open(filepath, 'rb') as f:
-                content = f.read()
-        except IOError as e:
-            print("[Response] Error reading file {}: {}".format(filepath, e))
+        # Đọc nội dung file (qua cache)
+        self._entry = None
+        if filepath is not None:
+            content_type = self.headers.get('Content-Type', 'application/octet-stream')
+            self._entry = STATIC_CACHE.get(filepath, content_type)
+
+        if self._entry is None:
+            print("[Response] Error reading file {} from {}".format(path, base_dir))
             content = ""
-        
+        elif self._entry.content is None:
+            # Too large for the cache, sent from disk after the header.
+            self._stream = [(self._entry.path, 0, self._entry.size)]
+            return self._entry.size, b""
+        else:
+            content = self._entry.content
+
         return len(content), content
 
 
-    def build_response_header(self, request):
+    def build_response_header(self, request, overrides=None):
         """
         Constructs the HTTP response headers based on the class:`Request <Request>
         and internal attributes.
 
         :params request (class:`Request <Request>`): incoming request object.
 
+        :params overrides (dict): headers replacing the computed ones, e.g. the
+                             Content-Range of a partial response.
+
         :rtypes bytes: encoded HTTP response header.
         """
         reqhdr = request.headers
@@ -231,7 +353,7 @@ class Response():
                 "Accept": "{}".format(reqhdr.get("Accept", "application/json")),
                 "Accept-Language": "{}".format(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
                 "Authorization": "{}".format(reqhdr.get("Authorization", "Basic <credentials>")),
-                "Cache-Control": "no-cache",
+                "Cache-Control": cache_control_for(self.headers['Content-Type']),
                 "Content-Type": "{}".format(self.headers['Content-Type']),
                 "Content-Length": "{}".format(len(self._content)),
 #                "Cookie": "{}".format(reqhdr.get("Cookie", "sessionid=xyz789")), #dummy cooki
@@ -241,7 +363,6 @@ class Response():
 	# self.auth = ...
                 "Date": "{}".format(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
                 "Max-Forward": "10",
-                "Pragma": "no-cache",
                 "Proxy-Authorization": "Basic dXNlcjpwYXNz",  # example base64
                 "Warning": "199 Miscellaneous warning",
                 "User-Agent": "{}".format(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
@@ -252,6 +373,12 @@ class Response():
             #  TODO: implement the header building to create formated
             #        header from the provied headers
             #
+        # Precomputed Content-Type, Content-Length and ETag of the cached file
+        if self._entry is not None:
+            headers.update(self._entry.headers)
+        if overrides:
+            headers.update(overrides)
+
         # Build formatted header string
         fmt_header = ""
         for key, val in headers.items():
@@ -267,6 +394,201 @@ class Response():
         return str(fmt_header).encode('utf-8')
 
 
+    def is_not_modified(self, request):
+        """
+        Evaluates the conditional headers of ``request`` against the file just
+        loaded by :meth:`build_content`. If-None-Match wins over
+        If-Modified-Since, as in RFC 7232.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bool: True if the client copy is current and a 304 applies.
+        """
+        if self._entry is None or request.method not in ('GET', 'HEAD'):
+            return False
+        reqhdr = request.headers or {}
+        if_none_match = reqhdr.get('if-none-match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self._entry.etag)
+        since = parse_http_date(reqhdr.get('if-modified-since', ''))
+        # Last-Modified only has a one second resolution.
+        return since is not None and int(self._entry.mtime) <= since
+
+
+    def build_not_modified(self):
+        """
+        Constructs a 304 Not Modified response for the loaded file: the
+        validators and caching headers, without a body.
+
+        :rtype bytes: Encoded 304 response.
+        """
+        self._stream = None
+        content_type = self._entry.headers['Content-Type']
+        return (
+            "HTTP/1.1 304 Not Modified\r\n"
+            "Date: {}\r\n"
+            "ETag: {}\r\n"
+            "Last-Modified: {}\r\n"
+            "Cache-Control: {}\r\n"
+            "{}"
+            "\r\n"
+        ).format(http_date(None), self._entry.etag, self._entry.last_modified,
+                 cache_control_for(content_type),
+                 "Vary: Accept-Encoding\r\n" if is_compressible(content_type) else "").encode('utf-8')
+
+
+    def negotiate_encoding(self, request):
+        """
+        Switches the loaded file to its gzip or deflate variant when it is
+        compressible, large enough and the client accepts the coding. Large
+        files streamed from disk are always sent as they are.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype dict: headers replacing the computed ones, None if the file
+                     has no compressed variants.
+        """
+        entry = self._entry
+        if entry is None or entry.content is None or not is_compressible(entry.headers['Content-Type']):
+            return None
+        overrides = {"Vary": "Accept-Encoding"}
+        encoding = choose_encoding((request.headers or {}).get('accept-encoding'))
+        if encoding is None or entry.size < MIN_COMPRESS_SIZE:
+            return overrides
+
+        data = STATIC_CACHE.variant(entry, encoding)
+        if data is not None:
+            self._content = data
+            # Same validator, weak: the bytes differ from the identity file.
+            overrides.update({
+                "Content-Encoding": encoding,
+                "Content-Length": str(len(data)),
+                "ETag": "W/" + entry.etag,
+            })
+        return overrides
+
+
+    def select_ranges(self, request):
+        """
+        Decides which byte ranges of the loaded file the request asks for.
+
+        The Range header is only honored on GET, and ignored when an If-Range
+        validator no longer matches the file, when it is malformed, or when it
+        lists more than :data:`MAX_RANGES` parts.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype list: (first, last) inclusive byte positions, an empty list if
+                     no range is satisfiable, or None for a full response.
+        """
+        if self._entry is None or request.method != 'GET':
+            return None
+        reqhdr = request.headers or {}
+        header = reqhdr.get('range')
+        if not header:
+            return None
+
+        if_range = reqhdr.get('if-range')
+        if if_range:
+            if if_range.strip().startswith(('"', 'W/')):
+                if not etag_matches(if_range, self._entry.etag, weak=False):
+                    return None
+            elif parse_http_date(if_range) != int(self._entry.mtime):
+                return None
+
+        ranges = parse_range(header, self._entry.size)
+        if ranges is None or len(ranges) > MAX_RANGES:
+            return None
+        return ranges
+
+
+    def build_partial(self, request, ranges):
+        """
+        Constructs a 206 Partial Content response for the loaded file: the
+        range itself for a single range, a ``multipart/byteranges`` body for
+        several. Streamed files keep being sent from disk.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params ranges (list): satisfiable (first, last) byte positions.
+
+        :rtype bytes: Encoded 206 response, its header only for streamed files.
+        """
+        entry = self._entry
+        size = entry.size
+        content_type = entry.headers['Content-Type']
+
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            overrides = {
+                "Content-Range": "bytes {}-{}/{}".format(first, last, size),
+                "Content-Length": str(last - first + 1),
+            }
+            parts = [(first, last)]
+        else:
+            boundary = uuid.uuid4().hex
+            overrides = {"Content-Type": "multipart/byteranges; boundary={}".format(boundary)}
+            parts = []
+            for first, last in ranges:
+                parts.append((
+                    "\r\n--{}\r\n"
+                    "Content-Type: {}\r\n"
+                    "Content-Range: bytes {}-{}/{}\r\n"
+                    "\r\n"
+                ).format(boundary, content_type, first, last, size).encode('utf-8'))
+                parts.append((first, last))
+            parts.append("\r\n--{}--\r\n".format(boundary).encode('utf-8'))
+            overrides["Content-Length"] = str(sum(
+                len(part) if isinstance(part, bytes) else part[1] - part[0] + 1
+                for part in parts))
+
+        if entry.content is not None:
+            self._stream = None
+            self._content = b"".join(
+                part if isinstance(part, bytes) else entry.content[part[0]:part[1] + 1]
+                for part in parts)
+        else:
+            self._stream = [
+                part if isinstance(part, bytes) else (entry.path, part[0], part[1] - part[0] + 1)
+                for part in parts]
+            self._content = b""
+
+        self._header = self.build_response_header(request, overrides)
+        status_line = "HTTP/1.1 206 Partial Content\r\n"
+        return status_line.encode('utf-8') + self._header + self._content
+
+
+    def build_range_not_satisfiable(self):
+        """
+        Constructs a 416 Range Not Satisfiable response for the loaded file.
+
+        :rtype bytes: Encoded 416 response.
+        """
+        self._stream = None
+        return (
+            "HTTP/1.1 416 Range Not Satisfiable\r\n"
+            "Content-Range: bytes */{}\r\n"
+            "Content-Length: 0\r\n"
+            "\r\n"
+        ).format(self._entry.size).encode('utf-8')
+
+
+    def send_stream(self, conn):
+        """
+        Sends the streamed part of the body, if any, after the bytes returned
+        by :meth:`build_response` were written to ``conn``. File ranges go
+        through ``sendfile`` and are never loaded in memory.
+
+        :params conn (socket.socket): blocking client socket.
+        """
+        for segment in self._stream or ():
+            if isinstance(segment, bytes):
+                conn.sendall(segment)
+                continue
+            filepath, offset, length = segment
+            with open(filepath, 'rb') as f:
+                send_file(conn, f, offset, length)
+
+
     def build_notfound(self):
         """
         Constructs a standard 404 Not Found HTTP response.
@@ -280,7 +602,6 @@ class Response():
                 "Content-Type: text/html\r\n"
                 "Content-Length: 13\r\n"
                 "Cache-Control: max-age=86000\r\n"
-                "Connection: close\r\n"
                 "\r\n"
                 "404 Not Found"
             ).encode('utf-8')
@@ -297,7 +618,10 @@ class Response():
             400: "Bad Request",
             401: "Unauthorized",
             403: "Forbidden",
-            500: "Internal Server Error"
+            431: "Request Header Fields Too Large",
+            500: "Internal Server Error",
+            502: "Bad Gateway",
+            503: "Service Unavailable"
         }
         status_text = status_texts.get(status_code, "Error")
         
@@ -308,7 +632,6 @@ class Response():
             "HTTP/1.1 {} {}\r\n"
             "Content-Type: text/plain\r\n"
             "Content-Length: {}\r\n"
-            "Connection: close\r\n"
             "\r\n"
             "{}"
         ).format(status_code, status_text, content_length, body).encode('utf-8')
@@ -335,6 +658,8 @@ class Response():
             base_dir = self.prepare_content_type(mime_type = 'text/html')
         elif mime_type == 'text/css':
             base_dir = self.prepare_content_type(mime_type = 'text/css')
+        elif mime_type.startswith('image/') or mime_type in APP_ARCHIVE_TYPES:
+            base_dir = self.prepare_content_type(mime_type = mime_type)
         #
         # TODO: add support objects
         #
@@ -342,7 +667,18 @@ class Response():
             return self.build_notfound()
 
         c_len, self._content = self.build_content(path, base_dir)
-        self._header = self.build_response_header(request)
+        if self._entry is None:
+            return self.build_notfound()
+        if self.is_not_modified(request):
+            return self.build_not_modified()
+
+        ranges = self.select_ranges(request)
+        if ranges == []:
+            return self.build_range_not_satisfiable()
+        if ranges:
+            return self.build_partial(request, ranges)
+
+        self._header = self.build_response_header(request, self.negotiate_encoding(request))
 
         # Build full response with status line
         # return self._header + self._content
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.routing
+~~~~~~~~~~~~~~~~~
+
+This module provides the proxy's routing table, compiled once from the
+virtual hosts of config/proxy.conf so that resolving the Host header of a
+request is a dictionary lookup:
+
+- host names are lower-cased, a name configured with a port also answers
+  without it (``192.168.56.103:8080`` matches ``192.168.56.103``);
+- ``*.example.com`` entries match any sub-domain, the longest suffix wins;
+- the ``_`` host, or the block holding ``default_server``, answers unknown
+  hosts, ``127.0.0.1:9000`` otherwise;
+- upstreams are parsed into ``(host, port)`` tuples and the balancer of each
+  host is created up front.
+
+Every Host header value seen is memoized, so even port-qualified or
+wildcard matches are resolved once.
+
+A :class:`RouteHolder <RouteHolder>` keeps the current table and replaces it
+when the configuration is reloaded. The swap is a single reference
+assignment: requests in progress keep the table they started with, new ones
+use the new table.
+
+A reload asked from a signal handler only wakes the reload thread started
+by :meth:`RouteHolder.start_reloader`: the swap takes locks the interrupted
+thread may already hold, it never runs in signal context.
+
+Usage Example:
+--------------
+>>> table = RouteTable.from_dict({"app1.local": ("127.0.0.1:9001", "round-robin")})
+>>> table.lookup("App1.local:8080").addresses
+{'127.0.0.1:9001': ('127.0.0.1', 9001)}
+"""
+
+import os
+import threading
+
+from .balancer import get_balancer, DEFAULT_POLICY
+
+#: Host of the catch-all virtual host.
+DEFAULT_HOST = '_'
+#: Upstream of unknown hosts when no default server is configured.
+FALLBACK_UPSTREAM = '127.0.0.1:9000'
+#: Distinct Host header values memoized before the memo is cleared.
+MEMO_SIZE = 4096
+#: Seconds between two checks of a watched configuration file.
+WATCH_INTERVAL = 2.0
+
+
+def parse_address(upstream):
+    """
+    Split a ``host:port`` upstream.
+
+    :rtype tuple: (str, int) host and port, 80 when the port is missing.
+    :raises ValueError: if the port is not a number.
+    """
+    host, sep, port = upstream.rpartition(':')
+    if not sep:
+        return upstream, 80
+    return host, int(port)
+
+
+class Route(object):
+    """The :class:`Route <Route>` object, the compiled virtual host.
+
+    :attrs hostname (str): host name as configured.
+    :attrs upstreams (tuple): ``host:port`` names of the upstreams.
+    :attrs addresses (dict): upstream name to its ``(host, port)`` tuple.
+    :attrs policy (str): dist_policy of the host.
+    :attrs balancer (Balancer): picks the upstream, None with a single one.
+    """
+
+    __slots__ = ("hostname", "upstreams", "addresses", "policy", "balancer")
+
+    def __init__(self, hostname, upstreams, policy=DEFAULT_POLICY, weights=None):
+        self.hostname = hostname
+        self.upstreams = tuple(upstreams)
+        self.addresses = dict((name, parse_address(name)) for name in self.upstreams)
+        self.policy = policy
+        self.balancer = None
+        if len(self.upstreams) > 1:
+            self.balancer = get_balancer(hostname, self.upstreams, policy, weights)
+
+    def __repr__(self):
+        return "<Route {} -> {} ({})>".format(self.hostname, ", ".join(self.upstreams), self.policy)
+
+
+class RouteTable(object):
+    """The :class:`RouteTable <RouteTable>` object, an immutable mapping of
+    Host header values to :class:`Route <Route>` objects.
+
+    :attrs routes (tuple): every configured route.
+    :attrs default (Route): route of the hosts matching no entry.
+    """
+
+    def __init__(self, routes, default=None):
+        """
+        :params routes (list): :class:`Route <Route>` objects.
+        :params default (Route): catch-all route, the ``_`` host if present.
+        """
+        self.routes = tuple(routes)
+        exact = {}
+        wildcards = []
+        for route in self.routes:
+            name = route.hostname.strip().lower()
+            if name == DEFAULT_HOST:
+                default = default or route
+            elif name.startswith('*.'):
+                wildcards.append((name[1:], route))
+            else:
+                exact[name] = route
+        # Names configured with a port also answer without it.
+        for name, route in list(exact.items()):
+            host, sep, port = name.rpartition(':')
+            if sep and port.isdigit():
+                exact.setdefault(host, route)
+        wildcards.sort(key=lambda item: len(item[0]), reverse=True)
+
+        self.default = default or Route(DEFAULT_HOST, [FALLBACK_UPSTREAM])
+        self._exact = exact
+        self._wildcards = tuple(wildcards)
+        self._memo = {}
+
+    @classmethod
+    def from_dict(cls, routes, default=None):
+        """
+        Compile the ``{hostname: (proxy_pass, policy[, weights])}`` mapping
+        built by :func:`start_proxy.parse_virtual_hosts`.
+
+        :params routes (dict): proxy_pass is a ``host:port`` string or a list.
+        :params default (str): hostname of the catch-all route, if any.
+
+        :rtype RouteTable: the compiled table.
+        """
+        compiled = []
+        fallback = None
+        for hostname, value in routes.items():
+            proxy_map, policy = value[0], value[1]
+            weights = value[2] if len(value) > 2 else None
+            if not isinstance(proxy_map, list):
+                proxy_map = [proxy_map]
+            route = Route(hostname, proxy_map, policy, weights)
+            compiled.append(route)
+            if hostname == default:
+                fallback = route
+        return cls(compiled, fallback)
+
+    def lookup(self, host):
+        """
+        Find the route of a Host header value.
+
+        :params host (str): Host header of the request, port included if sent.
+
+        :rtype Route: the matching route, :attr:`default` if none matches.
+        """
+        route = self._memo.get(host)
+        if route is not None:
+            return route
+
+        name = host.strip().lower()
+        route = self._exact.get(name)
+        if route is None:
+            bare, sep, port = name.rpartition(':')
+            if sep and port.isdigit():
+                name = bare
+                route = self._exact.get(name)
+        if route is None:
+            for suffix, candidate in self._wildcards:
+                if name.endswith(suffix):
+                    route = candidate
+                    break
+            else:
+                route = self.default
+
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[host] = route
+        return route
+
+    def upstreams(self):
+        """``host:port`` names of every upstream, the default route's included."""
+        return set(name for route in self.routes + (self.default,) for name in route.upstreams)
+
+    def balanced_upstreams(self):
+        """``host:port`` names of the upstreams of every balanced route."""
+        return set(name for route in self.routes + (self.default,)
+                   if route.balancer is not None for name in route.upstreams)
+
+    def __iter__(self):
+        return iter(self.routes)
+
+    def __len__(self):
+        return len(self.routes)
+
+
+class RouteHolder(object):
+    """The :class:`RouteHolder <RouteHolder>` object, which holds the current
+    :class:`RouteTable <RouteTable>` and swaps in a new one on reload.
+
+    :attrs table (RouteTable): the table new requests are routed with.
+    :attrs loader (callable): builds a fresh table (or routes dictionary)
+                              from the configuration, None if not reloadable.
+    :attrs on_swap (callable): called with the old and the new table after
+                               each successful reload.
+    """
+
+    def __init__(self, table, loader=None, on_swap=None):
+        self.table = table
+        self.loader = loader
+        self.on_swap = on_swap
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._reloader = None
+
+    def reload(self):
+        """
+        Build a new table with :attr:`loader` and make it current. A
+        configuration that fails to load leaves the current table in place.
+
+        :rtype bool: True if the table was replaced.
+        """
+        if self.loader is None:
+            return False
+        with self._lock:
+            try:
+                table = self.loader()
+                if not isinstance(table, RouteTable):
+                    table = RouteTable.from_dict(table)
+            except Exception as e:
+                print("[Routing] reload failed, keeping the current routes: {}".format(e))
+                return False
+            old, self.table = self.table, table
+        print("[Routing] reloaded {} virtual hosts".format(len(table)))
+        if self.on_swap is not None:
+            self.on_swap(old, table)
+        return True
+
+    def request_reload(self):
+        """
+        Ask the reload thread for a :meth:`reload`. Only sets an event, so
+        it is safe to call from a signal handler.
+        """
+        self._pending.set()
+
+    def start_reloader(self):
+        """Start the background thread serving :meth:`request_reload`."""
+        if self._reloader is not None:
+            return
+
+        def run():
+            while True:
+                self._pending.wait()
+                self._pending.clear()
+                self.reload()
+
+        self._reloader = threading.Thread(target=run, name="route-reload")
+        self._reloader.setDaemon(True)  # Python 2 compatible
+        self._reloader.start()
+
+    def watch(self, path, interval=WATCH_INTERVAL):
+        """
+        Reload whenever ``path`` changes, checked every ``interval`` seconds
+        from a background thread.
+
+        :params path (str): configuration file to watch.
+        """
+        def signature():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            return st.st_mtime, st.st_size
+
+        def run():
+            last = signature()
+            stop = threading.Event()
+            while not stop.wait(interval):
+                current = signature()
+                if current is not None and current != last:
+                    last = current
+                    self.reload()
+
+        thread = threading.Thread(target=run, name="route-watch")
+        thread.setDaemon(True)  # Python 2 compatible
+        thread.start()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.singleflight
+~~~~~~~~~~~~~~~~~
+
+This module provides request coalescing: concurrent calls for the same key
+share a single execution. The first caller runs the function, the callers
+arriving while it runs wait for its result instead of running it again.
+
+With a ``ttl`` the result is also kept that many seconds after the call
+ended (a micro-cache), so a burst of identical requests arriving just after
+one another is answered by one execution as well.
+
+Requirements:
+--------------
+- threading: callers run in the proxy's client threads.
+
+Notes:
+------
+- A waiting caller gives up after ``timeout`` seconds and gets no result,
+  as it does when the shared call raised or returned None: it is up to the
+  caller to do the work itself then. A timeout shorter than the work (a
+  long poll for example) sends it once per waiter on top of the shared
+  call, it should cover the longest call.
+- Results are shared as they are, they must not be modified.
+
+Usage Example:
+--------------
+>>> flights = SingleFlight(ttl=1.0)
+>>> result, shared = flights.do(("app1.local", "/get-list/"), fetch)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+#: Seconds a caller waits for the shared call.
+WAIT_TIMEOUT = 5.0
+#: Results kept at most for the micro-cache.
+MAX_RECENT = 1024
+
+
+class _Call(object):
+    """One execution shared by the callers of a key."""
+
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight(object):
+    """The :class:`SingleFlight <SingleFlight>` object, which coalesces
+    concurrent calls for the same key.
+
+    :attrs ttl (float): seconds a result is reused after its call ended,
+                        0 to only share calls in progress.
+    :attrs timeout (float): seconds a caller waits for the shared call.
+    """
+
+    def __init__(self, ttl=0, timeout=WAIT_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._calls = {}
+        #: key -> (expiry, result), oldest first.
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, keep=None):
+        """
+        Run ``fn`` unless a call for ``key`` is in progress or ended less
+        than :attr:`ttl` seconds ago, in which case its result is returned.
+
+        :params key (hashable): identifies identical calls.
+        :params fn (callable): the work, called without arguments.
+        :params keep (callable): predicate on the result, False to not reuse
+                                 it after the call ended.
+
+        :rtype tuple: (result, shared) where ``shared`` is True if the result
+                      came from another caller's execution.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            recent = self._recent.get(key)
+            if recent is not None:
+                return recent[1], True
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait(self.timeout)
+            return call.result, True
+
+        try:
+            call.result = fn()
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if (self.ttl > 0 and call.result is not None
+                        and (keep is None or keep(call.result))):
+                    self._recent.pop(key, None)
+                    self._recent[key] = (time.time() + self.ttl, call.result)
+                    if len(self._recent) > MAX_RECENT:
+                        self._recent.popitem(last=False)
+            call.done.set()
+        return call.result, False
+
+    def forget(self, key):
+        """Drop the result kept for ``key``, the next call runs again."""
+        with self._lock:
+            self._recent.pop(key, None)
+
+    def _expire(self, now):
+        """Drop the results older than :attr:`ttl`. Lock held."""
+        expired = []
+        for key in self._recent:
+            if self._recent[key][0] > now:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._recent[key]
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.upstream
+~~~~~~~~~~~~~~~~~
+
+This module provides a pool of persistent connections from the proxy to its
+upstream backends. Instead of connecting for every proxied request, the
+proxy checks a keep-alive connection out of the pool, sends the request,
+reads the response and checks the connection back in for the next request
+to the same ``(host, port)``.
+
+Requirements:
+--------------
+- socket: connections to the backends.
+- select: health check of idle connections.
+- threading: the pool is shared by every proxy thread.
+
+Notes:
+------
+- At most ``max_per_host`` connections (busy and idle) are open to one
+  upstream; a checkout beyond that waits for a connection to come back.
+- At most ``max_idle`` connections per upstream are kept idle, the most
+  recently used first. Idle connections older than ``idle_timeout`` are
+  closed, which must stay below the backend's keep-alive timeout.
+- On checkout an idle connection that became readable is dropped: the
+  backend closed it, or sent bytes nobody asked for.
+- A request that fails on a reused connection before any response byte was
+  received may be retried on a fresh one, the backend may have closed it in
+  the meantime.
+
+Usage Example:
+--------------
+>>> pool = UpstreamPool(max_idle=8, max_per_host=64)
+>>> sock, reused = pool.acquire("127.0.0.1", 9001)
+>>> sock.sendall(request)
+>>> pool.release("127.0.0.1", 9001, sock, reusable=True)
+"""
+
+import select
+import socket
+import threading
+import time
+
+#: Idle connections kept per upstream.
+DEFAULT_MAX_IDLE = 8
+#: Connections open at once per upstream, busy and idle.
+DEFAULT_MAX_PER_HOST = 64
+#: Seconds an idle connection is kept, below the backend's keep-alive timeout.
+DEFAULT_IDLE_TIMEOUT = 4.0
+#: Seconds allowed to establish a new connection.
+CONNECT_TIMEOUT = 5.0
+#: Seconds a request may wait on a blocked read or write to the backend.
+IO_TIMEOUT = 60.0
+#: Seconds a checkout waits for a connection when ``max_per_host`` is reached.
+ACQUIRE_TIMEOUT = 10.0
+
+
+class UpstreamPool(object):
+    """The :class:`UpstreamPool <UpstreamPool>` object, a thread-safe pool of
+    keep-alive connections keyed by upstream ``(host, port)``.
+
+    :attrs max_idle (int): idle connections kept per upstream.
+    :attrs max_per_host (int): connections open at once per upstream.
+    :attrs idle_timeout (float): seconds an idle connection is kept.
+    """
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE, max_per_host=DEFAULT_MAX_PER_HOST,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        #: (host, port) -> list of (socket, checked-in time), newest last.
+        self._idle = {}
+        #: (host, port) -> number of open connections, busy and idle.
+        self._open = {}
+        #: Upstreams removed from the configuration, not pooled any more.
+        self._retired = set()
+        self._cond = threading.Condition(threading.Lock())
+
+    def acquire(self, host, port, timeout=ACQUIRE_TIMEOUT):
+        """
+        Check out a connection to ``host:port``, reusing a healthy idle one
+        when possible and connecting otherwise.
+
+        :params host (str): IP address of the upstream.
+        :params port (int): port of the upstream.
+        :params timeout (float): seconds to wait when the upstream is at
+                                 ``max_per_host`` connections.
+
+        :rtype tuple: (socket.socket, bool) the connection and whether it was
+                      reused from the pool.
+        :raises socket.error: if no connection can be established in time.
+        """
+        key = (host, port)
+        deadline = time.time() + timeout
+        with self._cond:
+            self._retired.discard(key)
+            while True:
+                sock = self._pop_idle(key)
+                if sock is not None:
+                    return sock, True
+                if self._open.get(key, 0) < self.max_per_host:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise socket.error("no connection to {}:{} available".format(host, port))
+                self._cond.wait(remaining)
+
+        try:
+            sock = socket.create_connection(key, CONNECT_TIMEOUT)
+        except socket.error:
+            self._forget(key)
+            raise
+        sock.settimeout(IO_TIMEOUT)
+        return sock, False
+
+    def release(self, host, port, sock, reusable):
+        """
+        Check a connection back in after a request.
+
+        :params sock (socket.socket): connection returned by :meth:`acquire`.
+        :params reusable (bool): the exchange ended cleanly and the backend
+                                 keeps the connection open.
+        """
+        key = (host, port)
+        with self._cond:
+            idle = self._idle.setdefault(key, [])
+            if reusable and len(idle) < self.max_idle and key not in self._retired:
+                idle.append((sock, time.time()))
+                self._cond.notify()
+                return
+        self._close(sock)
+        self._forget(key)
+
+    def drain(self, host=None, port=None):
+        """
+        Close idle connections, those of ``host:port`` only when given.
+        Busy connections are closed when they are released.
+        """
+        with self._cond:
+            keys = [k for k in self._idle if host is None or k == (host, port)]
+            closing = []
+            for key in keys:
+                for sock, _ in self._idle.pop(key):
+                    closing.append(sock)
+                    self._open[key] -= 1
+            self._cond.notify_all()
+        for sock in closing:
+            self._close(sock)
+
+    def retire(self, host, port):
+        """
+        Drain an upstream removed from the configuration: its idle
+        connections are closed now and busy ones when they are released.
+        """
+        with self._cond:
+            self._retired.add((host, port))
+        self.drain(host, port)
+
+    def _pop_idle(self, key):
+        """Take the newest healthy idle connection of ``key``. Lock held."""
+        idle = self._idle.get(key)
+        now = time.time()
+        while idle:
+            sock, since = idle.pop()
+            if now - since < self.idle_timeout and self._healthy(sock):
+                return sock
+            self._close(sock)
+            self._open[key] -= 1
+        return None
+
+    def _healthy(self, sock):
+        """An idle keep-alive connection has nothing to read until it is used."""
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (select.error, socket.error, ValueError):
+            return False
+        return not readable
+
+    def _forget(self, key):
+        with self._cond:
+            self._open[key] = max(self._open.get(key, 0) - 1, 0)
+            self._cond.notify()
+
+    def _close(self, sock):
+        try:
+            sock.close()
+        except socket.error:
+            pass
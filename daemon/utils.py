@@ -12,8 +12,14 @@
 # while attending the course
 #
 
+import socket
+import sys
+from email.utils import formatdate, parsedate_tz, mktime_tz
 from urlparse import urlparse
 
+#: SO_REUSEPORT is missing from the Python 2 socket module, 15 is its Linux value.
+SO_REUSEPORT = getattr(socket, 'SO_REUSEPORT', 15 if sys.platform.startswith('linux') else None)
+
 def get_auth_from_url(url):
     """Given a url with authentication components, extract them into a tuple of
     username,password.
@@ -27,4 +33,86 @@ def get_auth_from_url(url):
     except (AttributeError, TypeError):
         auth = ("", "")
 
-    return auth
\ No newline at end of file
+    return auth
+
+
+def create_listener(ip, port, backlog=50, reuse_port=False):
+    """Create a TCP socket bound to ``(ip, port)`` and listening.
+
+    With ``reuse_port`` several processes may bind the same address and the
+    kernel balances incoming connections between them (SO_REUSEPORT).
+
+    :param ip (str): IP address to bind.
+    :param port (int): port number to bind.
+    :param backlog (int): length of the pending connection queue.
+    :param reuse_port (bool): set SO_REUSEPORT before binding.
+
+    :rtype socket.socket: the listening socket.
+    :raises socket.error: if the address cannot be bound.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    # server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    if reuse_port:
+        if SO_REUSEPORT is None:
+            server.close()
+            raise socket.error("SO_REUSEPORT is not supported on {}".format(sys.platform))
+        server.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+
+    try:
+        server.bind((ip, port))
+        server.listen(backlog)
+    except socket.error:
+        server.close()
+        raise
+    return server
+
+
+def http_date(timestamp):
+    """Format a POSIX timestamp as an HTTP date (RFC 7231 IMF-fixdate).
+
+    :rtype str: e.g. ``Sun, 06 Nov 1994 08:49:37 GMT``.
+    """
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value):
+    """Parse an HTTP date header value.
+
+    :rtype int: POSIX timestamp, or None if ``value`` is not a valid date.
+    """
+    try:
+        parsed = parsedate_tz(value)
+        return mktime_tz(parsed) if parsed else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def etag_matches(header, etag, weak=True):
+    """Check an ETag against an If-None-Match / If-Match / If-Range value.
+
+    :param header (str): comma separated list of entity tags, or ``*``.
+    :param etag (str): current entity tag of the resource.
+    :param weak (bool): use the weak comparison (``W/`` prefixes ignored),
+                        otherwise two tags only match if both are strong.
+
+    :rtype bool: True if one of the listed tags matches ``etag``.
+    """
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    if weak:
+        etag = etag[2:] if etag.startswith('W/') else etag
+    elif etag.startswith('W/'):
+        return False
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
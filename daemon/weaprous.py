@@ -19,6 +19,8 @@ deamon.weaproute
 This module provides a WeApRous object to deploy RESTful url web app with routing
 """
 
+import inspect
+
 from .backend import create_backend
 
 class WeApRous:
@@ -43,14 +45,21 @@ class WeApRous:
       >>>     return {'message': 'Hello, world!'}
 
       >>> app.run()
+
+    An app whose handlers keep state in memory (peers, sessions) is created
+    with ``WeApRous(stateful=True)``: pre-forked worker processes would each
+    hold their own copy, so it refuses to run with ``processes > 1``.
     """
 
-    def __init__(self):
+    def __init__(self, stateful=False):
         """
         Initialize a new WeApRous instance.
 
         Sets up an empty route registry and prepares placeholders for IP and port.
+
+        :param stateful (bool): the handlers share state held in this process.
         """
+        self.stateful = stateful
         self.routes = {}
         self.ip = None
         self.port = None
@@ -66,12 +75,17 @@ class WeApRous:
         self.ip = ip
         self.port = port
 
-    def route(self, path, methods=['GET']):
+    def route(self, path, methods=['GET'], blocking=False):
         """
         Decorator to register a route handler for a specific path and HTTP methods.
 
-        :param path (str): The URL path to route.
+        :param path (str): The URL path to route, without query string.
         :param methods (list): A list of HTTP methods (e.g., ['GET', 'POST']) to bind.
+        :param blocking (bool): The handler may wait a long time (e.g. a long
+                                poll), which only the threaded engine allows.
+
+        A handler declaring a ``query`` argument is also called with the
+        query string parameters as a dictionary.
 
         :rtype: function - A decorator that registers the handler function.
         """
@@ -82,22 +96,29 @@ class WeApRous:
             # Optional attach route metadata to the function
             func._route_path = path
             func._route_methods = methods
+            # Handlers taking a ``query`` argument get the query parameters
+            func._route_query = 'query' in inspect.getargspec(func).args
+            func._route_blocking = blocking
+            func._route_stateful = self.stateful
 
             return func
         return decorator
 
-    def run(self):
+    def run(self, **options):
         """
         Start the backend server and begin handling requests.
 
         This method launches the TCP server using the configured IP and port,
         and dispatches incoming requests to the registered route handlers.
 
+        :param options: keyword settings forwarded to :func:`create_backend`
+                        (e.g. ``engine='event'``, ``workers=8``).
+
         :raise: Error if IP or port has not been configured.
         """
         if not self.ip or not self.port:
             print("Rous app need to preapre address"
                   "by calling app.prepare_address(ip,port)")
 
-        create_backend(self.ip, self.port, self.routes)
+        create_backend(self.ip, self.port, self.routes, **options)
         
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.workerpool
+~~~~~~~~~~~~~~~~~
+
+This module provides a fixed-size pool of worker threads fed by a bounded
+job queue. The accept loop of the backend submits client connections to the
+pool instead of spawning one thread per connection, so the number of OS
+threads stays constant no matter how many clients arrive at once.
+
+Usage Example:
+--------------
+>>> pool = WorkerPool(workers=8, queue_size=64)
+>>> pool.start()
+>>> if not pool.submit(handle_client, conn, addr):
+...     reject(conn)
+"""
+
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+#: Default number of worker threads serving client connections.
+DEFAULT_WORKERS = 32
+#: Default number of accepted connections allowed to wait for a worker.
+DEFAULT_QUEUE_SIZE = 128
+
+
+class WorkerPool(object):
+    """The :class:`WorkerPool <WorkerPool>` object, which runs submitted jobs
+    on a fixed set of daemon threads.
+
+    Jobs wait in a bounded queue until a worker is free. When the queue is
+    full, :meth:`submit` refuses the job instead of blocking so the caller can
+    shed the load explicitly (e.g. answer ``503 Service Unavailable``).
+
+    :attrs workers (int): number of worker threads.
+    :attrs queue_size (int): capacity of the pending job queue.
+    :attrs name (str): prefix used for the worker thread names.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, name="worker"):
+        """
+        Initialize a new WorkerPool instance.
+
+        :param workers (int): number of worker threads, at least 1.
+        :param queue_size (int): capacity of the pending job queue, at least 1.
+        :param name (str): prefix used for the worker thread names.
+        """
+        if workers < 1:
+            raise ValueError("WorkerPool needs at least one worker, got {}".format(workers))
+        if queue_size < 1:
+            raise ValueError("WorkerPool needs a bounded queue, got size {}".format(queue_size))
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.name = name
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.threads = []
+
+    def start(self):
+        """Spawn the worker threads."""
+        for index in range(self.workers):
+            worker = threading.Thread(
+                target=self._run,
+                name="{}-{}".format(self.name, index)
+            )
+            worker.setDaemon(True)  # Python 2 compatible
+            worker.start()
+            self.threads.append(worker)
+
+    def submit(self, func, *args):
+        """
+        Queue ``func(*args)`` for execution on a worker thread.
+
+        :param func (callable): the job to run.
+        :param args: positional arguments passed to ``func``.
+
+        :rtype bool: True if the job was queued, False if the queue is full.
+        """
+        try:
+            self.jobs.put_nowait((func, args))
+        except queue.Full:
+            return False
+        return True
+
+    def pending(self):
+        """Return the approximate number of jobs waiting for a worker."""
+        return self.jobs.qsize()
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once the already queued jobs are done.
+
+        :param wait (bool): block until every worker thread has exited.
+        """
+        for _ in self.threads:
+            self.jobs.put(None)
+        if wait:
+            for worker in self.threads:
+                worker.join()
+        self.threads = []
+
+    def _run(self):
+        """Worker loop: take jobs off the queue until the stop marker."""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            func, args = job
+            try:
+                func(*args)
+            except Exception as e:
+                print("[WorkerPool] job {} failed: {}".format(func.__name__, e))
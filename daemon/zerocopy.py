@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.zerocopy
+~~~~~~~~~~~~~~~~~
+
+This module streams file ranges to sockets without loading the file in
+memory. Where the platform allows it the kernel copies the bytes directly
+from the file descriptor to the socket with ``sendfile(2)``:
+
+- ``os.sendfile`` when the interpreter provides it (Python 3.3+),
+- the libc ``sendfile`` through ctypes on Linux (Python 2),
+- otherwise a read loop through one reusable buffer per thread.
+
+Both blocking sockets (with or without a timeout) and non-blocking sockets
+driven by the event loop are supported.
+
+Usage Example:
+--------------
+>>> with open("apps/peer.zip", "rb") as f:
+...     send_file(conn, f, 0, os.fstat(f.fileno()).st_size)
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import socket
+import sys
+import threading
+
+#: Bytes handed to one sendfile or read call.
+CHUNK_SIZE = 256 * 1024
+#: Size of the per-thread buffer used by the read loop fallback.
+BUFFER_SIZE = 64 * 1024
+
+_RETRY = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+_local = threading.local()
+
+
+def _load_sendfile():
+    """Return a ``sendfile(out_fd, in_fd, offset, count)`` callable, or None."""
+    if hasattr(os, 'sendfile'):
+        return os.sendfile
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        native = libc.sendfile64 if hasattr(libc, 'sendfile64') else libc.sendfile
+    except (OSError, AttributeError):
+        return None
+    native.argtypes = [ctypes.c_int, ctypes.c_int,
+                       ctypes.POINTER(ctypes.c_longlong), ctypes.c_size_t]
+    native.restype = ctypes.c_ssize_t
+
+    def libc_sendfile(out_fd, in_fd, offset, count):
+        position = ctypes.c_longlong(offset)
+        sent = native(out_fd, in_fd, ctypes.byref(position), count)
+        if sent < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return sent
+
+    return libc_sendfile
+
+#: Kernel sendfile, None when only the read loop is available.
+SENDFILE = _load_sendfile()
+
+
+def _buffer():
+    """Per-thread reusable read buffer and its memoryview."""
+    view = getattr(_local, 'view', None)
+    if view is None:
+        _local.buffer = bytearray(BUFFER_SIZE)
+        view = _local.view = memoryview(_local.buffer)
+    return view
+
+
+def send_once(sock, fileobj, offset, count):
+    """
+    Send up to ``count`` bytes of ``fileobj`` starting at ``offset`` with a
+    single system call, as many as the socket accepts right now.
+
+    :params sock (socket.socket): connected socket.
+    :params fileobj (file): file opened in binary mode.
+    :params offset (int): position in the file of the first byte to send.
+    :params count (int): bytes left to send, must be positive.
+
+    :rtype int: bytes sent, 0 if the socket is not writable yet.
+    :raises socket.error: if the connection fails.
+    """
+    try:
+        if SENDFILE is not None:
+            sent = SENDFILE(sock.fileno(), fileobj.fileno(), offset, min(count, CHUNK_SIZE))
+            if sent == 0:
+                raise socket.error(errno.EIO, "file truncated while being sent")
+            return sent
+
+        view = _buffer()
+        fileobj.seek(offset)
+        nbytes = fileobj.readinto(view[:min(count, BUFFER_SIZE)])
+        if not nbytes:
+            raise socket.error(errno.EIO, "file truncated while being sent")
+        return sock.send(view[:nbytes])
+    except (OSError, socket.error) as e:
+        if e.args and e.args[0] in _RETRY:
+            return 0
+        if isinstance(e, socket.error):
+            raise
+        raise socket.error(*e.args)
+
+
+def send_file(sock, fileobj, offset, count):
+    """
+    Send ``count`` bytes of ``fileobj`` starting at ``offset``, blocking until
+    everything is sent. Honors the socket timeout.
+
+    :params sock (socket.socket): connected socket.
+    :params fileobj (file): file opened in binary mode.
+    :params offset (int): position in the file of the first byte to send.
+    :params count (int): number of bytes to send.
+
+    :raises socket.timeout: if the socket stays unwritable past its timeout.
+    :raises socket.error: if the connection fails.
+    """
+    timeout = sock.gettimeout()
+    while count > 0:
+        sent = send_once(sock, fileobj, offset, count)
+        if sent == 0:
+            # Sockets with a timeout are non-blocking underneath.
+            _, writable, _ = select.select([], [sock], [], timeout)
+            if not writable:
+                raise socket.timeout("timed out")
+            continue
+        offset += sent
+        count -= sent
@@ -26,6 +26,10 @@ import socket
 import argparse
 
 from daemon import create_backend
+from daemon.backend import ENGINES
+from daemon.response import STATIC_CACHE, set_cache_max_age
+from daemon.workerpool import DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+from daemon.httpadapter import KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
 
 # Default port number used if none is specified via command-line arguments.
 PORT = 9000 
@@ -40,6 +44,14 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --workers (int): Number of worker threads (default: 32).
+    :arg --queue-size (int): Connections allowed to wait for a worker (default: 128).
+    :arg --keepalive-timeout (float): Idle seconds of a persistent connection (default: 5).
+    :arg --keepalive-max (int): Requests served per persistent connection (default: 100).
+    :arg --engine (str): ``threaded`` worker pool or ``event`` loop (default: threaded).
+    :arg --processes (int): Pre-forked worker processes (default: 1, no supervisor).
+    :arg --reuse-port (flag): Workers bind the port with SO_REUSEPORT.
+    :arg --static-cache-mb (int): Memory budget of the static file cache (default: 32).
     """
 
     parser = argparse.ArgumentParser(
@@ -58,9 +70,87 @@ if __name__ == "__main__":
         default=PORT,
         help='Port number to bind the server. Default is {}.'.format(PORT)
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help='Number of worker threads serving clients. A kept-alive connection holds '
+             'its worker while idle, up to --keepalive-timeout; none is kept alive while '
+             'connections wait for a worker. Default is {}.'.format(DEFAULT_WORKERS)
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help='Accepted connections allowed to wait for a worker before '
+             'new ones get 503. Default is {}.'.format(DEFAULT_QUEUE_SIZE)
+    )
+    parser.add_argument(
+        '--keepalive-timeout',
+        type=float,
+        default=KEEPALIVE_TIMEOUT,
+        help='Idle seconds before a persistent connection is closed. Each idle '
+             'connection holds a worker thread meanwhile, it is closed early once '
+             'other connections wait for one. Default is {}.'.format(KEEPALIVE_TIMEOUT)
+    )
+    parser.add_argument(
+        '--keepalive-max',
+        type=int,
+        default=KEEPALIVE_MAX,
+        help='Requests served on one persistent connection. Default is {}.'.format(KEEPALIVE_MAX)
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default=ENGINES[0],
+        help='Serving engine: thread pool or single-threaded event loop. '
+             'Default is {}.'.format(ENGINES[0])
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=1,
+        help='Number of pre-forked worker processes sharing the port. They share no '
+             'memory, apps keeping state in the process are refused. Default is 1.'
+    )
+    parser.add_argument(
+        '--reuse-port',
+        action='store_true',
+        help='Let each worker process bind the port with SO_REUSEPORT '
+             'instead of inheriting one listening socket.'
+    )
+    parser.add_argument(
+        '--static-cache-mb',
+        type=int,
+        default=STATIC_CACHE.max_bytes // (1024 * 1024),
+        help='Memory budget of the in-memory static file cache in MB, 0 disables it. '
+             'Default is {}.'.format(STATIC_CACHE.max_bytes // (1024 * 1024))
+    )
+    parser.add_argument(
+        '--cache-max-age',
+        action='append',
+        default=[],
+        metavar='TYPE=SECONDS',
+        help='Cache-Control max-age of a MIME type (text/css) or main type (image), '
+             '0 to always revalidate. May be repeated.'
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
 
-    create_backend(ip, port)
+    STATIC_CACHE.resize(args.static_cache_mb * 1024 * 1024)
+    for setting in args.cache_max_age:
+        mime_type, _, seconds = setting.partition('=')
+        if not seconds.isdigit():
+            parser.error("--cache-max-age expects TYPE=SECONDS, got {}".format(setting))
+        set_cache_max_age(mime_type, int(seconds))
+
+    create_backend(ip, port,
+                   workers=args.workers,
+                   queue_size=args.queue_size,
+                   keepalive_timeout=args.keepalive_timeout,
+                   keepalive_max=args.keepalive_max,
+                   engine=args.engine,
+                   processes=args.processes,
+                   reuse_port=args.reuse_port)
@@ -42,7 +42,8 @@ import re
 from urlparse import urlparse
 from collections import defaultdict
 
-from daemon import create_proxy
+from daemon import create_proxy, RouteTable
+from daemon.proxy import CACHE, FLIGHTS, ENGINES
 
 PROXY_PORT = 8080
 
@@ -52,7 +53,7 @@ def parse_virtual_hosts(config_file):
     Parses virtual host blocks from a config file.
 
     :config_file (str): Path to the NGINX config file.
-    :rtype list of dict: Each dict contains 'listen'and 'server_name'.
+    :rtype RouteTable: the virtual hosts compiled for the proxy lookups.
     """
 
     with open(config_file, 'r') as f:
@@ -62,43 +63,39 @@ def parse_virtual_hosts(config_file):
     host_blocks = re.findall(r'host\s+"([^"]+)"\s*\{(.*?)\}', config_text, re.DOTALL)
 
     dist_policy_map = ""
+    default_host = None
 
     routes = {}
     for host, block in host_blocks:
         proxy_map = {}
 
-        # Find all proxy_pass entries
-        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+);', block)
+        # Find all proxy_pass entries, with their optional weight=N
+        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+)(?:\s+weight=(\d+))?\s*;', block)
         map = proxy_map.get(host,[])
-        map = map + proxy_passes
+        map = map + [upstream for upstream, _ in proxy_passes]
         proxy_map[host] = map
+        weights = [max(int(weight or 1), 1) for _, weight in proxy_passes]
+
+        # The block holding default_server answers unknown hosts
+        if re.search(r'\bdefault_server\b', block):
+            default_host = host
 
         # Find dist_policy if present
-        policy_match = re.search(r'dist_policy\s+(\w+)', block)
+        policy_match = re.search(r'dist_policy\s+([\w-]+)', block)
         if policy_match:
             dist_policy_map = policy_match.group(1)
         else: #default policy is round_robin
             dist_policy_map = 'round-robin'
             
-        #
-        # @bksysnet: Build the mapping and policy
-        # TODO: this policy varies among scenarios 
-        #       the default policy is provided with one proxy_pass
-        #       In the multi alternatives of proxy_pass then
-        #       the policy is applied to identify the highes matching
-        #       proxy_pass
-        #
+        # One proxy_pass is used as is, several are balanced by dist_policy.
         if len(proxy_map.get(host,[])) == 1:
             routes[host] = (proxy_map.get(host,[])[0], dist_policy_map)
-        # esle if:
-        #         TODO:  apply further policy matching here
-        #
         else:
-            routes[host] = (proxy_map.get(host,[]), dist_policy_map)
+            routes[host] = (proxy_map.get(host,[]), dist_policy_map, weights)
 
     for key, value in routes.items():
         print key, value
-    return routes
+    return RouteTable.from_dict(routes, default_host)
 
 
 if __name__ == "__main__":
@@ -111,16 +108,60 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --config (str): Virtual hosts configuration (default: config/proxy.conf).
+    :arg --watch-config (flag): Reload the configuration when the file changes.
+    :arg --cache-mb (int): Memory budget of the response cache (default: 64).
+    :arg --micro-cache (float): Seconds identical GETs reuse a response (default: 0).
+    :arg --engine (str): ``threaded`` per-client threads or ``event`` loop (default: threaded).
     """
 
     parser = argparse.ArgumentParser(prog='Proxy', description='', epilog='Proxy daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PROXY_PORT)
+    parser.add_argument(
+        '--config',
+        default='config/proxy.conf',
+        help='Virtual hosts configuration, reloaded on SIGHUP. Default is config/proxy.conf.'
+    )
+    parser.add_argument(
+        '--watch-config',
+        action='store_true',
+        help='Also reload the configuration whenever the file changes.'
+    )
+    parser.add_argument(
+        '--cache-mb',
+        type=int,
+        default=CACHE.max_bytes // (1024 * 1024),
+        help='Memory budget of the response cache in MB, 0 disables it. '
+             'Default is {}.'.format(CACHE.max_bytes // (1024 * 1024))
+    )
+    parser.add_argument(
+        '--micro-cache',
+        type=float,
+        default=0,
+        metavar='SECONDS',
+        help='Seconds a response is reused for identical GET requests of the same '
+             'user after it was fetched, whatever its Cache-Control. Default is 0, '
+             'only requests in progress share a response.'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default=ENGINES[0],
+        help='Proxy engine: a thread per client or a single-threaded event loop '
+             'relaying every connection. Default is {}.'.format(ENGINES[0])
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
+    config = args.config
+    CACHE.resize(args.cache_mb * 1024 * 1024)
+    FLIGHTS.ttl = args.micro_cache
 
-    routes = parse_virtual_hosts("config/proxy.conf")
+    routes = parse_virtual_hosts(config)
 
-    create_proxy(ip, port, routes)
+    create_proxy(ip, port, routes,
+                 loader=lambda: parse_virtual_hosts(config),
+                 watch_file=config if args.watch_config else None,
+                 engine=args.engine)
@@ -29,9 +29,11 @@ import socket
 import argparse
 
 from daemon.weaprous import WeApRous
+from daemon.backend import ENGINES
 
 PORT = 8000  # Default port
 
+# The handlers keep no state, the app may run in several processes
 app = WeApRous()
 
 @app.route('/login', methods=['POST'])
@@ -65,6 +67,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='Backend', description='', epilog='Beckend daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PORT)
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINES[0])
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--reuse-port', action='store_true')
  
     args = parser.parse_args()
     ip = args.server_ip
@@ -72,4 +77,4 @@ if __name__ == "__main__":
 
     # Prepare and launch the RESTful application
     app.prepare_address(ip, port)
-    app.run()
\ No newline at end of file
+    app.run(engine=args.engine, processes=args.processes, reuse_port=args.reuse_port)
\ No newline at end of file
@@ -21,7 +21,7 @@ echo ""
 # 1. Start tracker (manual - run in separate terminal)
 echo "1. Start tracker server (manual):"
 echo "   source venv2/bin/activate"
-echo "   python start_sampleapp.py --server-port 8000"
+echo "   python apps/sampleApp.py --server-port 8000"
 echo ""
 read -p "Press Enter when tracker is running..."
 
@@ -60,7 +60,7 @@ RESPONSE=$(curl -s -X POST http://127.0.0.1:8000/heartbeat/ \
   -H "Content-Type: application/json" \
   -d '{"peer_id":"127.0.0.1:5001"}')
 
-if echo "$RESPONSE" | grep -q "ok"; then
+if echo "$RESPONSE" | grep -q '"renewed": 1'; then
     echo -e "${GREEN}✓ Heartbeat SUCCESS${NC}"
     echo "Response: $RESPONSE"
 else
@@ -68,6 +68,131 @@ else
     echo "Response: $RESPONSE"
 fi
 
+# 5. Test batched heartbeat
+echo ""
+echo "5. Test batched heartbeat (POST /heartbeat/ with peer_ids)..."
+RESPONSE=$(curl -s -X POST http://127.0.0.1:8000/heartbeat/ \
+  -H "Content-Type: application/json" \
+  -d '{"peer_ids":["127.0.0.1:5001","127.0.0.1:9"]}')
+
+if echo "$RESPONSE" | grep -q '"unknown": \["127.0.0.1:9"\]'; then
+    echo -e "${GREEN}✓ Batched heartbeat SUCCESS${NC}"
+    echo "Response: $RESPONSE"
+else
+    echo -e "${RED}✗ Batched heartbeat FAILED${NC}"
+    echo "Response: $RESPONSE"
+fi
+
+# 6. Test malformed heartbeat
+echo ""
+echo "6. Test malformed heartbeat (POST /heartbeat/ with a non-JSON body)..."
+STATUS=$(curl -s -o /dev/null -w "%{http_code}" -X POST http://127.0.0.1:8000/heartbeat/ \
+  -H "Content-Type: application/json" \
+  -d 'not json')
+
+if [ "$STATUS" = "400" ]; then
+    echo -e "${GREEN}✓ Malformed heartbeat rejected${NC}"
+else
+    echo -e "${RED}✗ Malformed heartbeat FAILED${NC}"
+fi
+echo "Status: $STATUS"
+
+# 7. Test get peer list changes
+echo ""
+echo "7. Test peer list changes (GET /get-list/?since=<version>)..."
+VERSION=$(curl -s http://127.0.0.1:8000/get-list/ | sed -n 's/.*"version": \([0-9]*\).*/\1/p')
+curl -s -X POST http://127.0.0.1:8000/submit-info/ \
+  -H "Content-Type: application/json" \
+  -d '{"ip":"127.0.0.1","port":5002}' > /dev/null
+RESPONSE=$(curl -s "http://127.0.0.1:8000/get-list/?since=$VERSION")
+
+if echo "$RESPONSE" | grep -q '"mode": "delta"' && echo "$RESPONSE" | grep -q "127.0.0.1:5002"; then
+    echo -e "${GREEN}✓ Peer list delta SUCCESS${NC}"
+    echo "Response: $RESPONSE"
+else
+    echo -e "${RED}✗ Peer list delta FAILED${NC}"
+    echo "Response: $RESPONSE"
+fi
+
+# 8. Test full list for a version older than the change log
+echo ""
+echo "8. Test full list fallback (GET /get-list/?since=1)..."
+RESPONSE=$(curl -s "http://127.0.0.1:8000/get-list/?since=1")
+
+if echo "$RESPONSE" | grep -q '"mode": "full"'; then
+    echo -e "${GREEN}✓ Full list fallback SUCCESS${NC}"
+    echo "Response: $RESPONSE"
+else
+    echo -e "${RED}✗ Full list fallback FAILED${NC}"
+    echo "Response: $RESPONSE"
+fi
+
+# 9. Test watch timing out without changes
+echo ""
+echo "9. Test watch timeout (GET /watch/?since=<version>&timeout=1)..."
+VERSION=$(curl -s http://127.0.0.1:8000/get-list/ | sed -n 's/.*"version": \([0-9]*\).*/\1/p')
+RESPONSE=$(curl -s -m 5 "http://127.0.0.1:8000/watch/?since=$VERSION&timeout=1")
+
+if echo "$RESPONSE" | grep -q '"added": \[\]' && echo "$RESPONSE" | grep -q '"removed": \[\]'; then
+    echo -e "${GREEN}✓ Watch timeout SUCCESS${NC}"
+    echo "Response: $RESPONSE"
+else
+    echo -e "${RED}✗ Watch timeout FAILED${NC}"
+    echo "Response: $RESPONSE"
+fi
+
+# 10. Test conditional get peer list
+echo ""
+echo "10. Test unchanged peer list (GET /get-list/ with If-None-Match)..."
+ETAG=$(curl -s -D - -o /dev/null http://127.0.0.1:8000/get-list/ | tr -d '\r' | sed -n 's/^[Ee][Tt][Aa][Gg]: //p')
+HEADERS=$(curl -s -D - -o /dev/null -H "If-None-Match: $ETAG" http://127.0.0.1:8000/get-list/ | tr -d '\r')
+
+if echo "$HEADERS" | grep -q "^HTTP/1.1 304" && echo "$HEADERS" | grep -q "^ETag: $ETAG" \
+    && echo "$HEADERS" | grep -q "^Vary: Accept-Encoding"; then
+    echo -e "${GREEN}✓ Not Modified SUCCESS${NC}"
+else
+    echo -e "${RED}✗ Not Modified FAILED${NC}"
+fi
+echo "$HEADERS"
+
+# 11. Test request parsing
+echo ""
+echo "11. Test request parsing (chunked body, header size limit, framing)..."
+RESPONSE=$(curl -s -X POST http://127.0.0.1:8000/heartbeat/ \
+  -H "Content-Type: application/json" \
+  -H "Transfer-Encoding: chunked" \
+  -d '{"peer_id":"127.0.0.1:5001"}')
+
+if echo "$RESPONSE" | grep -q '"renewed": 1'; then
+    echo -e "${GREEN}✓ Chunked body SUCCESS${NC}"
+else
+    echo -e "${RED}✗ Chunked body FAILED${NC}"
+fi
+echo "Response: $RESPONSE"
+
+STATUS=$(curl -s -o /dev/null -w "%{http_code}" http://127.0.0.1:8000/get-list/ \
+  -H "X-Padding: $(head -c 70000 /dev/zero | tr '\0' 'a')")
+
+if [ "$STATUS" = "431" ]; then
+    echo -e "${GREEN}✓ Oversized head rejected${NC}"
+else
+    echo -e "${RED}✗ Oversized head FAILED${NC}"
+fi
+echo "Status: $STATUS"
+
+STATUS=$(curl -s -o /dev/null -w "%{http_code}" -X POST http://127.0.0.1:8000/heartbeat/ \
+  -H "Content-Type: application/json" \
+  -H "Transfer-Encoding: chunked" \
+  -H "Content-Length: 27" \
+  -d '{"peer_id":"127.0.0.1:5001"}')
+
+if [ "$STATUS" = "400" ]; then
+    echo -e "${GREEN}✓ Chunked body with Content-Length rejected${NC}"
+else
+    echo -e "${RED}✗ Chunked body with Content-Length FAILED${NC}"
+fi
+echo "Status: $STATUS"
+
 echo ""
 echo "=========================================="
 echo "Tracker API tests completed!"
@@ -79,7 +204,7 @@ echo "To test P2P communication:"
 echo ""
 echo "Terminal 1 (Tracker):"
 echo "  source venv2/bin/activate"
-echo "  python start_sampleapp.py --server-port 8000"
+echo "  python apps/sampleApp.py --server-port 8000"
 echo ""
 echo "Terminal 2 (Peer Alice):"
 echo "  source venv2/bin/activate"